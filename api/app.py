@@ -8,8 +8,9 @@ from flask_cors import CORS
 from mongoengine import connect, disconnect
 from flask_jwt_extended import JWTManager
 from flask_caching import Cache
-import redis
 from dotenv import load_dotenv
+from bson import ObjectId
+from werkzeug.middleware.proxy_fix import ProxyFix
 import urllib.parse
 
 # Load environment variables
@@ -17,6 +18,11 @@ load_dotenv()
 
 app = Flask(__name__)
 
+# Behind a reverse proxy, take client addresses (used by rate limiting)
+# from X-Forwarded-For, trusting that many proxy hops
+if os.getenv('TRUSTED_PROXY_HOPS'):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.getenv('TRUSTED_PROXY_HOPS')))
+
 # CORS configuration for React frontend
 CORS(app, origins=['http://localhost:3000', 'https://*.vercel.app'])
 
@@ -30,22 +36,41 @@ password = os.getenv('MONGO_PASSWORD')
 cluster = os.getenv('MONGO_CLUSTER')
 database = os.getenv('MONGO_DATABASE', 'bugtracker')
 
-if username and password and cluster:
+# MONGODB_HOST takes a full connection string, e.g. a local replica set:
+# mongodb://localhost:27017,localhost:27018,localhost:27019/bugtracker?replicaSet=rs0
+if os.getenv('MONGODB_HOST'):
+    mongodb_uri = os.getenv('MONGODB_HOST')
+elif username and password and cluster:
     encoded_password = urllib.parse.quote_plus(password)
     mongodb_uri = f"mongodb+srv://{username}:{encoded_password}@{cluster}/{database}?retryWrites=true&w=majority&appName=Cluster0"
 else:
-    mongodb_uri = 'mongodb://localhost:27017/bugtracker'
+    mongodb_uri = f'mongodb://localhost:27017/{database}'
+
+# Command listeners (profiler, slow query log) must exist before the client does
+import profiling
+import slow_queries  # noqa: F401
 
 # Connect to MongoDB using native MongoEngine
 connect(db=database, host=mongodb_uri)
 
 # Redis configuration
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'localhost'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    db=0,
-    decode_responses=True
-)
+from extensions import redis_client, mail
+
+# Mail configuration (notification digests are sent by the job worker)
+app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 25))
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', '0') == '1'
+app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@bugtracker.local')
+mail.init_app(app)
+
+# Per-route read preference and write concern, with read-your-writes
+import db_policy
+db_policy.init_app(app)
+
+# Admins can profile single requests with X-Profile: 1
+profiling.init_app(app)
 
 # Flask-Caching configuration
 cache_config = {
@@ -60,14 +85,50 @@ cache = Cache(app, config=cache_config)
 # Import models
 from models_mongo import User, Bug, BugComment
 
+from services import revocation
+
+# Tokens of deactivated (pending deletion) or deleted users stop working at
+# once rather than when they expire; one Redis lookup per authenticated request
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, jwt_payload):
+    if not ObjectId.is_valid(jwt_payload['sub']):
+        return True
+    # Batch sub-requests carry the token the batch call already checked
+    if request.environ.get(revocation.CHECKED_ENVIRON_KEY) == jwt_payload['sub']:
+        return False
+    return revocation.is_revoked(jwt_payload['sub'])
+
+@jwt.revoked_token_loader
+def _revoked_token_response(jwt_header, jwt_payload):
+    return jsonify({'message': 'Account is deactivated'}), 401
+
 # Import and register API blueprints
 from routes.auth_routes import auth_bp
 from routes.bug_routes import bug_bp
 from routes.user_routes import user_bp
+from routes.dashboard_routes import dashboard_bp
+from routes.batch_routes import batch_bp
+from routes.job_routes import job_bp
+from routes.project_routes import project_bp
+from routes.admin_routes import admin_bp
+from routes.filter_routes import filter_bp
 
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(bug_bp, url_prefix='/api/bugs')
 app.register_blueprint(user_bp, url_prefix='/api/users')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(batch_bp, url_prefix='/api/batch')
+app.register_blueprint(job_bp, url_prefix='/api/jobs')
+app.register_blueprint(project_bp, url_prefix='/api/projects')
+app.register_blueprint(admin_bp, url_prefix='/api/admin')
+app.register_blueprint(filter_bp, url_prefix='/api/filters')
+
+# Services that only listen to bug signals
+import services.notifications  # noqa: F401
+
+# Register CLI maintenance commands
+from commands import register_commands
+register_commands(app)
 
 @app.route('/api/health')
 def health_check():
@@ -97,6 +158,10 @@ def api_root():
             'auth': '/api/auth',
             'bugs': '/api/bugs',
             'users': '/api/users',
+            'dashboard': '/api/dashboard',
+            'batch': '/api/batch',
+            'jobs': '/api/jobs',
+            'projects': '/api/projects',
             'health': '/api/health'
         }
     })
@@ -0,0 +1,112 @@
+"""
+Flask CLI commands for Bug Tracker maintenance tasks
+Run with ``flask --app api/app.py <command>``
+"""
+
+import logging
+import os
+import time
+
+import click
+
+import tasks
+from services import bug_stats, tag_counts, duplicates, jobs, projects, archive, inbox, saved_filters, user_import
+
+
+def register_commands(app):
+    """Attach maintenance commands to the Flask CLI"""
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--every', type=int, default=0,
+                  help='Repeat every N seconds instead of running once')
+    def reconcile_stats(every):
+        """Recompute bug stat counters to correct any drift"""
+        while True:
+            total = bug_stats.reconcile_all()
+            click.echo(f'Reconciled stats: {total} bugs')
+            if not every:
+                break
+            time.sleep(every)
+
+    @app.cli.command('reconcile-tags')
+    def reconcile_tags():
+        """Rebuild tag usage counters from the bugs collection"""
+        count = tag_counts.reconcile()
+        click.echo(f'Reconciled {count} tags')
+
+    @app.cli.command('reconcile-filters')
+    def reconcile_filters():
+        """Recount the matches of every saved filter"""
+        count = saved_filters.reconcile()
+        click.echo(f'Recounted {count} saved filters')
+
+    @app.cli.command('reindex-duplicates')
+    def reindex_duplicates():
+        """Rebuild the MinHash signatures used for duplicate detection"""
+        count = duplicates.reindex()
+        click.echo(f'Indexed {count} bugs')
+
+    @app.cli.command('rebuild-inboxes')
+    def rebuild_inboxes():
+        """Rebuild the Redis inboxes of assigned and reported bugs"""
+        count = inbox.rebuild()
+        click.echo(f'Indexed {count} open bugs')
+
+    @app.cli.command('archive-bugs')
+    @click.option('--days', type=int, default=archive.ARCHIVE_AFTER_DAYS, show_default=True,
+                  help='Archive closed bugs not updated for this many days')
+    def archive_bugs(days):
+        """Move old closed bugs to the bugs_archive collection"""
+        count = archive.archive_old_bugs(days)
+        click.echo(f'Archived {count} bugs')
+
+    @app.cli.command('migrate-projects')
+    def migrate_projects():
+        """Move bugs without a project into the default project"""
+        moved = projects.adopt_unscoped_bugs()
+        click.echo(f'Moved {moved} bugs into project {projects.DEFAULT_PROJECT_KEY}')
+        # Counters and signatures were keyed by the old, empty project
+        tasks.rebuild_project_scoped()
+        click.echo('Rebuilt stats, tag counters, duplicate signatures and saved filter counts')
+
+    @app.cli.command('import-users')
+    @click.argument('source', type=click.File('rb'))
+    @click.option('--format', 'fmt', type=click.Choice(user_import.FORMATS),
+                  help='File format; defaults to the file extension')
+    def import_users(source, fmt):
+        """Create users from a CSV or NDJSON file (username, email, password, role)"""
+        if not fmt:
+            fmt = 'csv' if source.name.lower().endswith('.csv') else 'ndjson'
+        result = user_import.import_users(
+            user_import.read_rows(source, fmt),
+            progress=lambda done: click.echo(f'{done} rows processed')
+        )
+        for entry in result['rows']:
+            if entry['status'] == 'failed':
+                click.echo(f"line {entry['line']}: {entry.get('username') or '-'}: {entry['error']}")
+        click.echo(f"Created {result['created']} users, {result['failed']} failed")
+
+    @app.cli.command('snapshot')
+    @click.option('--out', 'directory', default=lambda: os.getenv('SNAPSHOT_DIR', 'snapshots'),
+                  show_default='$SNAPSHOT_DIR or ./snapshots', help='Directory for the Parquet files')
+    @click.option('--compact', is_flag=True, help='Fold delta files into the base files now')
+    def snapshot(directory, compact):
+        """Export bugs, comments and users changed since the last run to Parquet"""
+        # pyarrow is only needed here, not in the API workers
+        from services import snapshots
+        result = snapshots.export(directory, compact_now=compact)
+        since = result['since'].isoformat() if result['since'] else 'the beginning'
+        click.echo(
+            f"Exported {result['bugs']} bugs and {result['comments']} comments changed since {since}, "
+            f"{result['users']} users"
+        )
+        if result['compacted'] is not None:
+            click.echo(f"Compacted to {result['compacted']} bugs")
+
+    @app.cli.command('worker')
+    @click.option('--burst', is_flag=True, help='Exit once the queue is empty')
+    def worker(burst):
+        """Run a background job worker"""
+        # Job handlers are registered when app.py imports the job routes
+        logging.basicConfig(level=logging.INFO)
+        jobs.work(burst=burst)
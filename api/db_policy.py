@@ -0,0 +1,133 @@
+"""
+Per-route read preference and write concern
+Routes declare a policy with ``@db_policy.policy(name)``; while the route
+runs, every collection the models hand out carries that policy's read
+preference and write concern. Read-heavy routes may read from secondaries
+lagging at most MAX_STALENESS_SECONDS, except for users who wrote within
+that window: they read from the primary, so they always see their own
+writes. Any successful POST, PUT, PATCH or DELETE counts as a write unless
+its view is marked ``@db_policy.read_only``. Code outside a route (jobs, CLI commands) uses the connection
+defaults unless it enters ``using(name)``.
+"""
+
+import contextvars
+import functools
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+
+import redis
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from pymongo import ReadPreference
+from pymongo.read_preferences import SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+from extensions import redis_client
+
+# MongoDB rejects a maxStalenessSeconds below 90
+MAX_STALENESS_SECONDS = max(int(os.getenv('MONGO_MAX_STALENESS_SECONDS', 90)), 90)
+# Staleness is estimated from server heartbeats, so it can overshoot by one
+HEARTBEAT_SECONDS = 10
+
+RECENT_WRITE_KEY = 'bugtracker:recent-write:{}'
+
+# Acknowledged by the primary alone; for writes that are cheap to lose
+LIGHT_WRITE_CONCERN = WriteConcern(w=1)
+
+# None keeps the connection default (the URI's w=majority, primary reads)
+Policy = namedtuple('Policy', ['read_preference', 'write_concern'])
+
+POLICIES = {
+    'primary': Policy(ReadPreference.PRIMARY, None),
+    # Lists, stats and exports, where slightly stale counts are acceptable
+    'secondary': Policy(SecondaryPreferred(max_staleness=MAX_STALENESS_SECONDS), None),
+    'light_write': Policy(ReadPreference.PRIMARY, LIGHT_WRITE_CONCERN)
+}
+
+_WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+_current = contextvars.ContextVar('db_policy', default=None)
+
+
+def apply(collection):
+    """The collection with the current policy's options, if any"""
+    policy = _current.get()
+    if policy is None:
+        return collection
+    return collection.with_options(
+        read_preference=policy.read_preference,
+        write_concern=policy.write_concern
+    )
+
+
+@contextmanager
+def using(name):
+    """Run a block under a named policy"""
+    token = _current.set(POLICIES[name])
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def _wrote_recently(user_id):
+    try:
+        return bool(redis_client.exists(RECENT_WRITE_KEY.format(user_id)))
+    except redis.RedisError:
+        # Cannot tell, so stay consistent
+        return True
+
+
+def policy(name):
+    """Run a route under a named policy; place below ``@jwt_required()``"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            chosen = POLICIES[name]
+            if chosen.read_preference.mode != ReadPreference.PRIMARY.mode:
+                try:
+                    user_id = get_jwt_identity()
+                except RuntimeError:
+                    user_id = None
+                if user_id and _wrote_recently(user_id):
+                    chosen = chosen._replace(read_preference=ReadPreference.PRIMARY)
+            token = _current.set(chosen)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _current.reset(token)
+        return wrapper
+    return decorator
+
+
+def read_only(view):
+    """Mark a non-GET view that writes nothing, so it keeps secondary reads"""
+    view.db_read_only = True
+    return view
+
+
+def _remember_write(response):
+    if request.method not in _WRITE_METHODS or response.status_code >= 400:
+        return response
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'db_read_only', False):
+        return response
+    try:
+        user_id = get_jwt_identity()
+    except RuntimeError:
+        user_id = None
+    if user_id:
+        try:
+            redis_client.set(
+                RECENT_WRITE_KEY.format(user_id), 1,
+                ex=MAX_STALENESS_SECONDS + HEARTBEAT_SECONDS
+            )
+        except redis.RedisError:
+            pass
+    return response
+
+
+def init_app(app):
+    """Track each user's last write for read-your-writes"""
+    app.after_request(_remember_write)
@@ -0,0 +1,30 @@
+"""
+Shared clients used by the app and its services
+Kept out of app.py so routes and services can import them without a
+circular import.
+"""
+
+import os
+import redis
+from flask_mail import Mail
+
+# Redis configuration
+redis_client = redis.Redis(
+    host=os.getenv('REDIS_HOST', 'localhost'),
+    port=int(os.getenv('REDIS_PORT', 6379)),
+    db=0,
+    decode_responses=True
+)
+
+# Durable queues (jobs, pending notifications) must never be evicted, so
+# they may live on a separate Redis running with noeviction; without
+# REDIS_QUEUE_HOST they share the main instance
+queue_client = redis.Redis(
+    host=os.getenv('REDIS_QUEUE_HOST', os.getenv('REDIS_HOST', 'localhost')),
+    port=int(os.getenv('REDIS_QUEUE_PORT', os.getenv('REDIS_PORT', 6379))),
+    db=0,
+    decode_responses=True
+)
+
+# Flask-Mail, configured in app.py
+mail = Mail()
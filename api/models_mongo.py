@@ -5,14 +5,31 @@ Using MongoEngine for MongoDB integration
 
 from datetime import datetime
 from mongoengine import Document, EmbeddedDocument, fields
+from mongoengine.errors import OperationError
 from werkzeug.security import generate_password_hash, check_password_hash
 
-class User(Document):
+import db_policy
+
+class PolicyDocument(Document):
+    """Document whose collection follows the current route's read and write policy"""
+    
+    meta = {'abstract': True}
+    
+    @classmethod
+    def _get_collection(cls):
+        return db_policy.apply(super()._get_collection())
+
+class User(PolicyDocument):
     """User model for authentication and profile management"""
     
     meta = {
         'collection': 'users',
-        'indexes': ['username', 'email', 'google_id']
+        'indexes': [
+            'username', 'email', 'google_id',
+            # Case-insensitive index for anchored username prefix lookups
+            {'fields': ['username'], 'name': 'username_ci',
+             'collation': {'locale': 'en', 'strength': 2}}
+        ]
     }
     
     username = fields.StringField(max_length=50, required=True, unique=True)
@@ -42,6 +59,33 @@ class User(Document):
     def __str__(self):
         return f'<User {self.username}>'
 
+class Project(PolicyDocument):
+    """A team's project; bugs, stats and tags are scoped to one project"""
+    
+    meta = {
+        'collection': 'projects',
+        'indexes': ['members']
+    }
+    
+    key = fields.StringField(required=True, unique=True, max_length=32, regex=r'^[a-z0-9][a-z0-9-]*$')
+    name = fields.StringField(required=True, max_length=100)
+    description = fields.StringField(max_length=500)
+    owner = fields.ReferenceField(User, reverse_delete_rule=4)  # NULLIFY
+    # User ids; kept as plain ids so membership checks never load users
+    members = fields.ListField(fields.ObjectIdField())
+    # Open projects are visible to every user without membership
+    open_membership = fields.BooleanField(default=False)
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def delete(self, *args, **kwargs):
+        # Bug.project's DENY rule only sees hot bugs, not bugs_archive
+        if self._get_db()['bugs_archive'].find_one({'project': self.pk}, {'_id': 1}):
+            raise OperationError(f'Could not delete {self}: it still has archived bugs')
+        return super().delete(*args, **kwargs)
+    
+    def __str__(self):
+        return f'<Project {self.key}>'
+
 class BugComment(EmbeddedDocument):
     """Embedded document for bug comments"""
     
@@ -52,12 +96,25 @@ class BugComment(EmbeddedDocument):
     def __str__(self):
         return f'<Comment by {self.author.username}>'
 
-class Bug(Document):
+class Bug(PolicyDocument):
     """Bug model for tracking issues"""
     
     meta = {
         'collection': 'bugs',
-        'indexes': ['status', 'priority', 'reporter', 'assignee', 'created_at']
+        # Per-project queries lead with the project key, which is also the
+        # intended shard key; reporter, assignee and updated_at serve the
+        # cross-project user cascade and analytics export
+        'indexes': [
+            ('project', 'status'),
+            ('project', 'priority'),
+            ('project', 'assignee'),
+            ('project', '-created_at', '-id'),
+            ('project', 'tags'),
+            ('project', 'updated_at', 'id'),
+            'reporter',
+            'assignee',
+            ('updated_at', 'id')
+        ]
     }
     
     # Bug Status Choices
@@ -87,6 +144,10 @@ class Bug(Document):
     expected_behavior = fields.StringField()
     environment = fields.StringField(max_length=200)
     
+    # Lazy, so reading the project id never loads the project; a project
+    # with bugs cannot be deleted
+    project = fields.LazyReferenceField(Project, reverse_delete_rule=3)  # DENY
+    
     # User references
     reporter = fields.ReferenceField(User, required=True, reverse_delete_rule=2)  # CASCADE
     assignee = fields.ReferenceField(User, reverse_delete_rule=4)  # NULLIFY
@@ -127,3 +188,187 @@ class Bug(Document):
     
     def __str__(self):
         return f'<Bug {self.title}>'
+
+class BugStats(PolicyDocument):
+    """Incrementally maintained bug counters, one document per scope"""
+    
+    meta = {
+        'collection': 'bug_stats'
+    }
+    
+    scope = fields.StringField(primary_key=True)
+    total = fields.IntField(default=0)
+    status_counts = fields.DictField()
+    priority_counts = fields.DictField()
+    reconciled_at = fields.DateTimeField()
+    
+    def __str__(self):
+        return f'<BugStats {self.scope}>'
+
+class TagCount(PolicyDocument):
+    """Number of a project's bugs carrying a tag, maintained on bug writes"""
+    
+    meta = {
+        'collection': 'bug_tags',
+        'indexes': [('project', '-count')]
+    }
+    
+    # '<project id>:<tag>', so a project's tags by prefix are one _id range
+    id = fields.StringField(primary_key=True)
+    project = fields.ObjectIdField()
+    tag = fields.StringField(required=True)
+    count = fields.IntField(default=0)
+    
+    def __str__(self):
+        return f'<TagCount {self.tag}: {self.count}>'
+
+class SavedFilter(PolicyDocument):
+    """A user's saved bug list filter and its maintained match count"""
+    
+    meta = {
+        'collection': 'saved_filters',
+        'indexes': [('user', 'project'), 'project']
+    }
+    
+    user = fields.ObjectIdField(required=True)
+    project = fields.ObjectIdField()
+    name = fields.StringField(required=True, max_length=100)
+    # None matches any value
+    status = fields.StringField(choices=[choice for choice, _ in Bug.STATUS_CHOICES])
+    priority = fields.StringField(choices=[choice for choice, _ in Bug.PRIORITY_CHOICES])
+    assignee = fields.ObjectIdField()
+    unassigned = fields.BooleanField(default=False)
+    tags = fields.ListField(fields.StringField(max_length=50))
+    tags_mode = fields.StringField(default='any', choices=['any', 'all'])
+    # Hot bugs matching the filter, adjusted on every bug write
+    count = fields.IntField(default=0)
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<SavedFilter {self.name}>'
+
+class ActivityEvent(PolicyDocument):
+    """Append-only record of a change to a bug, kept in a capped collection"""
+    
+    meta = {
+        'collection': 'activity',
+        'max_size': 256 * 1024 * 1024,  # oldest events roll off past 256 MB
+        'indexes': [('bug', '-id'), ('actor', '-id')]
+    }
+    
+    # Plain ids rather than references: events outlive deleted bugs and users
+    bug = fields.ObjectIdField(required=True)
+    project = fields.ObjectIdField()
+    actor = fields.ObjectIdField()
+    kind = fields.StringField(required=True, choices=['created', 'updated', 'commented', 'deleted'])
+    title = fields.StringField()
+    changes = fields.DictField()
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<ActivityEvent {self.kind} on {self.bug}>'
+
+class RequestProfile(PolicyDocument):
+    """Sampled stacks and Mongo command timeline of one profiled request"""
+    
+    meta = {
+        'collection': 'request_profiles',
+        'max_size': 64 * 1024 * 1024,  # oldest profiles roll off past 64 MB
+        'indexes': ['-created_at']
+    }
+    
+    method = fields.StringField(required=True)
+    path = fields.StringField(required=True)
+    query_string = fields.StringField()
+    status = fields.IntField()
+    user = fields.ObjectIdField()
+    duration_ms = fields.FloatField()
+    interval_ms = fields.FloatField()
+    samples = fields.IntField(default=0)
+    # Folded stacks, root first and frames joined by ';', with sample counts
+    stacks = fields.ListField(fields.DictField())
+    # Each command's name, collection, start offset, duration and outcome
+    commands = fields.ListField(fields.DictField())
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<RequestProfile {self.method} {self.path}>'
+
+class SlowQuery(PolicyDocument):
+    """A MongoDB command slower than SLOW_QUERY_MS, with its redacted shape and plan"""
+    
+    meta = {
+        'collection': 'slow_queries',
+        'max_size': 64 * 1024 * 1024,  # oldest records roll off past 64 MB
+        'indexes': ['created_at']
+    }
+    
+    command = fields.StringField(required=True)
+    collection = fields.StringField()
+    # JSON of the filter, pipeline or update selectors with literals replaced by '?'
+    shape = fields.StringField(required=True)
+    shape_id = fields.StringField(required=True)
+    duration_ms = fields.FloatField(required=True)
+    route = fields.StringField()
+    plan = fields.DictField()
+    plan_stages = fields.ListField(fields.StringField())
+    explain_error = fields.StringField()
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<SlowQuery {self.command} on {self.collection}: {self.duration_ms} ms>'
+
+class Attachment(PolicyDocument):
+    """Metadata for a file attached to a bug; the content is the GridFS file with the same id"""
+    
+    meta = {
+        'collection': 'attachments',
+        'indexes': [('bug', 'created_at')]
+    }
+    
+    bug = fields.ObjectIdField(required=True)
+    filename = fields.StringField(required=True, max_length=255)
+    content_type = fields.StringField(required=True)
+    size = fields.IntField(required=True, min_value=0)
+    sha256 = fields.StringField(required=True)
+    uploaded_by = fields.ObjectIdField()
+    created_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<Attachment {self.filename}>'
+
+class BugSignature(PolicyDocument):
+    """MinHash signature and LSH band keys of a bug's text, keyed by bug id"""
+    
+    meta = {
+        'collection': 'bug_signatures',
+        'indexes': [('project', 'bands')]
+    }
+    
+    project = fields.ObjectIdField()
+    signature = fields.BinaryField(required=True)
+    bands = fields.ListField(fields.StringField())
+    updated_at = fields.DateTimeField(default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<BugSignature {self.id}>'
+
+# Sync tokens older than this must resync from scratch
+TOMBSTONE_TTL_SECONDS = 30 * 24 * 3600
+
+class BugTombstone(PolicyDocument):
+    """Marks a deleted bug for delta sync clients, keyed by the bug's id"""
+    
+    meta = {
+        'collection': 'bug_tombstones',
+        'indexes': [
+            {'fields': ['deleted_at'], 'expireAfterSeconds': TOMBSTONE_TTL_SECONDS},
+            ('project', 'deleted_at', 'id')
+        ]
+    }
+    
+    project = fields.ObjectIdField()
+    deleted_at = fields.DateTimeField(required=True, default=datetime.utcnow)
+    
+    def __str__(self):
+        return f'<BugTombstone {self.id}>'
@@ -0,0 +1,26 @@
+"""
+Offset pagination for MongoEngine querysets
+Listings paged by cursor instead carry the next page's cursor.
+"""
+
+import math
+
+
+class Pagination:
+    """One page of results plus the totals reported in API responses"""
+
+    def __init__(self, items, page, per_page, total, next_cursor=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = math.ceil(total / per_page) if per_page else 0
+        self.next_cursor = next_cursor
+
+
+def paginate(queryset, page, per_page):
+    """Count the queryset and fetch a single page of it"""
+    page = max(page, 1)
+    total = queryset.count()
+    items = list(queryset.skip((page - 1) * per_page).limit(per_page))
+    return Pagination(items, page, per_page, total)
@@ -0,0 +1,234 @@
+"""
+On-demand profiling of single requests
+An admin sends ``X-Profile: 1`` (or ``?profile=1``) to profile one
+request. A sampling thread records the request thread's stack every
+SAMPLE_INTERVAL_MS and a pymongo command listener records each command's
+start offset and duration. The folded stacks (flamegraph input) and the
+command timeline are saved to the capped ``request_profiles`` collection
+and listed under ``/api/admin/profiles``, with credentials such as the
+``?jwt=`` of streaming endpoints stripped from the query string. Requests without the flag pay
+one header lookup, and the listener returns at once while nothing is
+being profiled. Import this module before connecting to MongoDB, since
+pymongo only calls listeners registered before the client was created.
+"""
+
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode
+
+from flask import current_app, g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from pymongo import monitoring
+
+from models_mongo import User, RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ARG = 'profile'
+
+SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5))
+# Keep a profile well inside MongoDB's 16 MB document limit
+MAX_STACKS = 2000
+MAX_COMMANDS = 5000
+MAX_STACK_DEPTH = 128
+# Query parameters never saved with a profile, besides JWT_QUERY_STRING_NAME
+SECRET_ARG_PATTERN = re.compile(r'jwt|token|secret|passw|api_?key|signature', re.IGNORECASE)
+
+_current = contextvars.ContextVar('profile', default=None)
+# Number of requests being profiled in this process; the listener's fast path
+_active = 0
+_active_lock = threading.Lock()
+
+
+class _Sampler(threading.Thread):
+    """Counts the folded stacks of one thread at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+
+    def run(self):
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class _Profile:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.commands = []
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.sampler = _Sampler(threading.get_ident(), SAMPLE_INTERVAL_MS / 1000)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def command_started(self, event):
+        target = event.command.get(event.command_name)
+        with self._lock:
+            self._pending[event.request_id] = {
+                'command': event.command_name,
+                'collection': target if isinstance(target, str) else None,
+                'started_ms': round(self.elapsed_ms(), 3)
+            }
+
+    def command_finished(self, event, ok):
+        with self._lock:
+            entry = self._pending.pop(event.request_id, None)
+            if entry is None or len(self.commands) >= MAX_COMMANDS:
+                return
+            entry['duration_ms'] = event.duration_micros / 1000
+            entry['ok'] = ok
+            self.commands.append(entry)
+
+
+class _CommandTimeline(monitoring.CommandListener):
+    def started(self, event):
+        if not _active:
+            return
+        profile = _current.get()
+        if profile is not None:
+            profile.command_started(event)
+
+    def succeeded(self, event):
+        if not _active:
+            return
+        profile = _current.get()
+        if profile is not None:
+            profile.command_finished(event, True)
+
+    def failed(self, event):
+        if not _active:
+            return
+        profile = _current.get()
+        if profile is not None:
+            profile.command_finished(event, False)
+
+
+monitoring.register(_CommandTimeline())
+
+
+def _requested():
+    return request.headers.get(PROFILE_HEADER) == '1' or request.args.get(PROFILE_ARG) == '1'
+
+
+def _admin_id():
+    """The current user's id if they are an admin, else None"""
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        return None
+    if not user_id:
+        return None
+    user = User.objects(id=user_id).only('role').first()
+    return user_id if user and user.role == 'admin' else None
+
+
+def _start():
+    global _active
+    if not _requested():
+        return
+    user_id = _admin_id()
+    if not user_id:
+        return
+    profile = _Profile(user_id)
+    g.profile = profile
+    g.profile_token = _current.set(profile)
+    with _active_lock:
+        _active += 1
+    profile.sampler.start()
+
+
+def _stop():
+    global _active
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    _current.reset(g.pop('profile_token'))
+    with _active_lock:
+        _active -= 1
+    profile.sampler.stop()
+
+
+def _saved_query_string():
+    """The request's query string without credential parameters"""
+    token_arg = current_app.config.get('JWT_QUERY_STRING_NAME', 'jwt')
+    pairs = parse_qsl(request.query_string.decode('utf-8', 'replace'), keep_blank_values=True)
+    return urlencode([
+        (name, value) for name, value in pairs
+        if name != token_arg and not SECRET_ARG_PATTERN.search(name)
+    ])
+
+
+def _finish(response):
+    profile = g.get('profile')
+    if profile is None:
+        return response
+    duration_ms = profile.elapsed_ms()
+    _stop()
+    try:
+        saved = RequestProfile(
+            method=request.method,
+            path=request.path,
+            query_string=_saved_query_string(),
+            status=response.status_code,
+            user=profile.user_id,
+            duration_ms=duration_ms,
+            interval_ms=SAMPLE_INTERVAL_MS,
+            samples=profile.sampler.samples,
+            stacks=[
+                {'stack': stack, 'count': count}
+                for stack, count in profile.sampler.stacks.most_common(MAX_STACKS)
+            ],
+            commands=profile.commands,
+            created_at=profile.started_at
+        ).save()
+        response.headers['X-Profile-Id'] = str(saved.id)
+    except Exception:
+        logger.warning('Could not save profile of %s %s', request.method, request.path, exc_info=True)
+    return response
+
+
+def _cleanup(error=None):
+    # after_request is skipped when the view raised
+    _stop()
+
+
+def folded(profile):
+    """A saved profile's stacks in the folded format flamegraph tools read"""
+    return ''.join(f"{entry['stack']} {entry['count']}\n" for entry in profile.stacks)
+
+
+def init_app(app):
+    """Profile requests from admins that ask for it"""
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_cleanup)
@@ -0,0 +1,131 @@
+from flask import Blueprint, jsonify, Response, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models_mongo import User, RequestProfile
+from bson import ObjectId
+from datetime import datetime, timedelta
+from schemas import Schema, validate, integer
+import profiling
+import slow_queries
+
+admin_bp = Blueprint('admin', __name__)
+
+PROFILES_ARGS = Schema({'limit': integer(default=50, minimum=1, maximum=200, clamp=True)})
+
+SLOW_QUERIES_ARGS = Schema({
+    'hours': integer(default=24, minimum=1, maximum=24 * 30, clamp=True),
+    'limit': integer(default=20, minimum=1, maximum=100, clamp=True)
+})
+
+def _admin_error():
+    """An error response unless the current user is an admin"""
+    current_user = User.objects(id=get_jwt_identity()).only('role').first()
+    if not current_user or current_user.role != 'admin':
+        return jsonify({'message': 'Admin access required'}), 403
+    return None
+
+def _find_profile(profile_id, *only):
+    if not ObjectId.is_valid(profile_id):
+        return None
+    query = RequestProfile.objects(id=profile_id)
+    return (query.only(*only) if only else query).first()
+
+@admin_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+@validate(args=PROFILES_ARGS)
+def get_profiles():
+    """Recently profiled requests, newest first"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        
+        profiles = (
+            RequestProfile.objects
+            .only('id', 'method', 'path', 'query_string', 'status', 'user', 'duration_ms', 'samples', 'created_at')
+            .order_by('-created_at')
+            .limit(g.args['limit'])
+        )
+        return jsonify({'profiles': [{
+            'id': str(profile.id),
+            'method': profile.method,
+            'path': profile.path,
+            'query_string': profile.query_string,
+            'status': profile.status,
+            'user_id': str(profile.user) if profile.user else None,
+            'duration_ms': profile.duration_ms,
+            'samples': profile.samples,
+            'created_at': profile.created_at.isoformat() if profile.created_at else None
+        } for profile in profiles]}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch profiles', 'error': str(e)}), 500
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile(profile_id):
+    """A profile's Mongo command timeline and sampled stacks"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        
+        profile = _find_profile(profile_id)
+        if not profile:
+            return jsonify({'message': 'Profile not found'}), 404
+        
+        return jsonify({
+            'id': str(profile.id),
+            'method': profile.method,
+            'path': profile.path,
+            'query_string': profile.query_string,
+            'status': profile.status,
+            'user_id': str(profile.user) if profile.user else None,
+            'duration_ms': profile.duration_ms,
+            'interval_ms': profile.interval_ms,
+            'samples': profile.samples,
+            'commands': profile.commands,
+            'stacks': profile.stacks,
+            'flamegraph_url': f'/api/admin/profiles/{profile.id}/flamegraph',
+            'created_at': profile.created_at.isoformat() if profile.created_at else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch profile', 'error': str(e)}), 500
+
+@admin_bp.route('/profiles/<profile_id>/flamegraph', methods=['GET'])
+@jwt_required()
+def get_profile_flamegraph(profile_id):
+    """Folded stacks, for flamegraph.pl, speedscope or inferno"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        
+        profile = _find_profile(profile_id, 'stacks')
+        if not profile:
+            return jsonify({'message': 'Profile not found'}), 404
+        
+        return Response(profiling.folded(profile), mimetype='text/plain')
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch flamegraph', 'error': str(e)}), 500
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@jwt_required()
+@validate(args=SLOW_QUERIES_ARGS)
+def get_slow_queries():
+    """Query shapes that spent the most time above SLOW_QUERY_MS in the last ?hours="""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        
+        since = datetime.utcnow() - timedelta(hours=g.args['hours'])
+        return jsonify({
+            'threshold_ms': slow_queries.SLOW_QUERY_MS,
+            'since': since.isoformat(),
+            'shapes': slow_queries.worst_shapes(since, g.args['limit'])
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch slow queries', 'error': str(e)}), 500
@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify, redirect, url_for, session
+from flask import Blueprint, request, jsonify, redirect, url_for, session, g
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import check_password_hash, generate_password_hash
 from models_mongo import User
-import re
+from services import user_directory
+from services.rate_limit import rate_limit
+from schemas import Schema, validate, string, EMAIL_PATTERN
+import db_policy
 import os
 import requests
 from google.oauth2 import id_token
@@ -16,34 +19,29 @@ GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
 GOOGLE_REDIRECT_URI = os.getenv('GOOGLE_REDIRECT_URI')
 
-def validate_email(email):
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+# Request schemas, compiled once at import
+REGISTER_BODY = Schema({
+    'username': string(required=True, strip=True, min_length=3, max_length=50),
+    'email': string(required=True, strip=True, lower=True, max_length=254, pattern=EMAIL_PATTERN),
+    'password': string(required=True, min_length=6, max_length=128)
+})
 
+LOGIN_BODY = Schema({
+    'username': string(required=True, strip=True, min_length=1, max_length=254),
+    'password': string(required=True, min_length=1, max_length=128)
+})
+
+GOOGLE_CALLBACK_ARGS = Schema({'code': string(required=True, max_length=2048)})
+
+# Password hashing is deliberately slow, so these cost more tokens
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit(cost=10)
+@validate(body=REGISTER_BODY)
 def register():
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['username', 'email', 'password']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'message': f'{field} is required'}), 400
-        
-        username = data['username'].strip()
-        email = data['email'].strip().lower()
-        password = data['password']
-        
-        # Validate input
-        if len(username) < 3:
-            return jsonify({'message': 'Username must be at least 3 characters'}), 400
-        
-        if not validate_email(email):
-            return jsonify({'message': 'Invalid email format'}), 400
-        
-        if len(password) < 6:
-            return jsonify({'message': 'Password must be at least 6 characters'}), 400
+        username = g.body['username']
+        email = g.body['email']
+        password = g.body['password']
         
         # Check if user already exists
         if User.objects(username=username).first():
@@ -61,6 +59,7 @@ def register():
             auth_provider='local'
         )
         user.save()
+        user_directory.mark_changed()
         
         # Create access token
         access_token = create_access_token(identity=str(user.id))
@@ -80,15 +79,12 @@ def register():
         return jsonify({'message': 'Registration failed', 'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(cost=10, account=lambda: (request.get_json(silent=True) or {}).get('username'))
+@validate(body=LOGIN_BODY)
 def login():
     try:
-        data = request.get_json()
-        
-        if not data.get('username') or not data.get('password'):
-            return jsonify({'message': 'Username and password are required'}), 400
-        
-        username = data['username'].strip()
-        password = data['password']
+        username = g.body['username']
+        password = g.body['password']
         
         # Find user by username or email
         user = User.objects(username=username).first()
@@ -98,6 +94,9 @@ def login():
         if not user or not check_password_hash(user.password_hash, password):
             return jsonify({'message': 'Invalid credentials'}), 401
         
+        if not user.is_active:
+            return jsonify({'message': 'Account is deactivated'}), 403
+        
         # Create access token
         access_token = create_access_token(identity=str(user.id))
         
@@ -130,12 +129,11 @@ def google_login():
     return jsonify({'auth_url': google_auth_url})
 
 @auth_bp.route('/google/callback', methods=['GET'])
+@validate(args=GOOGLE_CALLBACK_ARGS)
 def google_callback():
     """Handle Google OAuth callback"""
     try:
-        code = request.args.get('code')
-        if not code:
-            return jsonify({'message': 'Authorization code not provided'}), 400
+        code = g.args['code']
 
         # Exchange code for tokens
         token_url = "https://oauth2.googleapis.com/token"
@@ -189,6 +187,9 @@ def google_callback():
                 role='user'
             )
             user.save()
+            user_directory.mark_changed()
+        elif not user.is_active:
+            return jsonify({'message': 'Account is deactivated'}), 403
         
         # Create access token
         access_token = create_access_token(identity=str(user.id))
@@ -234,6 +235,7 @@ def get_profile():
         return jsonify({'message': 'Failed to get profile', 'error': str(e)}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
+@db_policy.read_only
 @jwt_required()
 def logout():
     # In a real application, you might want to blacklist the token
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, current_app, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from schemas import Schema, validate, boolean, object_list
+from services import revocation
+import db_policy
+
+batch_bp = Blueprint('batch', __name__)
+
+# Upper bound on sub-requests per batch call
+MAX_SUB_REQUESTS = 20
+
+BATCH_BODY = Schema({
+    'requests': object_list(required=True, min_items=1, max_items=MAX_SUB_REQUESTS),
+    'parallel': boolean(default=True)
+})
+
+# Headers copied from the batch call onto every sub-request
+FORWARDED_HEADERS = ('Authorization',)
+
+_batch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='batch')
+
+def _dispatch(app, path, headers, remote_addr, user_id):
+    """Run one GET sub-request through the normal Flask dispatch"""
+    # A fresh app context keeps ``g`` isolated between sub-requests
+    with app.app_context(), app.test_request_context(
+        path, method='GET', headers=headers,
+        environ_base={'REMOTE_ADDR': remote_addr, revocation.CHECKED_ENVIRON_KEY: user_id}
+    ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            return 500, {'message': 'Sub-request failed', 'error': str(e)}
+
+        if response.is_streamed:
+            response.close()
+            return 400, {'message': 'Streaming endpoints cannot be batched'}
+
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return response.status_code, body
+
+@batch_bp.route('', methods=['POST'])
+@db_policy.read_only
+@jwt_required()
+@validate(body=BATCH_BODY)
+def run_batch():
+    """Dispatch several GET sub-requests in-process and return all responses"""
+    try:
+        sub_requests = g.body['requests']
+
+        for index, sub in enumerate(sub_requests):
+            path = sub.get('path')
+            method = sub.get('method', 'GET')
+            if not isinstance(path, str):
+                return jsonify({'message': f'Request {index} needs a path'}), 400
+            if not isinstance(method, str) or method.upper() != 'GET':
+                return jsonify({'message': 'Only GET requests can be batched'}), 400
+            if not path.startswith('/api/') or path.startswith('/api/batch'):
+                return jsonify({'message': f'Invalid path: {path}'}), 400
+
+        app = current_app._get_current_object()
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        remote_addr = request.remote_addr
+        paths = [sub['path'] for sub in sub_requests]
+
+        # The batch call has already checked the token against the revoked
+        # users; sub-requests only re-verify its signature in-process
+        user_id = get_jwt_identity()
+        if g.body['parallel']:
+            results = list(_batch_pool.map(
+                lambda path: _dispatch(app, path, headers, remote_addr, user_id), paths
+            ))
+        else:
+            results = [_dispatch(app, path, headers, remote_addr, user_id) for path in paths]
+
+        responses = []
+        for sub, (status, body) in zip(sub_requests, results):
+            responses.append({
+                'id': sub.get('id', sub['path']),
+                'status': status,
+                'body': body
+            })
+
+        return jsonify({'responses': responses}), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Batch request failed', 'error': str(e)}), 500
@@ -1,73 +1,383 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models_mongo import Bug, User, BugComment
+from models_mongo import Bug, User, BugComment, Attachment
 from datetime import datetime
+from collections import Counter
+import heapq
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.wsgi import FileWrapper
 from bson import ObjectId
+from signals import bug_created, bug_updated, bugs_deleted, comment_added
+from services import bug_stats, bug_events, tag_counts, activity, attachments, duplicates, sync, projects, archive
+from pagination import Pagination, paginate
+from schemas import Schema, validate, string, integer, boolean, string_list, page_args, page_window
+from services.rate_limit import rate_limit
+import db_policy
 
 bug_bp = Blueprint('bugs', __name__)
 
+# Fields compared before and after an update to build the change set
+TRACKED_FIELDS = [
+    'title', 'description', 'priority', 'status', 'tags',
+    'steps_to_reproduce', 'expected_behavior', 'environment', 'assignee'
+]
+
+STATUSES = [choice for choice, _ in Bug.STATUS_CHOICES]
+PRIORITIES = [choice for choice, _ in Bug.PRIORITY_CHOICES]
+
+# Request schemas, compiled once at import
+PROJECT_ARG = {'project': string(max_length=32)}
+
+LIST_ARGS = Schema(page_args(
+    **PROJECT_ARG,
+    status=string(default='all', choices=['all'] + STATUSES),
+    priority=string(default='all', choices=['all'] + PRIORITIES),
+    assignee=string(default='all', max_length=50),
+    search=string(default='', max_length=200),
+    tags=string_list(default=[], max_items=20, max_length=50),
+    tags_mode=string(default='any', choices=['any', 'all']),
+    facets=boolean(default=False),
+    include_archived=boolean(default=False),
+    after=string(max_length=100)
+), check=page_window)
+
+CHANGES_ARGS = Schema({
+    **PROJECT_ARG,
+    'since': string(max_length=200),
+    'limit': integer(default=100, minimum=1, maximum=sync.MAX_PAGE_SIZE, clamp=True)
+})
+
+# Fields a bug can be created or updated with; creation adds requirements
+# and defaults
+_BUG_FIELDS = {
+    'title': string(min_length=1, max_length=200),
+    'description': string(min_length=1),
+    'priority': string(choices=PRIORITIES),
+    'status': string(choices=STATUSES),
+    'assignee': string(nullable=True, max_length=50),
+    'tags': string_list(max_items=20, max_length=50),
+    'steps_to_reproduce': string(),
+    'expected_behavior': string(),
+    'environment': string(max_length=200)
+}
+
+CREATE_BODY = Schema({
+    **_BUG_FIELDS,
+    'title': string(required=True, min_length=1, max_length=200),
+    'description': string(required=True, min_length=1),
+    'priority': string(default='medium', choices=PRIORITIES),
+    'status': string(default='open', choices=STATUSES),
+    'tags': string_list(default=[], max_items=20, max_length=50),
+    'steps_to_reproduce': string(default=''),
+    'expected_behavior': string(default=''),
+    'environment': string(default='', max_length=200),
+    'project': string(nullable=True, max_length=32)
+})
+
+UPDATE_BODY = Schema(_BUG_FIELDS)
+
+COMMENT_BODY = Schema({'content': string(required=True, min_length=1, max_length=10000)})
+
+DUPLICATES_ARGS = Schema({
+    'limit': integer(default=duplicates.MAX_RESULTS, minimum=1, maximum=20, clamp=True)
+})
+
+HISTORY_ARGS = Schema({
+    'before': string(max_length=24),
+    'limit': integer(default=20, minimum=1, maximum=activity.MAX_PAGE_SIZE, clamp=True)
+})
+
+UPLOAD_ARGS = Schema({'filename': string(max_length=255)})
+
+PROJECT_ARGS = Schema(PROJECT_ARG)
+
+STREAM_ARGS = Schema({**PROJECT_ARG, 'lastEventId': string(max_length=64)})
+
+TAGS_ARGS = Schema({
+    **PROJECT_ARG,
+    'limit': integer(default=50, minimum=1, maximum=tag_counts.MAX_TAGS, clamp=True)
+})
+
+SUGGEST_ARGS = Schema({
+    **PROJECT_ARG,
+    'q': string(default='', max_length=50, strip=True),
+    'limit': integer(default=10, minimum=1, maximum=tag_counts.MAX_TAGS, clamp=True)
+})
+
+def _snapshot(bug):
+    """Capture the tracked fields of a bug, with references as id strings"""
+    snapshot = {}
+    for field in TRACKED_FIELDS:
+        value = getattr(bug, field)
+        if field == 'assignee':
+            value = str(value.id) if value else None
+        elif field == 'tags':
+            value = list(value or [])
+        snapshot[field] = value
+    return snapshot
+
+def _resolve_project(key):
+    """The requested project, or an error response if it is missing or off limits"""
+    try:
+        return projects.resolve(key, get_jwt_identity()), None
+    except projects.ProjectNotFound:
+        return None, (jsonify({'message': 'Project not found'}), 404)
+    except projects.ProjectAccessDenied:
+        return None, (jsonify({'message': 'You do not have access to this project'}), 403)
+
+def _find_bug(bug_id, *only, restore=False):
+    """A bug the current user may see, or an error response
+
+    Archived bugs are found too; with restore=True, for writes, they are
+    moved back to the hot collection once access is confirmed.
+    """
+    if not ObjectId.is_valid(bug_id):
+        return None, (jsonify({'message': 'Bug not found'}), 404)
+    query = Bug.objects(id=bug_id)
+    if only:
+        query = query.only('project', *only)
+    bug = query.first()
+    archived = bug is None
+    if archived:
+        bug = archive.find(bug_id)
+    if not bug:
+        return None, (jsonify({'message': 'Bug not found'}), 404)
+    try:
+        projects.check_bug_access(bug, get_jwt_identity())
+    except projects.ProjectAccessDenied:
+        return None, (jsonify({'message': 'You do not have access to this bug'}), 403)
+    if archived and restore:
+        bug = archive.restore(bug_id)
+        if not bug:
+            # Deleted since it was found
+            return None, (jsonify({'message': 'Bug not found'}), 404)
+    return bug, None
+
+def _serialize_bug_summary(bug):
+    """List representation of a bug, without comments and long text fields"""
+    return {
+        'id': str(bug.id),
+        'title': bug.title,
+        'description': bug.description,
+        'priority': bug.priority,
+        'status': bug.status,
+        'reporter': {
+            'id': str(bug.reporter.id),
+            'username': bug.reporter.username
+        } if bug.reporter else None,
+        'assignee': {
+            'id': str(bug.assignee.id),
+            'username': bug.assignee.username
+        } if bug.assignee else None,
+        'tags': bug.tags,
+        'created_at': bug.created_at.isoformat() if bug.created_at else None,
+        'updated_at': bug.updated_at.isoformat() if bug.updated_at else None
+    }
+
+def _match(filters, exclude=None):
+    """Combine per-dimension filters, optionally leaving one dimension out"""
+    return {field: value for field, value in filters.items() if field != exclude}
+
+def _count_map(rows):
+    return {row['_id']: row['count'] for row in rows if row['_id'] is not None}
+
+def _merge_tiers(results, per_page, facet_limit):
+    """Combine the $facet results of the hot and archived collections"""
+    bugs, next_cursor = archive.first_page(heapq.merge(
+        *([archive.to_bug(doc) for doc in result['page']] for result in results),
+        key=archive.newest_key, reverse=True
+    ), per_page)
+    merged = {
+        'bugs': bugs,
+        'next_cursor': next_cursor,
+        'total': [{'count': sum(result['total'][0]['count'] for result in results if result['total'])}]
+    }
+    for dimension in ('status', 'priority', 'assignee', 'tags'):
+        counts = Counter()
+        for result in results:
+            for row in result[dimension]:
+                counts[row['_id']] += row['count']
+        rows = [{'_id': value, 'count': count} for value, count in counts.most_common()]
+        merged[dimension] = rows[:facet_limit] if dimension in ('assignee', 'tags') else rows
+    return merged
+
+def _facet_query(base_query, filters, page, per_page, include_archived=False, cursor=None):
+    """Fetch one page plus facet counts in a single $facet aggregation
+
+    Each dimension's counts apply every other active filter but not its
+    own, so the sidebar shows what selecting another value would return.
+    With include_archived the aggregation also runs on the archive, each
+    tier returns one page past the cursor and the two are merged.
+    """
+    facet_limit = 20
+    if include_archived:
+        page_stages = [
+            {'$match': {'$and': [_match(filters), archive.before(cursor)]} if cursor else _match(filters)},
+            {'$sort': {'created_at': -1, '_id': -1}},
+            {'$limit': per_page + 1}
+        ]
+    else:
+        page_stages = [
+            {'$match': _match(filters)},
+            {'$sort': {'created_at': -1}},
+            {'$skip': (page - 1) * per_page},
+            {'$limit': per_page}
+        ]
+    pipeline = [
+        {'$match': base_query},
+        {'$facet': {
+            'page': page_stages,
+            'total': [
+                {'$match': _match(filters)},
+                {'$count': 'count'}
+            ],
+            'status': [
+                {'$match': _match(filters, 'status')},
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+            ],
+            'priority': [
+                {'$match': _match(filters, 'priority')},
+                {'$group': {'_id': '$priority', 'count': {'$sum': 1}}}
+            ],
+            'assignee': [
+                {'$match': _match(filters, 'assignee')},
+                {'$group': {'_id': '$assignee', 'count': {'$sum': 1}}},
+                {'$sort': {'count': -1}},
+                {'$limit': facet_limit}
+            ],
+            'tags': [
+                {'$match': _match(filters, 'tags')},
+                {'$unwind': '$tags'},
+                {'$group': {'_id': '$tags', 'count': {'$sum': 1}}},
+                {'$sort': {'count': -1}},
+                {'$limit': facet_limit}
+            ]
+        }}
+    ]
+    if include_archived:
+        result = _merge_tiers(
+            [next(Bug.objects.aggregate(pipeline)), next(archive.collection().aggregate(pipeline))],
+            per_page, facet_limit
+        )
+        bugs, next_cursor = result['bugs'], result['next_cursor']
+    else:
+        result = next(Bug.objects.aggregate(pipeline))
+        bugs, next_cursor = [Bug._from_son(doc) for doc in result['page']], None
+    total = result['total'][0]['count'] if result['total'] else 0
+
+    # Resolve assignee usernames with one query
+    assignee_ids = [row['_id'] for row in result['assignee'] if row['_id'] is not None]
+    usernames = {
+        user.id: user.username
+        for user in User.objects(id__in=assignee_ids).only('id', 'username')
+    }
+    assignee_counts = []
+    for row in result['assignee']:
+        if row['_id'] is None:
+            assignee_counts.append({'id': None, 'username': 'unassigned', 'count': row['count']})
+        elif row['_id'] in usernames:
+            assignee_counts.append({
+                'id': str(row['_id']),
+                'username': usernames[row['_id']],
+                'count': row['count']
+            })
+
+    status_counts = _count_map(result['status'])
+    priority_counts = _count_map(result['priority'])
+    facets = {
+        'status': {status: status_counts.get(status, 0) for status in bug_stats.STATUSES},
+        'priority': {priority: priority_counts.get(priority, 0) for priority in bug_stats.PRIORITIES},
+        'assignee': assignee_counts,
+        'tags': [{'tag': row['_id'], 'count': row['count']} for row in result['tags']]
+    }
+    return Pagination(bugs, page, per_page, total, next_cursor), facets
+
+# Regex search scans the collection, so it costs more than paging
 @bug_bp.route('', methods=['GET'])
 @jwt_required()
+@rate_limit(cost=lambda: 5 if request.args.get('search') else 1)
+@db_policy.policy('secondary')
+@validate(args=LIST_ARGS)
 def get_bugs():
     try:
-        # Get query parameters for filtering
-        status = request.args.get('status', 'all')
-        priority = request.args.get('priority', 'all')
-        assignee = request.args.get('assignee', 'all')
-        search = request.args.get('search', '')
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
+        args = g.args
+        project, error = _resolve_project(args.get('project'))
+        if error:
+            return error
         
-        # Build query
-        query = {}
+        # Get query parameters for filtering
+        status = args['status']
+        priority = args['priority']
+        assignee = args['assignee']
+        search = args['search']
+        tags = args['tags']
+        tags_mode = args['tags_mode']
+        page = args['page']
+        per_page = args['per_page']
+        include_facets = args['facets']
+        # Old closed bugs live in the archive and are left out unless asked for
+        include_archived = args['include_archived']
+        cursor = None
+        if include_archived:
+            # Two merged tiers have no cheap offset, so later pages follow
+            # the cursor returned with the previous one
+            if page > 1:
+                return jsonify({
+                    'message': 'With include_archived, request later pages with ?after=<next_cursor>'
+                }), 400
+            if args.get('after'):
+                try:
+                    cursor = archive.decode_cursor(args['after'])
+                except archive.InvalidCursor as e:
+                    return jsonify({'message': str(e)}), 400
+        
+        # Project and search apply to every facet; the remaining filters are
+        # kept per dimension so facet counts can leave their own filter out
+        base_query = {'project': project.id}
+        filters = {}
         
         if status != 'all':
-            query['status'] = status
+            filters['status'] = status
         
         if priority != 'all':
-            query['priority'] = priority
+            filters['priority'] = priority
         
         if assignee == 'unassigned':
-            query['assignee'] = None
+            filters['assignee'] = None
         elif assignee != 'all':
-            assignee_user = User.objects(username=assignee).first()
+            assignee_user = User.objects(username=assignee).only('id').first()
             if assignee_user:
-                query['assignee'] = assignee_user.id
+                filters['assignee'] = assignee_user.id
+        
+        if tags:
+            # Served by the multikey index on tags
+            filters['tags'] = {'$all': tags} if tags_mode == 'all' else {'$in': tags}
         
         if search:
-            query['$or'] = [
+            base_query['$or'] = [
                 {'title': {'$regex': search, '$options': 'i'}},
                 {'description': {'$regex': search, '$options': 'i'}}
             ]
         
         # Execute query with pagination
-        bugs = Bug.objects(**query).order_by('-created_at').paginate(
-            page=page, per_page=per_page
-        )
+        facets = None
+        if include_facets:
+            bugs, facets = _facet_query(base_query, filters, page, per_page, include_archived, cursor)
+        elif include_archived:
+            query = {**base_query, **filters}
+            total = Bug.objects(__raw__=query).count() + archive.collection().count_documents(query)
+            merged, next_cursor = archive.newest_first(query, per_page, cursor)
+            bugs = Pagination(merged, page, per_page, total, next_cursor)
+        else:
+            bugs = paginate(
+                Bug.objects(__raw__={**base_query, **filters}).order_by('-created_at'),
+                page, per_page
+            )
         
         # Format response
-        bugs_data = []
-        for bug in bugs.items:
-            bugs_data.append({
-                'id': str(bug.id),
-                'title': bug.title,
-                'description': bug.description,
-                'priority': bug.priority,
-                'status': bug.status,
-                'reporter': {
-                    'id': str(bug.reporter.id),
-                    'username': bug.reporter.username
-                } if bug.reporter else None,
-                'assignee': {
-                    'id': str(bug.assignee.id),
-                    'username': bug.assignee.username
-                } if bug.assignee else None,
-                'tags': bug.tags,
-                'created_at': bug.created_at.isoformat() if bug.created_at else None,
-                'updated_at': bug.updated_at.isoformat() if bug.updated_at else None
-            })
+        bugs_data = [_serialize_bug_summary(bug) for bug in bugs.items]
         
-        return jsonify({
+        response = {
             'bugs': bugs_data,
             'pagination': {
                 'page': page,
@@ -75,19 +385,54 @@ def get_bugs():
                 'total': bugs.total,
                 'pages': bugs.pages
             }
-        }), 200
+        }
+        if include_archived:
+            response['pagination']['next_cursor'] = bugs.next_cursor
+        if facets is not None:
+            response['facets'] = facets
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch bugs', 'error': str(e)}), 500
 
+# Sync cursors advance past what was read, so a lagging secondary could
+# make clients skip writes for good
+@bug_bp.route('/changes', methods=['GET'])
+@jwt_required()
+@db_policy.policy('primary')
+@validate(args=CHANGES_ARGS)
+def get_bug_changes():
+    """Delta sync: bugs created or updated and ids deleted since ?since=<token>"""
+    try:
+        project, error = _resolve_project(g.args.get('project'))
+        if error:
+            return error
+        
+        try:
+            result = sync.changes(project.id, g.args.get('since'), g.args['limit'])
+        except sync.ExpiredToken as e:
+            return jsonify({'message': str(e)}), 410
+        except sync.InvalidToken as e:
+            return jsonify({'message': str(e)}), 400
+        
+        return jsonify({
+            'bugs': [_serialize_bug_summary(bug) for bug in result['bugs']],
+            'deleted': result['deleted'],
+            'next_token': result['next_token'],
+            'has_more': result['has_more']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch bug changes', 'error': str(e)}), 500
+
 @bug_bp.route('/<bug_id>', methods=['GET'])
 @jwt_required()
 def get_bug(bug_id):
     try:
-        bug = Bug.objects(id=bug_id).first()
-        
-        if not bug:
-            return jsonify({'message': 'Bug not found'}), 404
+        bug, error = _find_bug(bug_id)
+        if error:
+            return error
         
         # Get comments
         comments_data = []
@@ -117,6 +462,7 @@ def get_bug(bug_id):
                 'username': bug.assignee.username
             } if bug.assignee else None,
             'tags': bug.tags,
+            'project': projects.summary_of(projects.project_id_of(bug)),
             'steps_to_reproduce': bug.steps_to_reproduce,
             'expected_behavior': bug.expected_behavior,
             'environment': bug.environment,
@@ -132,6 +478,7 @@ def get_bug(bug_id):
 
 @bug_bp.route('', methods=['POST'])
 @jwt_required()
+@validate(body=CREATE_BODY)
 def create_bug():
     try:
         user_id = get_jwt_identity()
@@ -140,11 +487,11 @@ def create_bug():
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        data = request.get_json()
+        data = g.body
         
-        # Validate required fields
-        if not data.get('title') or not data.get('description'):
-            return jsonify({'message': 'Title and description are required'}), 400
+        project, error = _resolve_project(data.get('project'))
+        if error:
+            return error
         
         # Handle assignee
         assignee = None
@@ -155,21 +502,30 @@ def create_bug():
         bug = Bug(
             title=data['title'],
             description=data['description'],
-            priority=data.get('priority', 'medium'),
-            status=data.get('status', 'open'),
+            priority=data['priority'],
+            status=data['status'],
             reporter=user,
             assignee=assignee,
-            tags=data.get('tags', []),
-            steps_to_reproduce=data.get('steps_to_reproduce', ''),
-            expected_behavior=data.get('expected_behavior', ''),
-            environment=data.get('environment', ''),
+            tags=data['tags'],
+            steps_to_reproduce=data['steps_to_reproduce'],
+            expected_behavior=data['expected_behavior'],
+            environment=data['environment'],
+            project=project,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
         bug.save()
+        bug_created.send(current_app._get_current_object(), bug=bug, actor=user_id)
+        
+        # The bug is saved either way; duplicate hints are best effort
+        try:
+            possible_duplicates = duplicates.duplicates_of(bug)
+        except Exception:
+            possible_duplicates = []
         
         return jsonify({
             'message': 'Bug created successfully',
+            'possible_duplicates': possible_duplicates,
             'bug': {
                 'id': str(bug.id),
                 'title': bug.title,
@@ -185,6 +541,7 @@ def create_bug():
                     'username': bug.assignee.username
                 } if bug.assignee else None,
                 'tags': bug.tags,
+                'project': projects.summary(project),
                 'created_at': bug.created_at.isoformat()
             }
         }), 201
@@ -194,14 +551,15 @@ def create_bug():
 
 @bug_bp.route('/<bug_id>', methods=['PUT'])
 @jwt_required()
+@validate(body=UPDATE_BODY)
 def update_bug(bug_id):
     try:
-        bug = Bug.objects(id=bug_id).first()
-        
-        if not bug:
-            return jsonify({'message': 'Bug not found'}), 404
+        bug, error = _find_bug(bug_id, restore=True)
+        if error:
+            return error
         
-        data = request.get_json()
+        data = g.body
+        before = _snapshot(bug)
         
         # Update fields
         if 'title' in data:
@@ -232,6 +590,17 @@ def update_bug(bug_id):
         bug.updated_at = datetime.utcnow()
         bug.save()
         
+        after = _snapshot(bug)
+        changes = {
+            field: (before[field], after[field])
+            for field in TRACKED_FIELDS
+            if before[field] != after[field]
+        }
+        if changes:
+            bug_updated.send(
+                current_app._get_current_object(), bug=bug, changes=changes, actor=get_jwt_identity()
+            )
+        
         return jsonify({
             'message': 'Bug updated successfully',
             'bug': {
@@ -249,12 +618,12 @@ def update_bug(bug_id):
 @jwt_required()
 def delete_bug(bug_id):
     try:
-        bug = Bug.objects(id=bug_id).first()
-        
-        if not bug:
-            return jsonify({'message': 'Bug not found'}), 404
+        bug, error = _find_bug(bug_id, restore=True)
+        if error:
+            return error
         
         bug.delete()
+        bugs_deleted.send(current_app._get_current_object(), bugs=[bug], actor=get_jwt_identity())
         
         return jsonify({'message': 'Bug deleted successfully'}), 200
         
@@ -263,26 +632,23 @@ def delete_bug(bug_id):
 
 @bug_bp.route('/<bug_id>/comments', methods=['POST'])
 @jwt_required()
+@db_policy.policy('light_write')
+@validate(body=COMMENT_BODY)
 def add_comment(bug_id):
     try:
         user_id = get_jwt_identity()
         user = User.objects(id=user_id).first()
-        bug = Bug.objects(id=bug_id).first()
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        if not bug:
-            return jsonify({'message': 'Bug not found'}), 404
-        
-        data = request.get_json()
-        
-        if not data.get('content'):
-            return jsonify({'message': 'Comment content is required'}), 400
+        bug, error = _find_bug(bug_id, restore=True)
+        if error:
+            return error
         
         # Create comment
         comment = BugComment(
-            content=data['content'],
+            content=g.body['content'],
             author=user,
             created_at=datetime.utcnow()
         )
@@ -291,6 +657,7 @@ def add_comment(bug_id):
         bug.comments.append(comment)
         bug.updated_at = datetime.utcnow()
         bug.save()
+        comment_added.send(current_app._get_current_object(), bug=bug, comment=comment, actor=user_id)
         
         return jsonify({
             'message': 'Comment added successfully',
@@ -307,33 +674,250 @@ def add_comment(bug_id):
     except Exception as e:
         return jsonify({'message': 'Failed to add comment', 'error': str(e)}), 500
 
+@bug_bp.route('/<bug_id>/duplicates', methods=['GET'])
+@jwt_required()
+@validate(args=DUPLICATES_ARGS)
+def get_bug_duplicates(bug_id):
+    """Bugs whose title and description closely resemble this one"""
+    try:
+        bug, error = _find_bug(bug_id, 'id', 'title', 'description')
+        if error:
+            return error
+        
+        return jsonify({'duplicates': duplicates.duplicates_of(bug, g.args['limit'])}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to find duplicates', 'error': str(e)}), 500
+
+@bug_bp.route('/<bug_id>/history', methods=['GET'])
+@jwt_required()
+@validate(args=HISTORY_ARGS)
+def get_bug_history(bug_id):
+    """Change history of a bug, newest first, paged with ?before=<cursor>
+
+    Deleted bugs keep their history; access to it follows the project the
+    bug was last in, as recorded on its events.
+    """
+    try:
+        bug, error = _find_bug(bug_id, 'id')
+        if error:
+            if error[1] != 404 or not ObjectId.is_valid(bug_id):
+                return error
+            last_event = activity.last_event_of(bug_id)
+            if not last_event:
+                return error
+            try:
+                projects.check_project_access(last_event.get('project'), get_jwt_identity())
+            except projects.ProjectAccessDenied:
+                return jsonify({'message': 'You do not have access to this bug'}), 403
+        
+        viewable = projects.accessible_project_ids(get_jwt_identity())
+        try:
+            page = activity.bug_history(bug_id, viewable, g.args.get('before'), g.args['limit'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        return jsonify(page), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch bug history', 'error': str(e)}), 500
+
+@bug_bp.route('/<bug_id>/attachments', methods=['GET'])
+@jwt_required()
+def list_attachments(bug_id):
+    try:
+        bug, error = _find_bug(bug_id, 'id')
+        if error:
+            return error
+        
+        files = Attachment.objects(bug=bug_id).order_by('created_at')
+        return jsonify({'attachments': [attachments.serialize(a) for a in files]}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch attachments', 'error': str(e)}), 500
+
+@bug_bp.route('/<bug_id>/attachments', methods=['POST'])
+@jwt_required()
+@validate(args=UPLOAD_ARGS)
+def upload_attachment(bug_id):
+    """Upload the raw request body as a file; name it with ?filename="""
+    try:
+        bug, error = _find_bug(bug_id, 'id')
+        if error:
+            return error
+        
+        if request.content_length and request.content_length > attachments.MAX_ATTACHMENT_BYTES:
+            return jsonify({'message': 'Attachment too large'}), 413
+        
+        try:
+            attachment = attachments.store(
+                bug_id,
+                request.stream,
+                g.args.get('filename'),
+                request.mimetype,
+                uploaded_by=get_jwt_identity()
+            )
+        except attachments.AttachmentTooLarge as e:
+            return jsonify({'message': str(e)}), 413
+        
+        return jsonify({
+            'message': 'Attachment uploaded successfully',
+            'attachment': attachments.serialize(attachment)
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to upload attachment', 'error': str(e)}), 500
+
+@bug_bp.route('/<bug_id>/attachments/<attachment_id>', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def download_attachment(bug_id, attachment_id):
+    """Stream an attachment; supports Range, If-Range and If-None-Match"""
+    try:
+        if not ObjectId.is_valid(bug_id) or not ObjectId.is_valid(attachment_id):
+            return jsonify({'message': 'Attachment not found'}), 404
+        
+        bug, error = _find_bug(bug_id, 'id')
+        if error:
+            return error
+        
+        attachment = Attachment.objects(id=attachment_id, bug=bug_id).first()
+        if not attachment:
+            return jsonify({'message': 'Attachment not found'}), 404
+        
+        # GridOut is seekable, so ranges seek instead of reading from the start
+        response = Response(
+            FileWrapper(attachments.open_content(attachment), attachments.CHUNK_SIZE),
+            mimetype=attachment.content_type,
+            direct_passthrough=True
+        )
+        response.content_length = attachment.size
+        response.set_etag(attachment.sha256)
+        response.last_modified = attachment.created_at
+        response.cache_control.private = True
+        response.cache_control.max_age = 3600
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers.set(
+            'Content-Disposition',
+            'inline' if attachments.is_inline(attachment) else 'attachment',
+            filename=attachment.filename
+        )
+        try:
+            return response.make_conditional(request, accept_ranges=True, complete_length=attachment.size)
+        except RequestedRangeNotSatisfiable:
+            response.close()
+            return jsonify({'message': 'Requested range not satisfiable'}), 416, {
+                'Content-Range': f'bytes */{attachment.size}'
+            }
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to download attachment', 'error': str(e)}), 500
+
+@bug_bp.route('/<bug_id>/attachments/<attachment_id>', methods=['DELETE'])
+@jwt_required()
+def delete_attachment(bug_id, attachment_id):
+    try:
+        if not ObjectId.is_valid(bug_id) or not ObjectId.is_valid(attachment_id):
+            return jsonify({'message': 'Attachment not found'}), 404
+        
+        bug, error = _find_bug(bug_id, 'id')
+        if error:
+            return error
+        
+        attachment = Attachment.objects(id=attachment_id, bug=bug_id).first()
+        if not attachment:
+            return jsonify({'message': 'Attachment not found'}), 404
+        
+        current_user_id = get_jwt_identity()
+        if str(attachment.uploaded_by) != current_user_id:
+            current_user = User.objects(id=current_user_id).first()
+            if not current_user or current_user.role != 'admin':
+                return jsonify({'message': 'Only the uploader or an admin can delete this attachment'}), 403
+        
+        attachments.delete(attachment)
+        return jsonify({'message': 'Attachment deleted successfully'}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to delete attachment', 'error': str(e)}), 500
+
 @bug_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@rate_limit(cost=2)
+@db_policy.policy('secondary')
+@validate(args=PROJECT_ARGS)
 def get_bug_stats():
     try:
-        # Get status counts
-        status_counts = {
-            'open': Bug.objects(status='open').count(),
-            'inProgress': Bug.objects(status='in_progress').count(),
-            'resolved': Bug.objects(status='resolved').count(),
-            'closed': Bug.objects(status='closed').count()
-        }
+        project, error = _resolve_project(g.args.get('project'))
+        if error:
+            return error
         
-        # Get priority counts
-        priority_counts = {
-            'low': Bug.objects(priority='low').count(),
-            'medium': Bug.objects(priority='medium').count(),
-            'high': Bug.objects(priority='high').count(),
-            'critical': Bug.objects(priority='critical').count()
+        stats = bug_stats.get_stats(bug_stats.scope_of(project.id))
+        return jsonify(bug_stats.format_stats(stats)), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to get stats', 'error': str(e)}), 500
+
+@bug_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+@validate(args=STREAM_ARGS)
+def stream_bugs():
+    """Server-Sent Events feed of one project's bug changes"""
+    project, error = _resolve_project(g.args.get('project'))
+    if error:
+        return error
+    
+    # EventSource cannot set headers, so the token may come as ?jwt=
+    last_event_id = request.headers.get('Last-Event-ID') or g.args.get('lastEventId')
+    try:
+        client_queue = bug_events.subscribe()
+    except bug_events.StreamLimitReached:
+        return jsonify({'message': 'Too many live connections, try again later'}), 503, {'Retry-After': '30'}
+
+    response = Response(
+        bug_events.event_stream(client_queue, project.id, last_event_id),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
         }
+    )
+    # Frees the slot even if the client leaves before the stream starts
+    response.call_on_close(lambda: bug_events.unsubscribe(client_queue))
+    return response
+
+@bug_bp.route('/tags', methods=['GET'])
+@jwt_required()
+@db_policy.policy('secondary')
+@validate(args=TAGS_ARGS)
+def get_tags():
+    """Tag cloud: tag usage counts from the maintained counters"""
+    try:
+        project, error = _resolve_project(g.args.get('project'))
+        if error:
+            return error
         
-        total_bugs = Bug.objects.count()
+        return jsonify({'tags': tag_counts.top_tags(project.id, g.args['limit'])}), 200
         
-        return jsonify({
-            'totalBugs': total_bugs,
-            'statusCounts': status_counts,
-            'priorityCounts': priority_counts
-        }), 200
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch tags', 'error': str(e)}), 500
+
+@bug_bp.route('/tags/suggest', methods=['GET'])
+@jwt_required()
+@db_policy.policy('secondary')
+@validate(args=SUGGEST_ARGS)
+def suggest_tags():
+    """Tag autocomplete by prefix, most used first"""
+    try:
+        prefix = g.args['q']
+        
+        if not prefix:
+            return jsonify({'tags': []}), 200
+        
+        project, error = _resolve_project(g.args.get('project'))
+        if error:
+            return error
+        
+        return jsonify({'tags': tag_counts.suggest(project.id, prefix, g.args['limit'])}), 200
         
     except Exception as e:
-        return jsonify({'message': 'Failed to get stats', 'error': str(e)}), 500
+        return jsonify({'message': 'Failed to suggest tags', 'error': str(e)}), 500
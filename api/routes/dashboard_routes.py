@@ -0,0 +1,98 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models_mongo import Bug
+from bson import ObjectId
+from services import archive, bug_stats, projects
+from schemas import Schema, validate, string, integer
+import db_policy
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Request schemas, compiled once at import
+DASHBOARD_ARGS = Schema({
+    'project': string(max_length=32),
+    'limit': integer(default=5, minimum=1, maximum=50, clamp=True)
+})
+
+# Shared pool for the independent dashboard queries; pymongo is thread-safe
+_query_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dashboard')
+
+def _submit(func, *args):
+    """Run func in the pool under the request's database policy"""
+    return _query_pool.submit(contextvars.copy_context().run, func, *args)
+
+def _recent_bugs(project_id, limit):
+    bugs = (
+        Bug.objects(project=project_id)
+        .only('id', 'title', 'priority', 'status', 'reporter', 'assignee', 'created_at')
+        .order_by('-created_at')
+        .limit(limit)
+        .select_related(max_depth=1)
+    )
+    return [{
+        'id': str(bug.id),
+        'title': bug.title,
+        'priority': bug.priority,
+        'status': bug.status,
+        'reporter': {
+            'id': str(bug.reporter.id),
+            'username': bug.reporter.username
+        } if bug.reporter else None,
+        'assignee': {
+            'id': str(bug.assignee.id),
+            'username': bug.assignee.username
+        } if bug.assignee else None,
+        'created_at': bug.created_at.isoformat() if bug.created_at else None
+    } for bug in bugs]
+
+def _assigned_counts(project_id, user_id):
+    # Both tiers, like the stats shown next to it
+    pipeline = [
+        {'$match': {'project': project_id, 'assignee': ObjectId(user_id)}},
+        {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+    ]
+    counts = {status: 0 for status in bug_stats.STATUSES}
+    for row in archive.aggregate_both(pipeline):
+        if row['_id'] in counts:
+            counts[row['_id']] += row['count']
+    return {
+        'total': sum(counts.values()),
+        'statusCounts': {
+            'open': counts['open'],
+            'inProgress': counts['in_progress'],
+            'resolved': counts['resolved'],
+            'closed': counts['closed']
+        }
+    }
+
+@dashboard_bp.route('', methods=['GET'])
+@jwt_required()
+@db_policy.policy('secondary')
+@validate(args=DASHBOARD_ARGS)
+def get_dashboard():
+    """A project's recent bugs, stats and the caller's assigned counts in one response"""
+    try:
+        user_id = get_jwt_identity()
+        limit = g.args['limit']
+        try:
+            project = projects.resolve(g.args.get('project'), user_id)
+        except projects.ProjectNotFound:
+            return jsonify({'message': 'Project not found'}), 404
+        except projects.ProjectAccessDenied:
+            return jsonify({'message': 'You do not have access to this project'}), 403
+
+        # The three lookups are independent, so run them concurrently
+        recent = _submit(_recent_bugs, project.id, limit)
+        stats = _submit(bug_stats.get_stats, bug_stats.scope_of(project.id))
+        assigned = _submit(_assigned_counts, project.id, user_id)
+
+        data = bug_stats.format_stats(stats.result())
+        data['recentBugs'] = recent.result()
+        data['assignedToMe'] = assigned.result()
+
+        return jsonify(data), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Failed to load dashboard', 'error': str(e)}), 500
@@ -0,0 +1,154 @@
+from flask import Blueprint, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models_mongo import Bug, Project, SavedFilter, User
+from bson import ObjectId
+from datetime import datetime
+from schemas import Schema, validate, string, string_list
+from services import projects, saved_filters
+
+filter_bp = Blueprint('filters', __name__)
+
+STATUSES = [choice for choice, _ in Bug.STATUS_CHOICES]
+PRIORITIES = [choice for choice, _ in Bug.PRIORITY_CHOICES]
+
+# Request schemas, compiled once at import
+LIST_ARGS = Schema({'project': string(max_length=32)})
+
+# The structured filters of GET /api/bugs, with the same defaults
+CREATE_BODY = Schema({
+    'name': string(required=True, strip=True, min_length=1, max_length=100),
+    'project': string(nullable=True, max_length=32),
+    'status': string(default='all', choices=['all'] + STATUSES),
+    'priority': string(default='all', choices=['all'] + PRIORITIES),
+    'assignee': string(default='all', max_length=50),
+    'tags': string_list(default=[], max_items=20, max_length=50),
+    'tags_mode': string(default='any', choices=['any', 'all'])
+})
+
+def _serialize(saved, project, usernames):
+    """A saved filter with its count and the GET /api/bugs parameters it stands for"""
+    if saved.unassigned:
+        assignee = 'unassigned'
+    elif saved.assignee:
+        assignee = usernames.get(saved.assignee)
+    else:
+        assignee = 'all'
+    params = {
+        'project': project.key if project else None,
+        'status': saved.status or 'all',
+        'priority': saved.priority or 'all',
+        'assignee': assignee,
+        'tags': ','.join(saved.tags),
+        'tags_mode': saved.tags_mode
+    }
+    return {
+        'id': str(saved.id),
+        'name': saved.name,
+        'project': projects.summary(project) if project else None,
+        'params': params,
+        'count': saved.count,
+        'created_at': saved.created_at.isoformat() if saved.created_at else None
+    }
+
+@filter_bp.route('', methods=['GET'])
+@jwt_required()
+@validate(args=LIST_ARGS)
+def get_filters():
+    """The current user's saved filters with their live match counts"""
+    try:
+        query = SavedFilter.objects(user=get_jwt_identity())
+        if g.args.get('project'):
+            project = Project.objects(key=g.args['project']).only('id').first()
+            if not project:
+                return jsonify({'message': 'Project not found'}), 404
+            query = query.filter(project=project.id)
+
+        filters = list(query.order_by('name'))
+        projects_by_id = {
+            project.id: project
+            for project in Project.objects(id__in=list({saved.project for saved in filters}))
+        } if filters else {}
+        assignee_ids = [saved.assignee for saved in filters if saved.assignee]
+        usernames = {
+            user.id: user.username
+            for user in User.objects(id__in=assignee_ids).only('id', 'username')
+        } if assignee_ids else {}
+
+        return jsonify({
+            'filters': [
+                _serialize(saved, projects_by_id.get(saved.project), usernames)
+                for saved in filters
+            ]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch filters', 'error': str(e)}), 500
+
+@filter_bp.route('', methods=['POST'])
+@jwt_required()
+@validate(body=CREATE_BODY)
+def create_filter():
+    """Save a bug filter for the current user"""
+    try:
+        current_user_id = get_jwt_identity()
+        data = g.body
+
+        try:
+            project = projects.resolve(data.get('project'), current_user_id)
+        except projects.ProjectNotFound:
+            return jsonify({'message': 'Project not found'}), 404
+        except projects.ProjectAccessDenied:
+            return jsonify({'message': 'You do not have access to this project'}), 403
+
+        if SavedFilter.objects(user=current_user_id).count() >= saved_filters.MAX_FILTERS_PER_USER:
+            return jsonify({
+                'message': f'At most {saved_filters.MAX_FILTERS_PER_USER} saved filters per user'
+            }), 400
+
+        assignee = None
+        if data['assignee'] not in ('all', 'unassigned'):
+            assignee = User.objects(username=data['assignee']).only('id', 'username').first()
+            if not assignee:
+                return jsonify({'message': 'Assignee not found'}), 404
+
+        saved = SavedFilter(
+            user=ObjectId(current_user_id),
+            project=project.id,
+            name=data['name'],
+            status=None if data['status'] == 'all' else data['status'],
+            priority=None if data['priority'] == 'all' else data['priority'],
+            assignee=assignee.id if assignee else None,
+            unassigned=data['assignee'] == 'unassigned',
+            tags=data['tags'],
+            tags_mode=data['tags_mode'],
+            created_at=datetime.utcnow()
+        )
+        # Counted before inserting, so the insert never overwrites $inc
+        # adjustments; a write landing in between is fixed by reconcile()
+        saved.count = saved_filters.count(saved)
+        saved.save()
+
+        usernames = {assignee.id: assignee.username} if assignee else {}
+        return jsonify({
+            'message': 'Filter saved successfully',
+            'filter': _serialize(saved, project, usernames)
+        }), 201
+
+    except Exception as e:
+        return jsonify({'message': 'Failed to save filter', 'error': str(e)}), 500
+
+@filter_bp.route('/<filter_id>', methods=['DELETE'])
+@jwt_required()
+def delete_filter(filter_id):
+    try:
+        if not ObjectId.is_valid(filter_id):
+            return jsonify({'message': 'Filter not found'}), 404
+
+        deleted = SavedFilter.objects(id=filter_id, user=get_jwt_identity()).delete()
+        if not deleted:
+            return jsonify({'message': 'Filter not found'}), 404
+
+        return jsonify({'message': 'Filter deleted successfully'}), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Failed to delete filter', 'error': str(e)}), 500
@@ -0,0 +1,56 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models_mongo import User
+from services import jobs
+from tasks import MAINTENANCE_JOBS
+
+job_bp = Blueprint('jobs', __name__)
+
+@job_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Status and progress of a background job"""
+    try:
+        job = jobs.get_job(job_id)
+        
+        if not job:
+            return jsonify({'message': 'Job not found'}), 404
+        
+        current_user_id = get_jwt_identity()
+        if job['created_by'] != current_user_id:
+            current_user = User.objects(id=current_user_id).only('role').first()
+            if not current_user or current_user.role != 'admin':
+                return jsonify({'message': 'Permission denied'}), 403
+        
+        return jsonify(job), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch job', 'error': str(e)}), 500
+
+@job_bp.route('', methods=['POST'])
+@jwt_required()
+def create_job():
+    """Start a maintenance job (admin only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.objects(id=current_user_id).only('role').first()
+        
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'message': 'Admin access required'}), 403
+        
+        data = request.get_json() or {}
+        name = data.get('name')
+        
+        if name not in MAINTENANCE_JOBS:
+            return jsonify({'message': f'name must be one of: {", ".join(MAINTENANCE_JOBS)}'}), 400
+        
+        job_id = jobs.enqueue(name, created_by=current_user_id)
+        
+        return jsonify({
+            'message': 'Job queued',
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to queue job', 'error': str(e)}), 500
@@ -0,0 +1,139 @@
+from flask import Blueprint, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from mongoengine.errors import NotUniqueError
+from models_mongo import Project, User
+from bson import ObjectId
+from datetime import datetime
+from services import projects
+from schemas import Schema, validate, string, boolean
+
+project_bp = Blueprint('projects', __name__)
+
+# Request schemas, compiled once at import
+CREATE_BODY = Schema({
+    'key': string(required=True, strip=True, lower=True, max_length=32, pattern=r'^[a-z0-9][a-z0-9-]*$'),
+    'name': string(required=True, strip=True, min_length=1, max_length=100),
+    'description': string(default='', max_length=500),
+    'open_membership': boolean(default=False)
+})
+
+MEMBER_BODY = Schema({'username': string(required=True, strip=True, min_length=1, max_length=50)})
+
+def _project_for(key, manage=False):
+    """The project named by key, or an error response for the current user"""
+    project = Project.objects(key=key).first()
+    if not project:
+        return None, (jsonify({'message': 'Project not found'}), 404)
+    
+    current_user_id = get_jwt_identity()
+    allowed = projects.can_manage if manage else projects.can_access
+    if not allowed(project, current_user_id):
+        message = 'Only the project owner or an admin can do this' if manage else 'You do not have access to this project'
+        return None, (jsonify({'message': message}), 403)
+    return project, None
+
+@project_bp.route('', methods=['GET'])
+@jwt_required()
+def get_projects():
+    """Projects the current user can see"""
+    try:
+        viewable = projects.accessible_project_ids(get_jwt_identity())
+        query = Project.objects if viewable is None else Project.objects(id__in=viewable)
+        return jsonify({
+            'projects': [projects.serialize(project) for project in query.order_by('key')]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch projects', 'error': str(e)}), 500
+
+@project_bp.route('', methods=['POST'])
+@jwt_required()
+@validate(body=CREATE_BODY)
+def create_project():
+    """Create a project (admin only); the creator owns it"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.objects(id=current_user_id).only('id', 'role').first()
+        
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'message': 'Admin access required'}), 403
+        
+        data = g.body
+        
+        project = Project(
+            key=data['key'],
+            name=data['name'],
+            description=data['description'],
+            owner=current_user,
+            members=[current_user.id],
+            open_membership=data['open_membership'],
+            created_at=datetime.utcnow()
+        )
+        try:
+            project.save()
+        except NotUniqueError:
+            return jsonify({'message': 'A project with this key already exists'}), 400
+        
+        return jsonify({
+            'message': 'Project created successfully',
+            'project': projects.serialize(project, include_members=True)
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to create project', 'error': str(e)}), 500
+
+@project_bp.route('/<key>', methods=['GET'])
+@jwt_required()
+def get_project(key):
+    try:
+        project, error = _project_for(key)
+        if error:
+            return error
+        
+        return jsonify(projects.serialize(project, include_members=True)), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch project', 'error': str(e)}), 500
+
+@project_bp.route('/<key>/members', methods=['POST'])
+@jwt_required()
+@validate(body=MEMBER_BODY)
+def add_member(key):
+    """Add a user to a project by username"""
+    try:
+        project, error = _project_for(key, manage=True)
+        if error:
+            return error
+        
+        user = User.objects(username=g.body['username']).only('id').first()
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+        
+        Project.objects(id=project.id).update_one(add_to_set__members=user.id)
+        project.reload()
+        
+        return jsonify({
+            'message': 'Member added successfully',
+            'project': projects.serialize(project, include_members=True)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to add member', 'error': str(e)}), 500
+
+@project_bp.route('/<key>/members/<user_id>', methods=['DELETE'])
+@jwt_required()
+def remove_member(key, user_id):
+    try:
+        project, error = _project_for(key, manage=True)
+        if error:
+            return error
+        
+        if not ObjectId.is_valid(user_id):
+            return jsonify({'message': 'User not found'}), 404
+        
+        Project.objects(id=project.id).update_one(pull__members=ObjectId(user_id))
+        
+        return jsonify({'message': 'Member removed successfully'}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to remove member', 'error': str(e)}), 500
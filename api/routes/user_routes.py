@@ -1,17 +1,53 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models_mongo import User
+from models_mongo import User, Bug
 from werkzeug.security import generate_password_hash
+from redis import RedisError
+from services import user_directory, jobs, activity, projects, inbox, user_import, revocation
+from bson import ObjectId
+from pagination import Pagination, paginate
+from schemas import Schema, validate, string, integer, page_args, page_window, EMAIL_PATTERN
+import db_policy
 
 user_bp = Blueprint('users', __name__)
 
+# Request schemas, compiled once at import
+LIST_ARGS = Schema(page_args(search=string(default='', max_length=100)), check=page_window)
+
+ACTIVITY_ARGS = Schema({
+    'before': string(max_length=24),
+    'limit': integer(default=20, minimum=1, maximum=activity.MAX_PAGE_SIZE, clamp=True)
+})
+
+# An empty password leaves the current one unchanged
+UPDATE_BODY = Schema({
+    'username': string(strip=True, min_length=3, max_length=50),
+    'email': string(strip=True, lower=True, max_length=254, pattern=EMAIL_PATTERN),
+    'role': string(choices=['user', 'admin']),
+    'password': string(max_length=128)
+})
+
+INBOX_ARGS = Schema(page_args(box=string(default='assigned', choices=list(inbox.BOXES))), check=page_window)
+
+IMPORT_ARGS = Schema({'format': string(choices=list(user_import.FORMATS))})
+
+# Larger files go through the import-users CLI command
+MAX_IMPORT_ROWS = 5000
+
+SUGGEST_ARGS = Schema({
+    'q': string(default='', max_length=50, strip=True),
+    'limit': integer(default=10, minimum=1, maximum=user_directory.MAX_SUGGESTIONS, clamp=True)
+})
+
 @user_bp.route('', methods=['GET'])
 @jwt_required()
+@db_policy.policy('secondary')
+@validate(args=LIST_ARGS)
 def get_users():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        search = request.args.get('search', '')
+        page = g.args['page']
+        per_page = g.args['per_page']
+        search = g.args['search']
         
         # Build query
         query = {}
@@ -22,9 +58,7 @@ def get_users():
             ]
         
         # Execute query with pagination
-        users = User.objects(**query).order_by('username').paginate(
-            page=page, per_page=per_page
-        )
+        users = paginate(User.objects(__raw__=query).order_by('username'), page, per_page)
         
         # Format response
         users_data = []
@@ -50,6 +84,68 @@ def get_users():
     except Exception as e:
         return jsonify({'message': 'Failed to fetch users', 'error': str(e)}), 500
 
+@user_bp.route('/me/inbox', methods=['GET'])
+@jwt_required()
+@validate(args=INBOX_ARGS)
+def get_inbox():
+    """Open bugs assigned to (?box=assigned) or reported by (?box=reported) the current user"""
+    try:
+        current_user_id = get_jwt_identity()
+        box = g.args['box']
+        page = g.args['page']
+        per_page = g.args['per_page']
+        
+        try:
+            bug_ids, total = inbox.page(current_user_id, box, page, per_page)
+        except RedisError:
+            return jsonify({'message': 'Inbox unavailable, try again later'}), 503
+        
+        bugs = {
+            str(bug.id): bug
+            for bug in Bug.objects(id__in=bug_ids)
+            .only('id', 'title', 'status', 'priority', 'project', 'created_at', 'updated_at')
+        } if bug_ids else {}
+        # Ids of bugs deleted or archived behind the inbox's back
+        inbox.discard(current_user_id, box, [bug_id for bug_id in bug_ids if bug_id not in bugs])
+        
+        # Skip bugs in projects the user has since lost access to
+        viewable = projects.accessible_project_ids(current_user_id)
+        if viewable is not None:
+            viewable = set(viewable)
+        
+        bugs_data = []
+        for bug_id in bug_ids:
+            bug = bugs.get(bug_id)
+            if not bug:
+                continue
+            project_id = projects.project_id_of(bug)
+            if viewable is not None and project_id and project_id not in viewable:
+                continue
+            bugs_data.append({
+                'id': bug_id,
+                'title': bug.title,
+                'status': bug.status,
+                'priority': bug.priority,
+                'project_id': str(project_id) if project_id else None,
+                'created_at': bug.created_at.isoformat() if bug.created_at else None,
+                'updated_at': bug.updated_at.isoformat() if bug.updated_at else None
+            })
+        
+        result = Pagination(bugs_data, page, per_page, total)
+        return jsonify({
+            'box': box,
+            'bugs': result.items,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': result.total,
+                'pages': result.pages
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch inbox', 'error': str(e)}), 500
+
 @user_bp.route('/<user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
@@ -72,8 +168,30 @@ def get_user(user_id):
     except Exception as e:
         return jsonify({'message': 'Failed to fetch user', 'error': str(e)}), 500
 
+@user_bp.route('/<user_id>/activity', methods=['GET'])
+@jwt_required()
+@validate(args=ACTIVITY_ARGS)
+def get_user_activity(user_id):
+    """What a user did, newest first, paged with ?before=<cursor>"""
+    try:
+        if not ObjectId.is_valid(user_id):
+            return jsonify({'message': 'User not found'}), 404
+        
+        # Only events from projects the viewer can see
+        viewable = projects.accessible_project_ids(get_jwt_identity())
+        try:
+            page = activity.user_activity(user_id, viewable, g.args.get('before'), g.args['limit'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        return jsonify(page), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch user activity', 'error': str(e)}), 500
+
 @user_bp.route('/<user_id>', methods=['PUT'])
 @jwt_required()
+@validate(body=UPDATE_BODY)
 def update_user(user_id):
     try:
         current_user_id = get_jwt_identity()
@@ -91,10 +209,11 @@ def update_user(user_id):
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        data = request.get_json()
+        data = g.body
         
         # Update allowed fields
-        if 'username' in data and data['username'] != user.username:
+        renamed = 'username' in data and data['username'] != user.username
+        if renamed:
             # Check if username is already taken
             existing_user = User.objects(username=data['username']).first()
             if existing_user:
@@ -119,6 +238,8 @@ def update_user(user_id):
             user.password_hash = generate_password_hash(data['password'])
         
         user.save()
+        if renamed:
+            user_directory.mark_changed()
         
         return jsonify({
             'message': 'User updated successfully',
@@ -152,13 +273,78 @@ def delete_user(user_id):
         if str(current_user.id) == user_id:
             return jsonify({'message': 'Cannot delete your own account'}), 400
         
-        user.delete()
+        # Cascading over the user's bugs can take minutes, so it runs in
+        # the job worker; deactivate the account first so it cannot log in
+        # or use its tokens while the cascade runs
+        user.update(set__is_active=False)
+        try:
+            revocation.revoke(user_id)
+            job_id = jobs.enqueue('delete_user', {'user_id': user_id}, created_by=str(current_user.id))
+        except RedisError:
+            # Nothing was queued, so undo the lock-out
+            user.update(set__is_active=True)
+            try:
+                revocation.reinstate(user_id)
+            except RedisError:
+                pass
+            return jsonify({'message': 'Job queue unavailable, try again later'}), 503
         
-        return jsonify({'message': 'User deleted successfully'}), 200
+        return jsonify({
+            'message': 'User deletion started',
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
         
     except Exception as e:
         return jsonify({'message': 'Failed to delete user', 'error': str(e)}), 500
 
+@user_bp.route('/import', methods=['POST'])
+@jwt_required()
+@validate(args=IMPORT_ARGS)
+def import_users():
+    """Queue creating users from a CSV or NDJSON body (admin only)"""
+    try:
+        current_user = User.objects(id=get_jwt_identity()).only('id', 'role').first()
+        
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'message': 'Admin access required'}), 403
+        
+        fmt = g.args.get('format')
+        if not fmt:
+            if request.mimetype == 'text/csv':
+                fmt = 'csv'
+            elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+                fmt = 'ndjson'
+            else:
+                return jsonify({
+                    'message': 'Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson'
+                }), 415
+        
+        # Hashing thousands of passwords takes minutes, so it runs in the
+        # job worker; the finished job's result reports every row
+        upload_id, rows, truncated = user_import.stash(
+            user_import.read_rows(request.stream, fmt), MAX_IMPORT_ROWS
+        )
+        try:
+            job_id = jobs.enqueue(
+                'import_users', {'upload_id': upload_id, 'truncated': truncated},
+                created_by=str(current_user.id)
+            )
+        except RedisError:
+            user_import.discard(upload_id)
+            return jsonify({'message': 'Job queue unavailable, try again later'}), 503
+        
+        return jsonify({
+            'message': 'User import started',
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+            'rows': rows,
+            'truncated': truncated
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to import users', 'error': str(e)}), 500
+
 @user_bp.route('/assignees', methods=['GET'])
 @jwt_required()
 def get_assignees():
@@ -177,3 +363,19 @@ def get_assignees():
         
     except Exception as e:
         return jsonify({'message': 'Failed to fetch assignees', 'error': str(e)}), 500
+
+@user_bp.route('/suggest', methods=['GET'])
+@jwt_required()
+@validate(args=SUGGEST_ARGS)
+def suggest_users():
+    """Typeahead: users whose username starts with q, case-insensitively"""
+    try:
+        prefix = g.args['q']
+        
+        if not prefix:
+            return jsonify({'users': []}), 200
+        
+        return jsonify({'users': user_directory.suggest(prefix, g.args['limit'])}), 200
+        
+    except Exception as e:
+        return jsonify({'message': 'Failed to suggest users', 'error': str(e)}), 500
@@ -0,0 +1,210 @@
+"""
+Precompiled request validation
+Routes declare schemas at import time: a dict of field name to a field
+built by ``string``, ``integer``, ``boolean``, ``string_list`` or
+``object_list``. Each field binds its type check, bounds, choices and
+compiled pattern into one closure when it is built, so validating a
+request only runs those closures. ``@validate(args=..., body=...)``
+checks the query string and JSON body before the view runs, so bad input
+is rejected with a 400 and no database call; the view reads the cleaned
+values from ``g.args`` and ``g.body``. Fields not in a schema are
+dropped. A schema may also take a ``check`` run on the cleaned values,
+for rules spanning several fields.
+"""
+
+import functools
+import re
+from collections import namedtuple
+
+from flask import g, request, jsonify
+
+# Leave the field out of the cleaned data when the request omits it
+ABSENT = object()
+
+MAX_PER_PAGE = 100
+# Offset pages make the database walk every earlier row, so page *
+# per_page is capped; deeper reads need a cursor or a narrower filter
+MAX_PAGE_WINDOW = 10000
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+Field = namedtuple('Field', ['check', 'required', 'default', 'nullable', 'multiple'])
+
+
+class ValidationError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def string(required=False, default=ABSENT, nullable=False, min_length=None, max_length=None,
+           choices=None, pattern=None, strip=False, lower=False):
+    allowed = frozenset(choices) if choices else None
+    regex = re.compile(pattern) if pattern else None
+
+    def check(value, query):
+        if not isinstance(value, str):
+            raise ValueError('must be a string')
+        if strip:
+            value = value.strip()
+        if lower:
+            value = value.lower()
+        if min_length is not None and len(value) < min_length:
+            raise ValueError(f'must be at least {min_length} characters' if min_length > 1 else 'must not be empty')
+        if max_length is not None and len(value) > max_length:
+            raise ValueError(f'must be at most {max_length} characters')
+        if allowed is not None and value not in allowed:
+            raise ValueError(f'must be one of: {", ".join(choices)}')
+        if regex is not None and not regex.match(value):
+            raise ValueError('has an invalid format')
+        return value
+    return Field(check, required, default, nullable, False)
+
+
+def integer(required=False, default=ABSENT, minimum=None, maximum=None, clamp=False):
+    """An integer; with clamp=True out-of-range values are pulled into range"""
+    def check(value, query):
+        if query:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError('must be an integer')
+        elif isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError('must be an integer')
+        if minimum is not None and value < minimum:
+            if not clamp:
+                raise ValueError(f'must be at least {minimum}')
+            value = minimum
+        if maximum is not None and value > maximum:
+            if not clamp:
+                raise ValueError(f'must be at most {maximum}')
+            value = maximum
+        return value
+    return Field(check, required, default, False, False)
+
+
+def boolean(required=False, default=ABSENT):
+    def check(value, query):
+        if query:
+            lowered = value.lower()
+            if lowered in ('true', '1'):
+                return True
+            if lowered in ('false', '0'):
+                return False
+        elif isinstance(value, bool):
+            return value
+        raise ValueError('must be true or false')
+    return Field(check, required, default, False, False)
+
+
+def string_list(required=False, default=ABSENT, max_items=None, max_length=None, separator=','):
+    """A JSON array of strings, or repeated and/or separated query values"""
+    def check(value, query):
+        if query:
+            items = [item.strip() for raw in value for item in raw.split(separator)]
+            items = [item for item in items if item]
+        elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+            items = value
+        else:
+            raise ValueError('must be a list of strings')
+        if max_items is not None and len(items) > max_items:
+            raise ValueError(f'must have at most {max_items} items')
+        if max_length is not None and any(len(item) > max_length for item in items):
+            raise ValueError(f'items must be at most {max_length} characters')
+        return items
+    return Field(check, required, default, False, True)
+
+
+def object_list(required=False, default=ABSENT, min_items=None, max_items=None):
+    """A JSON array of objects, whose items the view checks further"""
+    def check(value, query):
+        if query or not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+            raise ValueError('must be a list of objects')
+        if min_items is not None and len(value) < min_items:
+            raise ValueError(f'must have at least {min_items} items' if min_items > 1 else 'must not be empty')
+        if max_items is not None and len(value) > max_items:
+            raise ValueError(f'must have at most {max_items} items')
+        return value
+    return Field(check, required, default, False, False)
+
+
+def page_args(**fields):
+    """Schema fields for page and a clamped per_page, plus any others
+
+    Pair them with ``check=page_window`` to bound the offset.
+    """
+    return {
+        'page': integer(default=1, minimum=1, clamp=True),
+        'per_page': integer(default=10, minimum=1, maximum=MAX_PER_PAGE, clamp=True),
+        **fields
+    }
+
+
+def page_window(cleaned):
+    """Reject pages ending past MAX_PAGE_WINDOW rows"""
+    if cleaned['page'] * cleaned['per_page'] > MAX_PAGE_WINDOW:
+        return {'page': f'must not reach past row {MAX_PAGE_WINDOW} (page * per_page)'}
+    return None
+
+
+class Schema:
+    def __init__(self, fields, check=None):
+        self._fields = tuple(fields.items())
+        self._check = check
+
+    def load(self, source, query=False):
+        """Cleaned values from a dict or request.args; raises ValidationError"""
+        cleaned = {}
+        errors = {}
+        for name, field in self._fields:
+            if query:
+                value = source.getlist(name) if field.multiple else source.get(name, '')
+                missing = not value
+            else:
+                value = source.get(name, ABSENT)
+                missing = value is ABSENT
+            if missing:
+                if field.required:
+                    errors[name] = 'is required'
+                elif field.default is not ABSENT:
+                    cleaned[name] = field.default
+                continue
+            if value is None:
+                if field.nullable:
+                    cleaned[name] = None
+                else:
+                    errors[name] = 'must not be null'
+                continue
+            try:
+                cleaned[name] = field.check(value, query)
+            except ValueError as e:
+                errors[name] = str(e)
+        if not errors and self._check:
+            errors = self._check(cleaned) or {}
+        if errors:
+            raise ValidationError(errors)
+        return cleaned
+
+
+def _error_response(errors):
+    message = '; '.join(f'{name} {error}' for name, error in errors.items())
+    return jsonify({'message': message, 'errors': errors}), 400
+
+
+def validate(args=None, body=None):
+    """Validate the query string and/or JSON body before the view runs"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*view_args, **view_kwargs):
+            try:
+                g.args = args.load(request.args, query=True) if args else {}
+                if body:
+                    data = request.get_json(silent=True)
+                    if not isinstance(data, dict):
+                        return jsonify({'message': 'Request body must be a JSON object'}), 400
+                    g.body = body.load(data)
+            except ValidationError as e:
+                return _error_response(e.errors)
+            return view(*view_args, **view_kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,206 @@
+"""
+Append-only activity log for bugs and users
+Signal subscribers turn each bug write into a compact event: who did it,
+which fields changed and, for small fields, the old and new values. Events
+are buffered in the worker and written with one unordered insert per
+flush, so a request never waits on the log. The buffer is flushed when it
+fills, every few seconds from a background thread and at exit; events
+still buffered when a worker is killed are lost, which the feed tolerates.
+"""
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
+
+import db_policy
+from models_mongo import ActivityEvent, User
+from signals import bug_created, bug_updated, bugs_deleted, comment_added
+from services.projects import project_id_of
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 2.0
+# Events dropped rather than buffered while the database is unreachable
+MAX_BUFFERED = 10000
+
+MAX_PAGE_SIZE = 100
+EXCERPT_LENGTH = 140
+
+# Fields whose old and new values are small enough to keep in the event
+VALUE_FIELDS = {'status', 'priority', 'assignee', 'tags'}
+
+
+class _EventBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._events = []
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, doc):
+        with self._lock:
+            if len(self._events) >= MAX_BUFFERED:
+                logger.warning('Activity buffer full, dropping %s event', doc['kind'])
+                return
+            self._events.append(doc)
+            full = len(self._events) >= FLUSH_SIZE
+            # Started lazily so each forked worker gets its own flusher
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='activity-flush', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        # One flush at a time keeps retried events in order
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            try:
+                # Losing a few events in a failover is acceptable
+                ActivityEvent._get_collection().with_options(
+                    write_concern=db_policy.LIGHT_WRITE_CONCERN
+                ).insert_many(events, ordered=False)
+            except PyMongoError:
+                logger.warning('Could not write %d activity events', len(events), exc_info=True)
+                with self._lock:
+                    # _id is assigned up front, so a partial write cannot duplicate on retry
+                    self._events[:0] = events[:MAX_BUFFERED - len(self._events)]
+                return 0
+            return len(events)
+
+    def _run(self):
+        while True:
+            self._wake.wait(FLUSH_INTERVAL_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+
+_buffer = _EventBuffer()
+atexit.register(_buffer.flush)
+
+
+def record(kind, bug, actor=None, changes=None):
+    """Queue an event for the next flush"""
+    _buffer.add({
+        '_id': ObjectId(),
+        'bug': bug.id,
+        'project': project_id_of(bug),
+        'actor': ObjectId(actor) if actor else None,
+        'kind': kind,
+        'title': getattr(bug, 'title', None),
+        'changes': changes or {},
+        'created_at': datetime.utcnow()
+    })
+
+
+def flush():
+    """Write buffered events now; returns how many were written"""
+    return _buffer.flush()
+
+
+def _compact(changes):
+    return {
+        field: {'from': old, 'to': new} if field in VALUE_FIELDS else {}
+        for field, (old, new) in changes.items()
+    }
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, actor=None, **extra):
+    record('created', bug, actor, {
+        'status': {'to': bug.status},
+        'priority': {'to': bug.priority},
+        'assignee': {'to': str(bug.assignee.id) if bug.assignee else None}
+    })
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, actor=None, **extra):
+    if changes:
+        record('updated', bug, actor, _compact(changes))
+
+
+@bugs_deleted.connect
+def _on_bugs_deleted(sender, bugs, actor=None, **extra):
+    for bug in bugs:
+        record('deleted', bug, actor)
+
+
+@comment_added.connect
+def _on_comment_added(sender, bug, comment, actor=None, **extra):
+    record('commented', bug, actor, {
+        'comment': {'excerpt': comment.content[:EXCERPT_LENGTH]}
+    })
+
+
+def _page(query, project_ids=None, before=None, limit=20):
+    """Newest events first, continuing below the ``before`` cursor
+
+    ``project_ids`` limits events to those projects; None allows all.
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    if project_ids is not None:
+        # Events from before projects existed carry no project
+        query['project'] = {'$in': list(project_ids) + [None]}
+    if before:
+        try:
+            query['_id'] = {'$lt': ObjectId(before)}
+        except (InvalidId, TypeError):
+            raise ValueError('Invalid cursor')
+
+    # Make this worker's own recent writes visible to its reads
+    flush()
+    docs = list(ActivityEvent._get_collection().find(query).sort('_id', -1).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    actor_ids = {doc['actor'] for doc in docs if doc.get('actor')}
+    usernames = {
+        user.id: user.username
+        for user in User.objects(id__in=list(actor_ids)).only('id', 'username')
+    } if actor_ids else {}
+
+    events = [{
+        'id': str(doc['_id']),
+        'kind': doc['kind'],
+        'bug': {'id': str(doc['bug']), 'title': doc.get('title')},
+        'actor': {
+            'id': str(doc['actor']),
+            'username': usernames.get(doc['actor'])
+        } if doc.get('actor') else None,
+        'changes': doc.get('changes', {}),
+        'created_at': doc['created_at'].isoformat()
+    } for doc in docs]
+
+    return {
+        'events': events,
+        'next_cursor': events[-1]['id'] if has_more else None
+    }
+
+
+def last_event_of(bug_id):
+    """The newest event on a bug, or None; outlives the bug itself"""
+    flush()
+    return ActivityEvent._get_collection().find_one(
+        {'bug': ObjectId(bug_id)}, {'project': 1, 'kind': 1}, sort=[('_id', -1)]
+    )
+
+
+def bug_history(bug_id, project_ids=None, before=None, limit=20):
+    """Events on one bug, newest first"""
+    return _page({'bug': ObjectId(bug_id)}, project_ids, before, limit)
+
+
+def user_activity(user_id, project_ids=None, before=None, limit=20):
+    """Events performed by one user, newest first"""
+    return _page({'actor': ObjectId(user_id)}, project_ids, before, limit)
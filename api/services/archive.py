@@ -0,0 +1,199 @@
+"""
+Hot/cold tiering for old closed bugs
+Closed bugs untouched for ARCHIVE_AFTER_DAYS move from ``bugs`` to
+``bugs_archive``, so the indexes and scans behind the bug list only cover
+live work. Archived documents keep their bug shape and id. Batches are
+copied with idempotent upserts before the originals are deleted, and the
+selection itself excludes bugs already moved, so an interrupted run simply
+resumes on the next one. Stats and tag counters keep counting archived
+bugs; services covering hot bugs only follow the bugs_archived and
+bug_restored signals. Reading an archived bug finds it transparently and
+writing to one moves it back to the hot collection first.
+
+Listings covering both tiers page with a cursor on (created_at, _id)
+rather than an offset: each tier then reads one page past the cursor from
+its (project, created_at, _id) index, however deep the page.
+"""
+
+import base64
+import binascii
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import current_app
+from pymongo import ReplaceOne, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+import db_policy
+from models_mongo import Bug
+from signals import bugs_archived, bug_restored
+
+ARCHIVE_COLLECTION = 'bugs_archive'
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+BATCH_SIZE = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Archived bugs are read by project and newest first, by user for the
+# delete cascade and by update time for snapshot exports
+_INDEXES = [
+    [('updated_at', 1), ('_id', 1)],
+    [('project', 1), ('created_at', DESCENDING), ('_id', DESCENDING)],
+    [('project', 1), ('status', 1)],
+    [('project', 1), ('tags', 1)],
+    [('project', 1), ('assignee', 1)],
+    [('reporter', 1)],
+    [('assignee', 1)]
+]
+
+
+def collection():
+    return db_policy.apply(Bug._get_db()[ARCHIVE_COLLECTION])
+
+
+def ensure_indexes():
+    archive = collection()
+    for keys in _INDEXES:
+        archive.create_index(keys)
+
+
+def to_bug(doc):
+    """A Bug built from an archived document"""
+    doc = dict(doc)
+    doc.pop('archived_at', None)
+    return Bug._from_son(doc)
+
+
+def _candidates(cutoff):
+    return {'status': 'closed', 'updated_at': {'$lt': cutoff}}
+
+
+def archive_old_bugs(days=ARCHIVE_AFTER_DAYS, progress=None):
+    """Move closed bugs older than ``days`` to the archive; returns how many moved"""
+    ensure_indexes()
+    sender = current_app._get_current_object()
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    hot = Bug._get_collection()
+    archive = collection()
+    total = hot.count_documents(_candidates(cutoff))
+    moved = 0
+
+    while True:
+        batch = list(hot.find(_candidates(cutoff)).sort('_id', 1).limit(BATCH_SIZE))
+        if not batch:
+            break
+        now = datetime.utcnow()
+        ids = [doc['_id'] for doc in batch]
+        # Upserts make a batch safe to copy again after a crash
+        archive.bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, {**doc, 'archived_at': now}, upsert=True) for doc in batch],
+            ordered=False
+        )
+        # Re-check the selection so a bug reopened meanwhile stays hot
+        deleted = hot.delete_many({'_id': {'$in': ids}, **_candidates(cutoff)}).deleted_count
+        still_hot = set()
+        if deleted < len(ids):
+            still_hot = {doc['_id'] for doc in hot.find({'_id': {'$in': ids}}, {'_id': 1})}
+            archive.delete_many({'_id': {'$in': list(still_hot)}})
+        bugs_archived.send(sender, bugs=[to_bug(doc) for doc in batch if doc['_id'] not in still_hot])
+        moved += deleted
+        if progress:
+            progress(moved * 100 // max(total, 1), f'Archived {moved} bugs')
+        if len(batch) < BATCH_SIZE:
+            break
+    return moved
+
+
+def find(bug_id):
+    """An archived bug by id, or None"""
+    doc = collection().find_one({'_id': ObjectId(bug_id)})
+    return to_bug(doc) if doc else None
+
+
+def restore(bug_id):
+    """Move an archived bug back to the hot collection; returns it, or None"""
+    bug_id = ObjectId(bug_id)
+    doc = collection().find_one({'_id': bug_id})
+    if doc is None:
+        return None
+    doc.pop('archived_at', None)
+    try:
+        Bug._get_collection().insert_one(doc)
+        restored = True
+    except DuplicateKeyError:
+        # Restored concurrently by another request, which announces it
+        restored = False
+    collection().delete_one({'_id': bug_id})
+    bug = Bug.objects(id=bug_id).first()
+    if restored and bug:
+        bug_restored.send(current_app._get_current_object(), bug=bug, actor=None)
+    return bug
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(bug):
+    """An opaque cursor listing continues after, newest first"""
+    created_ms = ((bug.created_at or _EPOCH) - _EPOCH) // timedelta(milliseconds=1)
+    raw = json.dumps([created_ms, str(bug.id)], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """The (created_at, _id) of a cursor; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_ms, last_id = json.loads(raw)
+        return _EPOCH + timedelta(milliseconds=int(created_ms)), ObjectId(last_id)
+    except (binascii.Error, ValueError, TypeError, OverflowError, InvalidId):
+        raise InvalidCursor('Invalid cursor')
+
+
+def before(cursor):
+    """Query for bugs listed after a decoded cursor, newest first"""
+    created_at, last_id = cursor
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': last_id}}
+    ]}
+
+
+def aggregate_both(pipeline):
+    """Rows of a pipeline run over the hot and archived bugs in turn"""
+    yield from Bug.objects.aggregate(pipeline)
+    yield from collection().aggregate(pipeline)
+
+
+def newest_first(query, limit, cursor=None):
+    """Hot and archived bugs matching a raw query, merged newest first
+
+    Returns up to limit bugs after the decoded cursor and the cursor of the
+    next page, or None on the last one.
+    """
+    if cursor is not None:
+        query = {'$and': [query, before(cursor)]}
+    hot = Bug.objects(__raw__=query).order_by('-created_at', '-id').limit(limit + 1)
+    cold = (
+        to_bug(doc)
+        for doc in collection().find(query).sort([('created_at', DESCENDING), ('_id', DESCENDING)]).limit(limit + 1)
+    )
+    return first_page(heapq.merge(hot, cold, key=newest_key, reverse=True), limit)
+
+
+def newest_key(bug):
+    return (bug.created_at or datetime.min, bug.id)
+
+
+def first_page(merged, limit):
+    """The first limit bugs of a merged listing and the next page's cursor"""
+    bugs = list(islice(merged, limit + 1))
+    if len(bugs) > limit:
+        return bugs[:limit], encode_cursor(bugs[limit - 1])
+    return bugs, None
@@ -0,0 +1,124 @@
+"""
+Bug attachments stored in GridFS
+Uploads are read from the request stream chunk by chunk and written
+straight into GridFS while a SHA-256 digest is computed, so a file is
+never held in memory as a whole. The digest becomes the download ETag.
+Per-file metadata lives in its own collection keyed by the GridFS file
+id, keeping Bug documents and bug list reads small.
+"""
+
+import hashlib
+import logging
+import os
+from datetime import datetime
+
+import gridfs
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from werkzeug.utils import secure_filename
+
+from models_mongo import Attachment
+from signals import bugs_deleted
+
+logger = logging.getLogger(__name__)
+
+BUCKET_NAME = 'attachment_files'
+# GridFS's default chunk size; each read from the request matches it
+CHUNK_SIZE = 255 * 1024
+MAX_ATTACHMENT_BYTES = int(os.getenv('MAX_ATTACHMENT_MB', 25)) * 1024 * 1024
+
+# Types browsers may render in place; everything else downloads
+INLINE_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'text/plain'}
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+def _bucket():
+    return gridfs.GridFSBucket(Attachment._get_db(), bucket_name=BUCKET_NAME)
+
+
+def store(bug_id, stream, filename, content_type, uploaded_by=None):
+    """Stream a file into GridFS and record its metadata"""
+    filename = secure_filename(filename or '') or 'attachment'
+    content_type = content_type or 'application/octet-stream'
+    file_id = ObjectId()
+    digest = hashlib.sha256()
+    size = 0
+
+    grid_in = _bucket().open_upload_stream_with_id(
+        file_id, filename, chunk_size_bytes=CHUNK_SIZE, metadata={'bug': ObjectId(bug_id)}
+    )
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_ATTACHMENT_BYTES:
+                raise AttachmentTooLarge(f'Attachments are limited to {MAX_ATTACHMENT_BYTES // (1024 * 1024)} MB')
+            digest.update(chunk)
+            grid_in.write(chunk)
+    except BaseException:
+        # Drops the chunks written so far
+        grid_in.abort()
+        raise
+    grid_in.close()
+
+    attachment = Attachment(
+        id=file_id,
+        bug=ObjectId(bug_id),
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        sha256=digest.hexdigest(),
+        uploaded_by=ObjectId(uploaded_by) if uploaded_by else None,
+        created_at=datetime.utcnow()
+    )
+    try:
+        attachment.save(force_insert=True)
+    except Exception:
+        _bucket().delete(file_id)
+        raise
+    return attachment
+
+
+def open_content(attachment):
+    """Seekable, readable GridOut for the attachment's content"""
+    return _bucket().open_download_stream(attachment.id)
+
+
+def is_inline(attachment):
+    return attachment.content_type in INLINE_TYPES
+
+
+def delete(attachment):
+    attachment.delete()
+    try:
+        _bucket().delete(attachment.id)
+    except gridfs.NoFile:
+        pass
+
+
+def serialize(attachment):
+    return {
+        'id': str(attachment.id),
+        'filename': attachment.filename,
+        'content_type': attachment.content_type,
+        'size': attachment.size,
+        'sha256': attachment.sha256,
+        'uploaded_by': str(attachment.uploaded_by) if attachment.uploaded_by else None,
+        'created_at': attachment.created_at.isoformat() if attachment.created_at else None,
+        'url': f'/api/bugs/{attachment.bug}/attachments/{attachment.id}'
+    }
+
+
+@bugs_deleted.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    bug_ids = [bug.id for bug in bugs]
+    try:
+        for attachment in Attachment.objects(bug__in=bug_ids).only('id'):
+            delete(attachment)
+    except PyMongoError:
+        logger.warning('Could not delete attachments of %d deleted bugs', len(bug_ids), exc_info=True)
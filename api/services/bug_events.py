@@ -0,0 +1,263 @@
+"""
+Live bug events for Server-Sent Events clients
+Write routes publish compact events with a Lua script that appends to a
+capped Redis stream (kept for Last-Event-ID replay) and publishes on a
+pub/sub channel in a single round trip. Each worker process holds one
+subscriber thread that fans events out to its connected clients, so an
+open SSE connection costs a queue rather than a Redis connection. Events
+carry their bug's project id outside the JSON payload, so each client's
+project filter is a string comparison. Under gthread an open stream still
+holds a request thread, so each worker serves at most MAX_STREAMS of them
+and turns further clients away until a slot frees up.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import redis
+
+from extensions import redis_client
+from signals import bug_created, bug_updated, bugs_deleted, comment_added
+from services.projects import project_id_of
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'bugtracker:bug-events'
+CHANNEL = 'bugtracker:bug-events:live'
+
+# Events kept for replay; older Last-Event-IDs get a reset instead
+STREAM_MAXLEN = 10000
+REPLAY_LIMIT = 1000
+
+# Buffered events per client before it is dropped and left to reconnect
+CLIENT_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+
+# Open streams per worker process; keep it below the worker's thread
+# count so ordinary requests always have threads left
+MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 16))
+
+# Project field of events for bugs without a project
+NO_PROJECT = '-'
+
+_publish_script = redis_client.register_script("""
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*',
+    'type', ARGV[2], 'data', ARGV[3], 'project', ARGV[4])
+redis.call('PUBLISH', KEYS[2], id .. ' ' .. ARGV[4] .. ' ' .. ARGV[2] .. ' ' .. ARGV[3])
+return id
+""")
+
+
+def _project_field(bug):
+    project_id = project_id_of(bug)
+    return str(project_id) if project_id else NO_PROJECT
+
+
+def publish(event_type, data, project=NO_PROJECT):
+    """Append an event to the stream and notify live subscribers"""
+    payload = json.dumps(data, separators=(',', ':'))
+    try:
+        return _publish_script(
+            keys=[STREAM_KEY, CHANNEL], args=[STREAM_MAXLEN, event_type, payload, project]
+        )
+    except redis.RedisError:
+        # Live updates are best effort; never fail the write because of them
+        logger.warning('Could not publish %s event', event_type, exc_info=True)
+        return None
+
+
+def _bug_summary(bug):
+    return {
+        'id': str(bug.id),
+        'title': bug.title,
+        'status': bug.status,
+        'priority': bug.priority,
+        'assignee': {
+            'id': str(bug.assignee.id),
+            'username': bug.assignee.username
+        } if bug.assignee else None,
+        'tags': bug.tags,
+        'updated_at': bug.updated_at.isoformat() if bug.updated_at else None
+    }
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, **extra):
+    publish('bug.created', {'bug': _bug_summary(bug)}, _project_field(bug))
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, **extra):
+    publish('bug.updated', {'bug': _bug_summary(bug), 'changed': sorted(changes)}, _project_field(bug))
+
+
+@bugs_deleted.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    for bug in bugs:
+        publish('bug.deleted', {'bug': {'id': str(bug.id)}}, _project_field(bug))
+
+
+@comment_added.connect
+def _on_comment_added(sender, bug, comment, **extra):
+    publish('comment.added', {
+        'bug': {'id': str(bug.id)},
+        'comment': {
+            'content': comment.content,
+            'author': {
+                'id': str(comment.author.id),
+                'username': comment.author.username
+            },
+            'created_at': comment.created_at.isoformat()
+        }
+    }, _project_field(bug))
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+def _parse_id(event_id):
+    milliseconds, _, sequence = event_id.partition('-')
+    return int(milliseconds), int(sequence or 0)
+
+
+class _Broker:
+    """Per-process fan-out from one pub/sub subscription to client queues"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+
+    def subscribe(self):
+        client_queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        with self._lock:
+            if len(self._subscribers) >= MAX_STREAMS:
+                raise StreamLimitReached()
+            self._subscribers.add(client_queue)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='bug-events', daemon=True)
+                self._thread.start()
+        return client_queue
+
+    def unsubscribe(self, client_queue):
+        with self._lock:
+            self._subscribers.discard(client_queue)
+
+    def _disconnect(self, client_queue):
+        """End a client's stream; it reconnects and replays what it missed"""
+        self.unsubscribe(client_queue)
+        try:
+            client_queue.get_nowait()
+        except queue.Empty:
+            pass
+        client_queue.put_nowait(None)
+
+    def _fan_out(self, item):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for client_queue in subscribers:
+            try:
+                client_queue.put_nowait(item)
+            except queue.Full:
+                self._disconnect(client_queue)
+
+    def _run(self):
+        failed = False
+        while True:
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                if failed:
+                    # Events may have been missed while disconnected
+                    with self._lock:
+                        subscribers = list(self._subscribers)
+                    for client_queue in subscribers:
+                        self._disconnect(client_queue)
+                    failed = False
+                for message in pubsub.listen():
+                    self._fan_out(tuple(message['data'].split(' ', 3)))
+            except redis.RedisError:
+                logger.warning('Bug event subscription lost, retrying', exc_info=True)
+                failed = True
+                time.sleep(1)
+
+
+_broker = _Broker()
+
+
+def replay(last_event_id):
+    """Events published after last_event_id, or None if they are no longer kept"""
+    try:
+        last = _parse_id(last_event_id)
+    except ValueError:
+        return None
+
+    oldest = redis_client.xrange(STREAM_KEY, count=1)
+    if oldest and _parse_id(oldest[0][0]) > last:
+        return None
+
+    entries = redis_client.xrange(STREAM_KEY, min=f'({last_event_id}', count=REPLAY_LIMIT + 1)
+    if len(entries) > REPLAY_LIMIT:
+        return None
+    return [
+        (event_id, fields.get('project', NO_PROJECT), fields['type'], fields['data'])
+        for event_id, fields in entries
+    ]
+
+
+def _format(event_id, event_type, payload):
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+def subscribe():
+    """Reserve a stream slot in this worker; raises StreamLimitReached when full"""
+    return _broker.subscribe()
+
+
+def unsubscribe(client_queue):
+    _broker.unsubscribe(client_queue)
+
+
+def event_stream(client_queue, project_id, last_event_id=None):
+    """Generator of SSE frames for one project: replay from last_event_id, then live events"""
+    project = str(project_id)
+    try:
+        yield 'retry: 3000\n\n'
+        last_sent = None
+
+        if last_event_id:
+            try:
+                missed = replay(last_event_id)
+            except redis.RedisError:
+                missed = None
+            if missed is None:
+                # Too far behind to replay; the client should refetch
+                yield 'event: reset\ndata: {}\n\n'
+            else:
+                for event_id, event_project, event_type, payload in missed:
+                    last_sent = _parse_id(event_id)
+                    if event_project == project:
+                        yield _format(event_id, event_type, payload)
+
+        while True:
+            try:
+                item = client_queue.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if item is None:
+                return
+            event_id, event_project, event_type, payload = item
+            if event_project != project:
+                continue
+            # Skip live events already delivered by the replay
+            if last_sent and _parse_id(event_id) <= last_sent:
+                continue
+            yield _format(event_id, event_type, payload)
+    finally:
+        _broker.unsubscribe(client_queue)
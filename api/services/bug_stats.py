@@ -0,0 +1,168 @@
+"""
+Incrementally maintained bug statistics
+Counters are kept in one ``bug_stats`` document per scope (a project id)
+and updated with atomic ``$inc`` on every bug write, so reading stats is
+a single lookup. ``reconcile`` recomputes a scope from the ``bugs`` and
+``bugs_archive`` collections to correct any drift; archived bugs still
+count.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from models_mongo import Bug, BugStats
+from signals import bug_created, bug_updated, bugs_deleted
+from services.projects import project_id_of
+from services.archive import aggregate_both
+
+logger = logging.getLogger(__name__)
+
+# Bugs not yet assigned to a project
+GLOBAL_SCOPE = 'global'
+
+STATUSES = [choice for choice, _ in Bug.STATUS_CHOICES]
+PRIORITIES = [choice for choice, _ in Bug.PRIORITY_CHOICES]
+
+
+def scope_of(project_id):
+    return str(project_id) if project_id else GLOBAL_SCOPE
+
+
+def _scope_for(bug):
+    return scope_of(project_id_of(bug))
+
+
+def _apply(increments):
+    """Apply {scope: Counter} increments, one upsert per scope"""
+    collection = BugStats._get_collection()
+    for scope, counter in increments.items():
+        inc = {key: value for key, value in counter.items() if value}
+        if not inc:
+            continue
+        try:
+            collection.update_one({'_id': scope}, {'$inc': inc}, upsert=True)
+        except PyMongoError:
+            # The bug write already succeeded; reconcile() repairs the drift
+            logger.warning('Could not update stats for %s', scope, exc_info=True)
+
+
+def _bug_deltas(bugs, sign):
+    increments = {}
+    for bug in bugs:
+        counter = increments.setdefault(_scope_for(bug), Counter())
+        counter['total'] += sign
+        counter[f'status_counts.{bug.status}'] += sign
+        counter[f'priority_counts.{bug.priority}'] += sign
+    return increments
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, **extra):
+    _apply(_bug_deltas([bug], 1))
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, **extra):
+    counter = Counter()
+    for field, prefix in (('status', 'status_counts'), ('priority', 'priority_counts')):
+        if field in changes:
+            old, new = changes[field]
+            counter[f'{prefix}.{old}'] -= 1
+            counter[f'{prefix}.{new}'] += 1
+    if counter:
+        _apply({_scope_for(bug): counter})
+
+
+@bugs_deleted.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    _apply(_bug_deltas(bugs, -1))
+
+
+def _scope_filter(scope):
+    if scope == GLOBAL_SCOPE:
+        return {'project': None}
+    return {'project': ObjectId(scope)}
+
+
+def _document(rows):
+    total = 0
+    status_counts = Counter()
+    priority_counts = Counter()
+    for row in rows:
+        total += row['count']
+        status_counts[row['_id'].get('status')] += row['count']
+        priority_counts[row['_id'].get('priority')] += row['count']
+    return {
+        'total': total,
+        'status_counts': {status: status_counts[status] for status in STATUSES},
+        'priority_counts': {priority: priority_counts[priority] for priority in PRIORITIES},
+        'reconciled_at': datetime.utcnow()
+    }
+
+
+def reconcile(scope):
+    """Recompute the counters for a scope with a single aggregation"""
+    pipeline = [
+        {'$match': _scope_filter(scope)},
+        {'$group': {
+            '_id': {'status': '$status', 'priority': '$priority'},
+            'count': {'$sum': 1}
+        }}
+    ]
+    document = _document(aggregate_both(pipeline))
+    BugStats._get_collection().replace_one({'_id': scope}, document, upsert=True)
+    return document
+
+
+def reconcile_all():
+    """Recompute every scope in one aggregation; returns the bugs counted"""
+    pipeline = [
+        {'$group': {
+            '_id': {'project': '$project', 'status': '$status', 'priority': '$priority'},
+            'count': {'$sum': 1}
+        }}
+    ]
+    rows_by_scope = {}
+    for row in aggregate_both(pipeline):
+        rows_by_scope.setdefault(scope_of(row['_id'].get('project')), []).append(row)
+
+    collection = BugStats._get_collection()
+    for scope, rows in rows_by_scope.items():
+        collection.replace_one({'_id': scope}, _document(rows), upsert=True)
+    # Scopes whose bugs are all gone
+    collection.delete_many({'_id': {'$nin': list(rows_by_scope)}})
+    return sum(row['count'] for rows in rows_by_scope.values() for row in rows)
+
+
+def get_stats(scope):
+    """Return the counters for a scope, building them on first use"""
+    document = BugStats._get_collection().find_one({'_id': scope})
+    if document is None:
+        document = reconcile(scope)
+
+    status_counts = document.get('status_counts', {})
+    priority_counts = document.get('priority_counts', {})
+    return {
+        'total': max(document.get('total', 0), 0),
+        'status_counts': {status: max(status_counts.get(status, 0), 0) for status in STATUSES},
+        'priority_counts': {priority: max(priority_counts.get(priority, 0), 0) for priority in PRIORITIES}
+    }
+
+
+def format_stats(stats):
+    """Shape counters the way the frontend charts expect them"""
+    status_counts = stats['status_counts']
+    return {
+        'totalBugs': stats['total'],
+        'statusCounts': {
+            'open': status_counts['open'],
+            'inProgress': status_counts['in_progress'],
+            'resolved': status_counts['resolved'],
+            'closed': status_counts['closed']
+        },
+        'priorityCounts': stats['priority_counts']
+    }
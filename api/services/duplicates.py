@@ -0,0 +1,211 @@
+"""
+Near-duplicate bug detection with MinHash and locality-sensitive hashing
+Each bug's title and description are reduced to character shingles and a
+128-value MinHash signature, computed for all shingles at once with NumPy.
+The signature is split into 32 bands of 4 rows; every band hashes to a
+key, and bugs sharing any band key become candidates. Candidates come
+from one indexed lookup on the band keys, so finding duplicates does not
+scan the collection. The MAX_CANDIDATES sharing the most bands (newest
+first on ties) are scored by estimated Jaccard similarity. Only bugs of
+the same project are compared. Signatures are kept up to date by the bug signals.
+"""
+
+import hashlib
+import logging
+import re
+import zlib
+from datetime import datetime
+
+import numpy as np
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
+
+from models_mongo import Bug, BugSignature
+from signals import bug_created, bug_updated, bugs_deleted, bugs_archived, bug_restored
+from services.projects import project_id_of
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# Long pasted logs add shingles without helping to tell bugs apart
+MAX_TEXT_LENGTH = 4000
+
+# Estimated Jaccard similarity needed to report a duplicate
+THRESHOLD = 0.5
+MAX_CANDIDATES = 200
+MAX_RESULTS = 5
+BATCH_SIZE = 500
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Fixed seed: every process must use the same permutations
+_random = np.random.RandomState(1)
+# a < 2**31 and 32-bit shingle hashes keep a * x + b below 2**64
+_A = _random.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _random.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text):
+    text = ' '.join(re.findall(r'\w+', text.lower()))[:MAX_TEXT_LENGTH]
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(title, description=''):
+    """MinHash signature of a bug's text as a uint32 array, or None if empty"""
+    shingles = _shingles(f'{title or ""} {description or ""}')
+    if not shingles:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # One row per shingle, one column per permutation
+    permuted = (np.outer(hashes, _A) + _B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(sig):
+    """One key per band; equal keys mean the band matched exactly"""
+    return [
+        f'{band}:{hashlib.blake2b(sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()}'
+        for band in range(BANDS)
+    ]
+
+
+def _signature_doc(bug_id, project_id, sig):
+    return {
+        '_id': bug_id,
+        'project': project_id,
+        'signature': sig.tobytes(),
+        'bands': band_keys(sig),
+        'updated_at': datetime.utcnow()
+    }
+
+
+def index_bug(bug):
+    """Store or replace a bug's signature"""
+    sig = signature(bug.title, bug.description)
+    collection = BugSignature._get_collection()
+    if sig is None:
+        collection.delete_one({'_id': bug.id})
+    else:
+        collection.replace_one({'_id': bug.id}, _signature_doc(bug.id, project_id_of(bug), sig), upsert=True)
+    return sig
+
+
+def find_duplicates(sig, project_id, exclude_id=None, limit=MAX_RESULTS):
+    """A project's bugs whose text is estimated to be at least THRESHOLD similar"""
+    if sig is None:
+        return []
+    keys = band_keys(sig)
+    query = {'project': project_id, 'bands': {'$in': keys}}
+    if exclude_id is not None:
+        query['_id'] = {'$ne': exclude_id}
+    # More shared bands means a likelier match, so keep those when capping
+    candidates = list(BugSignature._get_collection().aggregate([
+        {'$match': query},
+        {'$project': {
+            'signature': 1,
+            'matched': {'$size': {'$filter': {'input': '$bands', 'cond': {'$in': ['$$this', keys]}}}}
+        }},
+        {'$sort': {'matched': -1, '_id': -1}},
+        {'$limit': MAX_CANDIDATES}
+    ]))
+    if not candidates:
+        return []
+
+    # Fraction of matching MinHash values estimates Jaccard similarity
+    matrix = np.frombuffer(b''.join(doc['signature'] for doc in candidates), dtype=np.uint32)
+    scores = (matrix.reshape(len(candidates), NUM_PERM) == sig).mean(axis=1)
+    ranked = [
+        (candidates[i]['_id'], float(scores[i]))
+        for i in np.argsort(-scores)
+        if scores[i] >= THRESHOLD
+    ][:limit]
+    if not ranked:
+        return []
+
+    bugs = {
+        bug.id: bug
+        for bug in Bug.objects(id__in=[bug_id for bug_id, _ in ranked]).only('id', 'title', 'status')
+    }
+    return [
+        {
+            'id': str(bug_id),
+            'title': bugs[bug_id].title,
+            'status': bugs[bug_id].status,
+            'similarity': round(score, 2)
+        }
+        for bug_id, score in ranked
+        if bug_id in bugs
+    ]
+
+
+def duplicates_of(bug, limit=MAX_RESULTS):
+    """Likely duplicates of an existing bug, using its stored signature"""
+    stored = BugSignature._get_collection().find_one({'_id': bug.id}, {'signature': 1})
+    if stored:
+        sig = np.frombuffer(stored['signature'], dtype=np.uint32)
+    else:
+        sig = signature(bug.title, bug.description)
+    return find_duplicates(sig, project_id_of(bug), exclude_id=bug.id, limit=limit)
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, **extra):
+    try:
+        index_bug(bug)
+    except PyMongoError:
+        # reindex() fills in signatures that were missed
+        logger.warning('Could not index bug %s for duplicate detection', bug.id, exc_info=True)
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, **extra):
+    if 'title' in changes or 'description' in changes:
+        _on_bug_created(sender, bug)
+
+
+@bug_restored.connect
+def _on_bug_restored(sender, bug, **extra):
+    # Only hot bugs are compared, so archiving dropped the signature
+    _on_bug_created(sender, bug)
+
+
+@bugs_deleted.connect
+@bugs_archived.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    try:
+        BugSignature._get_collection().delete_many({'_id': {'$in': [bug.id for bug in bugs]}})
+    except PyMongoError:
+        logger.warning('Could not remove signatures of %d deleted bugs', len(bugs), exc_info=True)
+
+
+def reindex():
+    """Rebuild every signature from the bugs collection; returns bugs indexed"""
+    collection = BugSignature._get_collection()
+    started = datetime.utcnow()
+    indexed = 0
+    operations = []
+    for doc in Bug._get_collection().find({}, {'project': 1, 'title': 1, 'description': 1}):
+        sig = signature(doc.get('title'), doc.get('description'))
+        if sig is None:
+            continue
+        document = _signature_doc(doc['_id'], doc.get('project'), sig)
+        operations.append(ReplaceOne({'_id': doc['_id']}, document, upsert=True))
+        if len(operations) >= BATCH_SIZE:
+            collection.bulk_write(operations, ordered=False)
+            indexed += len(operations)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        indexed += len(operations)
+    # Anything not rewritten belongs to a bug that no longer exists
+    collection.delete_many({'updated_at': {'$lt': started}})
+    return indexed
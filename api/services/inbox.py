@@ -0,0 +1,165 @@
+"""
+Per-user "my work" inbox in Redis sorted sets
+Each user has one sorted set of the open bugs assigned to them and one of
+the open bugs they reported. A bug's score puts priority first and its
+last update second, so a reverse range lists critical work newest first
+without a user lookup or a sorted Mongo query. Bug signals keep the sets
+current; ``rebuild`` reconstructs them from Mongo after Redis loses data
+or drifts.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+import redis
+
+from extensions import redis_client
+from models_mongo import Bug
+from signals import bug_created, bug_updated, bugs_deleted, bugs_archived, bug_restored, comment_added
+
+logger = logging.getLogger(__name__)
+
+INBOX_KEY = 'bugtracker:inbox:{}:{}'
+BOXES = ('assigned', 'reported')
+
+# Bugs still needing work; resolving or closing one drops it from the inbox
+OPEN_STATUSES = ('open', 'in_progress')
+
+PRIORITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+# Wider than any timestamp in seconds, so priority always outranks recency
+RANK_WEIGHT = 10 ** 10
+
+_EPOCH = datetime(1970, 1, 1)
+REBUILD_CHUNK = 1000
+
+
+def _key(user_id, box):
+    return INBOX_KEY.format(user_id, box)
+
+
+def score(priority, updated_at):
+    seconds = ((updated_at or datetime.utcnow()) - _EPOCH).total_seconds()
+    return PRIORITY_RANK.get(priority, 0) * RANK_WEIGHT + seconds
+
+
+def _ref_id(bug, field):
+    """A referenced user's id as a string, without dereferencing it"""
+    value = bug._data.get(field)
+    if value is None:
+        return None
+    return str(getattr(value, 'id', value))
+
+
+def _refresh(bug, old_assignee=None):
+    """Add a bug to its users' inboxes, or remove it once it is done"""
+    bug_id = str(bug.id)
+    owners = [('assigned', _ref_id(bug, 'assignee')), ('reported', _ref_id(bug, 'reporter'))]
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        if old_assignee:
+            pipeline.zrem(_key(old_assignee, 'assigned'), bug_id)
+        for box, user_id in owners:
+            if not user_id:
+                continue
+            if bug.status in OPEN_STATUSES:
+                pipeline.zadd(_key(user_id, box), {bug_id: score(bug.priority, bug.updated_at)})
+            else:
+                pipeline.zrem(_key(user_id, box), bug_id)
+        pipeline.execute()
+    except redis.RedisError:
+        # The next write to the bug or a rebuild repairs the inbox
+        logger.warning('Could not update inboxes for bug %s', bug_id, exc_info=True)
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, **extra):
+    _refresh(bug)
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, **extra):
+    old_assignee = changes['assignee'][0] if 'assignee' in changes else None
+    _refresh(bug, old_assignee)
+
+
+@comment_added.connect
+def _on_comment_added(sender, bug, comment, **extra):
+    # A comment bumps updated_at, which moves the bug up
+    _refresh(bug)
+
+
+@bug_restored.connect
+def _on_bug_restored(sender, bug, **extra):
+    _refresh(bug)
+
+
+@bugs_deleted.connect
+@bugs_archived.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        for bug in bugs:
+            for box, field in (('assigned', 'assignee'), ('reported', 'reporter')):
+                user_id = _ref_id(bug, field)
+                if user_id:
+                    pipeline.zrem(_key(user_id, box), str(bug.id))
+        pipeline.execute()
+    except redis.RedisError:
+        logger.warning('Could not remove %d bugs from inboxes', len(bugs), exc_info=True)
+
+
+def page(user_id, box, page_number=1, per_page=20):
+    """One page of bug ids from a user's inbox, best first, and the total"""
+    key = _key(user_id, box)
+    start = (page_number - 1) * per_page
+    pipeline = redis_client.pipeline(transaction=False)
+    pipeline.zrevrange(key, start, start + per_page - 1)
+    pipeline.zcard(key)
+    ids, total = pipeline.execute()
+    return ids, total
+
+
+def discard(user_id, box, bug_ids):
+    """Drop ids that no longer resolve to an open hot bug"""
+    if not bug_ids:
+        return
+    try:
+        redis_client.zrem(_key(user_id, box), *bug_ids)
+    except redis.RedisError:
+        pass
+
+
+def rebuild():
+    """Reconstruct every inbox from the open bugs; returns how many bugs were indexed"""
+    entries = defaultdict(dict)
+    indexed = 0
+    cursor = Bug._get_collection().find(
+        {'status': {'$in': list(OPEN_STATUSES)}},
+        {'reporter': 1, 'assignee': 1, 'priority': 1, 'updated_at': 1}
+    )
+    for doc in cursor:
+        bug_score = score(doc.get('priority'), doc.get('updated_at'))
+        if doc.get('assignee'):
+            entries[_key(doc['assignee'], 'assigned')][str(doc['_id'])] = bug_score
+        if doc.get('reporter'):
+            entries[_key(doc['reporter'], 'reported')][str(doc['_id'])] = bug_score
+        indexed += 1
+
+    stale = {
+        key for key in redis_client.scan_iter(match=INBOX_KEY.format('*', '*'), count=REBUILD_CHUNK)
+        if key not in entries
+    }
+    for key, members in entries.items():
+        # Fill a scratch key and swap it in, so readers never see a partial set
+        scratch = f'{key}:rebuild'
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.delete(scratch)
+        items = list(members.items())
+        for start in range(0, len(items), REBUILD_CHUNK):
+            pipeline.zadd(scratch, dict(items[start:start + REBUILD_CHUNK]))
+        pipeline.rename(scratch, key)
+        pipeline.execute()
+    if stale:
+        redis_client.delete(*stale)
+    return indexed
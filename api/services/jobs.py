@@ -0,0 +1,221 @@
+"""
+Redis-backed background job queue
+Jobs are stored as Redis hashes and their ids pushed onto a list. Worker
+processes (``flask --app api/app.py worker``) claim ids atomically together
+with a lease, run the registered handler and record progress, results and
+errors on the job hash. Failed jobs are retried with exponential backoff;
+jobs whose worker died are re-queued once their lease expires. Everything
+lives on ``queue_client``, a Redis that must not evict keys.
+"""
+
+import json
+import logging
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+from extensions import queue_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'bugtracker:jobs:queue'
+RUNNING_KEY = 'bugtracker:jobs:running'
+DELAYED_KEY = 'bugtracker:jobs:delayed'
+SCHEDULE_KEY = 'bugtracker:jobs:schedule:{}'
+JOB_KEY = 'bugtracker:job:{}'
+
+LEASE_SECONDS = 60
+RETRY_BASE_SECONDS = 5
+# Finished jobs stay queryable for a week
+FINISHED_TTL_SECONDS = 7 * 24 * 3600
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+_handlers = {}
+_schedules = {}
+
+# Pop a job id and lease it in one step so a crash cannot lose it
+_claim_script = queue_client.register_script("""
+local job_id = redis.call('RPOP', KEYS[1])
+if job_id then
+    redis.call('ZADD', KEYS[2], ARGV[1], job_id)
+end
+return job_id
+""")
+
+# Move due entries from a sorted set back onto the queue
+_requeue_script = queue_client.register_script("""
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, job_id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('LPUSH', KEYS[2], job_id)
+end
+return #ids
+""")
+
+
+def job(name, max_attempts=3):
+    """Register a handler; it is called as handler(ctx, **payload)"""
+    def decorator(func):
+        _handlers[name] = {'func': func, 'max_attempts': max_attempts}
+        return func
+    return decorator
+
+
+def schedule(name, every_seconds, payload=None):
+    """Enqueue job ``name`` every N seconds, once across all workers"""
+    _schedules[name] = {'every': every_seconds, 'payload': payload or {}}
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def enqueue(name, payload=None, created_by=None):
+    """Queue a registered job and return its id"""
+    if name not in _handlers:
+        raise ValueError(f'Unknown job: {name}')
+    job_id = uuid.uuid4().hex
+    pipeline = queue_client.pipeline()
+    pipeline.hset(JOB_KEY.format(job_id), mapping={
+        'id': job_id,
+        'name': name,
+        'payload': json.dumps(payload or {}),
+        'status': 'queued',
+        'attempts': 0,
+        'max_attempts': _handlers[name]['max_attempts'],
+        'progress': 0,
+        'message': '',
+        'created_by': created_by or '',
+        'created_at': _now(),
+        'updated_at': _now()
+    })
+    pipeline.lpush(QUEUE_KEY, job_id)
+    pipeline.execute()
+    return job_id
+
+
+def get_job(job_id):
+    """Job status as a dict, or None if unknown or expired"""
+    data = queue_client.hgetall(JOB_KEY.format(job_id))
+    if not data:
+        return None
+    return {
+        'id': data['id'],
+        'name': data['name'],
+        'status': data['status'],
+        'progress': int(data.get('progress', 0)),
+        'message': data.get('message') or None,
+        'attempts': int(data.get('attempts', 0)),
+        'max_attempts': int(data.get('max_attempts', 1)),
+        'result': json.loads(data['result']) if data.get('result') else None,
+        'error': data.get('error') or None,
+        'created_by': data.get('created_by') or None,
+        'created_at': data.get('created_at'),
+        'updated_at': data.get('updated_at')
+    }
+
+
+class JobContext:
+    """Handed to handlers so they can report progress"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def progress(self, percent, message=None):
+        mapping = {'progress': max(0, min(int(percent), 100)), 'updated_at': _now()}
+        if message is not None:
+            mapping['message'] = message
+        queue_client.hset(JOB_KEY.format(self.job_id), mapping=mapping)
+
+
+def _finish(job_id, status, **fields):
+    key = JOB_KEY.format(job_id)
+    pipeline = queue_client.pipeline()
+    pipeline.hset(key, mapping={'status': status, 'updated_at': _now(), **fields})
+    pipeline.zrem(RUNNING_KEY, job_id)
+    pipeline.expire(key, FINISHED_TTL_SECONDS)
+    pipeline.execute()
+
+
+def _renew_lease(job_id, stop):
+    while not stop.wait(LEASE_SECONDS / 3):
+        # xx: only extend a lease that still exists, never re-create one
+        queue_client.zadd(RUNNING_KEY, {job_id: time.time() + LEASE_SECONDS}, xx=True)
+
+
+def _run(job_id):
+    key = JOB_KEY.format(job_id)
+    data = queue_client.hgetall(key)
+    if not data or data.get('status') in FINISHED_STATUSES:
+        # Expired, or already finished and re-queued by a stale lease
+        queue_client.zrem(RUNNING_KEY, job_id)
+        return
+    attempts = queue_client.hincrby(key, 'attempts', 1)
+
+    handler = _handlers.get(data['name'])
+    max_attempts = int(data.get('max_attempts', 1))
+    if handler is None:
+        _finish(job_id, 'failed', error=f"No handler registered for {data['name']}")
+        return
+    if attempts > max_attempts:
+        # Re-queued after its worker died too many times
+        _finish(job_id, 'failed', error='Exceeded maximum attempts')
+        return
+
+    queue_client.hset(key, mapping={'status': 'running', 'updated_at': _now()})
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_renew_lease, args=(job_id, stop), daemon=True)
+    heartbeat.start()
+    result, error = None, None
+    try:
+        result = handler['func'](JobContext(job_id), **json.loads(data['payload']))
+    except Exception:
+        error = traceback.format_exc(limit=5)
+        logger.warning('Job %s (%s) failed on attempt %s', job_id, data['name'], attempts, exc_info=True)
+    finally:
+        # Stop renewing before the job leaves RUNNING, so a late renewal
+        # cannot lease it again and have it re-run when that lease expires
+        stop.set()
+        heartbeat.join()
+
+    if error is None:
+        _finish(job_id, 'succeeded', progress=100, error='',
+                result=json.dumps(result if result is not None else {}))
+    elif attempts < max_attempts:
+        delay = RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        pipeline = queue_client.pipeline()
+        pipeline.hset(key, mapping={'status': 'retrying', 'error': error, 'updated_at': _now()})
+        pipeline.zrem(RUNNING_KEY, job_id)
+        pipeline.zadd(DELAYED_KEY, {job_id: time.time() + delay})
+        pipeline.execute()
+    else:
+        _finish(job_id, 'failed', error=error)
+
+
+def _enqueue_scheduled():
+    for name, entry in _schedules.items():
+        # Whichever worker sets the key first owns this interval
+        if queue_client.set(SCHEDULE_KEY.format(name), _now(), nx=True, ex=entry['every']):
+            enqueue(name, entry['payload'])
+
+
+def work(burst=False, poll_interval=1.0):
+    """Process jobs until interrupted, or until the queue is empty if burst"""
+    logger.info('Job worker started with handlers: %s', ', '.join(sorted(_handlers)))
+    while True:
+        now = time.time()
+        _requeue_script(keys=[DELAYED_KEY, QUEUE_KEY], args=[now])
+        # Leases that expired belong to workers that died mid-job
+        _requeue_script(keys=[RUNNING_KEY, QUEUE_KEY], args=[now])
+        if not burst:
+            _enqueue_scheduled()
+
+        job_id = _claim_script(keys=[QUEUE_KEY, RUNNING_KEY], args=[now + LEASE_SECONDS])
+        if job_id:
+            _run(job_id)
+        elif burst:
+            return
+        else:
+            time.sleep(poll_interval)
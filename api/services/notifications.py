@@ -0,0 +1,158 @@
+"""
+Batched email notifications for assignments and comments
+Bug writes only append a small item to the recipient's pending list in
+Redis, so request latency never depends on mail delivery. The job worker
+periodically claims recipients whose digest window has elapsed, folds
+their items into one digest email each and sends the whole batch over a
+single reused SMTP connection.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import redis
+from flask_mail import Message
+
+from extensions import queue_client, mail
+from models_mongo import User
+from signals import bug_created, bug_updated, comment_added
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'bugtracker:notify:pending:{}'
+DUE_KEY = 'bugtracker:notify:due'
+
+# Items for one recipient are coalesced over this window
+DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFY_DIGEST_WINDOW', 300))
+# Recipients claimed per flush
+FLUSH_BATCH_SIZE = 100
+
+# Atomically take the recipients that are due together with their items
+_claim_script = queue_client.register_script("""
+local recipients = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local claimed = {}
+for _, recipient in ipairs(recipients) do
+    local key = ARGV[3] .. recipient
+    local items = redis.call('LRANGE', key, 0, -1)
+    redis.call('DEL', key)
+    redis.call('ZREM', KEYS[1], recipient)
+    table.insert(claimed, recipient)
+    table.insert(claimed, cjson.encode(items))
+end
+return claimed
+""")
+
+
+def notify(recipient_id, item):
+    """Queue an item for a recipient's next digest"""
+    if not recipient_id:
+        return
+    item = dict(item, at=datetime.utcnow().isoformat())
+    try:
+        pipeline = queue_client.pipeline(transaction=False)
+        pipeline.rpush(PENDING_KEY.format(recipient_id), json.dumps(item))
+        # NX keeps the first item's deadline so later items join the same digest
+        pipeline.zadd(DUE_KEY, {recipient_id: time.time() + DIGEST_WINDOW_SECONDS}, nx=True)
+        pipeline.execute()
+    except redis.RedisError:
+        logger.warning('Could not queue notification for %s', recipient_id, exc_info=True)
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, actor=None, **extra):
+    if bug.assignee and str(bug.assignee.id) != actor:
+        notify(str(bug.assignee.id), {
+            'kind': 'assigned',
+            'bug_id': str(bug.id),
+            'title': bug.title,
+            'actor': actor
+        })
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, actor=None, **extra):
+    if 'assignee' not in changes:
+        return
+    _, new_assignee = changes['assignee']
+    if new_assignee and new_assignee != actor:
+        notify(new_assignee, {
+            'kind': 'assigned',
+            'bug_id': str(bug.id),
+            'title': bug.title,
+            'actor': actor
+        })
+
+
+@comment_added.connect
+def _on_comment_added(sender, bug, comment, actor=None, **extra):
+    recipients = {str(user.id) for user in (bug.reporter, bug.assignee) if user}
+    recipients.discard(actor)
+    for recipient_id in recipients:
+        notify(recipient_id, {
+            'kind': 'comment',
+            'bug_id': str(bug.id),
+            'title': bug.title,
+            'actor': actor,
+            'excerpt': comment.content[:200]
+        })
+
+
+def _describe(item, usernames):
+    who = usernames.get(item.get('actor'), 'Someone')
+    if item['kind'] == 'assigned':
+        return f"{who} assigned you to \"{item['title']}\""
+    return f"{who} commented on \"{item['title']}\": {item.get('excerpt', '')}"
+
+
+def _build_digest(user, items, usernames):
+    lines = [f'Hi {user.username},', '', 'Here is what happened on your bugs:', '']
+    lines.extend(f'- {_describe(item, usernames)}' for item in items)
+    subject = f'Bug Tracker: {len(items)} update{"s" if len(items) != 1 else ""}'
+    return Message(subject=subject, recipients=[user.email], body='\n'.join(lines))
+
+
+def _requeue(claimed):
+    """Put claimed items back so the next flush retries them"""
+    pipeline = queue_client.pipeline(transaction=False)
+    for recipient_id, items in claimed.items():
+        if items:
+            pipeline.lpush(PENDING_KEY.format(recipient_id), *reversed(items))
+            pipeline.zadd(DUE_KEY, {recipient_id: time.time() + DIGEST_WINDOW_SECONDS}, nx=True)
+    pipeline.execute()
+
+
+def flush_due_digests():
+    """Send every digest whose window has elapsed; returns recipients handled"""
+    flat = _claim_script(keys=[DUE_KEY], args=[time.time(), FLUSH_BATCH_SIZE, PENDING_KEY.format('')])
+    claimed = {
+        flat[i]: json.loads(flat[i + 1]) if flat[i + 1] != '{}' else []
+        for i in range(0, len(flat), 2)
+    }
+    if not claimed:
+        return 0
+
+    sent = set()
+    try:
+        parsed = {recipient_id: [json.loads(item) for item in items] for recipient_id, items in claimed.items()}
+        actor_ids = {item['actor'] for items in parsed.values() for item in items if item.get('actor')}
+        users = {
+            str(user.id): user
+            for user in User.objects(id__in=list(set(parsed) | actor_ids)).only('id', 'username', 'email', 'is_active')
+        }
+        usernames = {user_id: user.username for user_id, user in users.items()}
+
+        # One SMTP connection for the whole batch
+        with mail.connect() as connection:
+            for recipient_id, items in parsed.items():
+                user = users.get(recipient_id)
+                if items and user and user.is_active:
+                    connection.send(_build_digest(user, items, usernames))
+                sent.add(recipient_id)
+    except Exception:
+        _requeue({recipient_id: items for recipient_id, items in claimed.items() if recipient_id not in sent})
+        raise
+
+    return len(sent)
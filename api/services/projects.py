@@ -0,0 +1,145 @@
+"""
+Projects and membership
+Every bug belongs to a project and every per-project query filters on the
+project id first, matching the project-led indexes. Requests name a
+project by its key; requests that name none use the open ``default``
+project, which holds bugs from before projects existed. The job worker
+moves such bugs into it (``adopt_unscoped_bugs``) when it first starts
+after an upgrade and hourly after that; until then they are treated as
+part of it for access checks.
+"""
+
+from datetime import datetime
+
+from bson import ObjectId
+from mongoengine.errors import NotUniqueError
+
+from models_mongo import Project, User, Bug
+from services import archive
+
+DEFAULT_PROJECT_KEY = 'default'
+
+
+class ProjectNotFound(Exception):
+    pass
+
+
+class ProjectAccessDenied(Exception):
+    pass
+
+
+def default_project():
+    """The default project, created on first use"""
+    project = Project.objects(key=DEFAULT_PROJECT_KEY).first()
+    if project is None:
+        try:
+            Project(key=DEFAULT_PROJECT_KEY, name='Default', open_membership=True).save()
+        except NotUniqueError:
+            # Created concurrently by another worker
+            pass
+        project = Project.objects(key=DEFAULT_PROJECT_KEY).first()
+    return project
+
+
+def adopt_unscoped_bugs():
+    """Move bugs without a project, hot or archived, into the default project
+
+    Returns how many moved. Moved hot bugs count as updated, so delta-sync
+    clients of the default project receive them.
+    """
+    project = default_project()
+    moved = Bug._get_collection().update_many(
+        {'project': None}, {'$set': {'project': project.id, 'updated_at': datetime.utcnow()}}
+    ).modified_count
+    moved += archive.collection().update_many({'project': None}, {'$set': {'project': project.id}}).modified_count
+    return moved
+
+
+def project_id_of(bug):
+    """A bug's project id without loading the project, or None"""
+    return bug.project.id if bug.project else None
+
+
+def _is_admin(user_id):
+    user = User.objects(id=user_id).only('role').first()
+    return bool(user and user.role == 'admin')
+
+
+def can_access(project, user_id):
+    if project.open_membership or ObjectId(user_id) in project.members:
+        return True
+    return _is_admin(user_id)
+
+
+def can_manage(project, user_id):
+    """Owners and admins may change a project's members"""
+    if project.owner and str(project.owner.id) == str(user_id):
+        return True
+    return _is_admin(user_id)
+
+
+def resolve(key, user_id):
+    """The project named by key, or the default one, if user_id may access it"""
+    project = Project.objects(key=key).first() if key else default_project()
+    if project is None:
+        raise ProjectNotFound(key)
+    if not can_access(project, user_id):
+        raise ProjectAccessDenied(key)
+    return project
+
+
+def check_bug_access(bug, user_id):
+    """Raise ProjectAccessDenied unless user_id may see the bug"""
+    check_project_access(project_id_of(bug), user_id)
+
+
+def check_project_access(project_id, user_id):
+    """Raise ProjectAccessDenied unless user_id may see bugs of the project"""
+    if project_id is None:
+        # Not migrated yet; treated as part of the open default project
+        return
+    project = Project.objects(id=project_id).only('open_membership', 'members').first()
+    if project is None:
+        # Deleted projects stay visible to admins only
+        if not _is_admin(user_id):
+            raise ProjectAccessDenied(str(project_id))
+        return
+    if not can_access(project, user_id):
+        raise ProjectAccessDenied(str(project_id))
+
+
+def accessible_project_ids(user_id):
+    """Ids of the projects a user may see, or None for admins (all of them)"""
+    if _is_admin(user_id):
+        return None
+    query = {'$or': [{'members': ObjectId(user_id)}, {'open_membership': True}]}
+    return [doc['_id'] for doc in Project._get_collection().find(query, {'_id': 1})]
+
+
+def summary(project):
+    """The short form embedded in bug representations"""
+    return {'id': str(project.id), 'key': project.key, 'name': project.name}
+
+
+def summary_of(project_id):
+    """The short form of a project by id, or None if it is unset or deleted"""
+    if project_id is None:
+        return None
+    project = Project.objects(id=project_id).only('id', 'key', 'name').first()
+    return summary(project) if project else None
+
+
+def serialize(project, include_members=False):
+    data = {
+        'id': str(project.id),
+        'key': project.key,
+        'name': project.name,
+        'description': project.description,
+        'open_membership': project.open_membership,
+        'member_count': len(project.members),
+        'created_at': project.created_at.isoformat() if project.created_at else None
+    }
+    if include_members:
+        users = User.objects(id__in=project.members).only('id', 'username')
+        data['members'] = [{'id': str(user.id), 'username': user.username} for user in users]
+    return data
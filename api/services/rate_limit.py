@@ -0,0 +1,172 @@
+"""
+Token-bucket rate limiting for expensive endpoints
+Every caller has a bucket per client address plus one per user when
+authenticated, or per targeted account on routes such as login. A
+request spends a route-specific number of tokens from all of its buckets
+at once; buckets refill continuously up to their capacity. The
+check-and-spend runs as one Lua script using the Redis clock, so it is
+atomic across workers and costs a single round trip. While Redis is
+unreachable each worker limits with in-process buckets instead, which
+are per worker and so looser, rather than failing requests or letting
+them through unchecked.
+"""
+
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from flask import request, jsonify
+from flask_jwt_extended import get_jwt_identity
+
+from extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+USER_KEY = 'bugtracker:ratelimit:user:{}'
+IP_KEY = 'bugtracker:ratelimit:ip:{}'
+ACCOUNT_KEY = 'bugtracker:ratelimit:account:{}'
+
+ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+# Capacity in tokens and refill in tokens per second
+USER_CAPACITY = int(os.getenv('RATE_LIMIT_USER_CAPACITY', 60))
+USER_RATE = float(os.getenv('RATE_LIMIT_USER_RATE', 1))
+# One address may be shared by many users (offices, NAT), so it gets more
+IP_CAPACITY = int(os.getenv('RATE_LIMIT_IP_CAPACITY', 300))
+IP_RATE = float(os.getenv('RATE_LIMIT_IP_RATE', 5))
+
+# How long to use local buckets after Redis fails before trying it again
+REDIS_RETRY_SECONDS = 5
+MAX_LOCAL_BUCKETS = 10000
+
+# KEYS: buckets; ARGV: cost, then capacity and rate for each bucket.
+# Spends from every bucket or from none; returns {allowed, seconds to wait}
+_take_script = redis_client.register_script("""
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    tokens = math.min(capacity, tokens + elapsed * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+    -- A bucket left alone this long is full again and need not be stored
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {1, '0'}
+""")
+
+
+class _LocalBuckets:
+    """In-process fallback with the same semantics as the Lua script"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (tokens, last update), least recently used first
+        self._buckets = OrderedDict()
+
+    def take(self, buckets, cost):
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, capacity, rate in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / rate)
+            if wait > 0:
+                return False, wait
+            for (key, _, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > MAX_LOCAL_BUCKETS:
+                self._buckets.popitem(last=False)
+            return True, 0.0
+
+
+_local = _LocalBuckets()
+_redis_retry_at = 0.0
+
+
+def _take(buckets, cost):
+    global _redis_retry_at
+    if time.monotonic() >= _redis_retry_at:
+        args = [cost]
+        for _, capacity, rate in buckets:
+            args.extend([capacity, rate])
+        try:
+            allowed, wait = _take_script(keys=[key for key, _, _ in buckets], args=args)
+            return bool(allowed), float(wait)
+        except redis.RedisError:
+            logger.warning('Rate limiting locally; Redis is unavailable', exc_info=True)
+            _redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+    return _local.take(buckets, cost)
+
+
+def _buckets(account):
+    try:
+        user_id = get_jwt_identity()
+    except RuntimeError:
+        # Route without @jwt_required
+        user_id = None
+    buckets = [(IP_KEY.format(request.remote_addr or 'unknown'), IP_CAPACITY, IP_RATE)]
+    if user_id:
+        buckets.append((USER_KEY.format(user_id), USER_CAPACITY, USER_RATE))
+    elif account is not None:
+        name = account()
+        if name:
+            buckets.append((ACCOUNT_KEY.format(str(name).lower()), USER_CAPACITY, USER_RATE))
+    return buckets
+
+
+def rate_limit(cost=1, account=None):
+    """Charge each call ``cost`` tokens; ``cost`` may be a callable of no arguments
+
+    Place below ``@jwt_required()`` so the user's bucket is charged too. On
+    unauthenticated routes ``account`` may return the account name the
+    request targets, such as the username on login, to limit per account.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if ENABLED:
+                buckets = _buckets(account)
+                charge = cost() if callable(cost) else cost
+                # A cost above the smallest capacity could never be paid
+                charge = min(charge, min(capacity for _, capacity, _ in buckets))
+                if charge > 0:
+                    allowed, wait = _take(buckets, charge)
+                    if not allowed:
+                        retry_after = max(1, math.ceil(wait))
+                        response = jsonify({
+                            'message': 'Too many requests, please retry later',
+                            'retry_after': retry_after
+                        })
+                        response.status_code = 429
+                        response.headers['Retry-After'] = str(retry_after)
+                        return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
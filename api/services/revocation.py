@@ -0,0 +1,58 @@
+"""
+Revoked user tokens
+Deactivating a user (the first step of deleting one) adds its id to a
+Redis sorted set scored by the time of revocation. Every authenticated
+request checks its token's user with one ZSCORE there instead of reading
+the user from MongoDB. The set lives on the non-evicting queue Redis,
+since a lost entry would let a locked-out user back in. Entries are
+pruned once every access token issued before them has expired: the login
+routes refuse inactive users, so no newer token exists.
+"""
+
+import time
+from datetime import timedelta
+
+import redis
+from bson import ObjectId
+from flask import current_app
+
+from extensions import queue_client
+from models_mongo import User
+
+REVOKED_KEY = 'bugtracker:users:revoked'
+# Set by POST /api/batch on its sub-requests to the user id it checked.
+# Not an HTTP_ key, so clients cannot send it
+CHECKED_ENVIRON_KEY = 'bugtracker.checked_user'
+
+
+def _token_lifetime():
+    lifetime = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    if isinstance(lifetime, timedelta):
+        return lifetime.total_seconds()
+    # False means tokens never expire, so entries are never pruned
+    return lifetime or None
+
+
+def revoke(user_id):
+    """Reject the user's tokens from now on"""
+    now = time.time()
+    pipeline = queue_client.pipeline()
+    pipeline.zadd(REVOKED_KEY, {str(user_id): now})
+    lifetime = _token_lifetime()
+    if lifetime:
+        pipeline.zremrangebyscore(REVOKED_KEY, '-inf', now - lifetime)
+    pipeline.execute()
+
+
+def reinstate(user_id):
+    queue_client.zrem(REVOKED_KEY, str(user_id))
+
+
+def is_revoked(user_id):
+    """Whether tokens of user_id must be rejected"""
+    try:
+        return queue_client.zscore(REVOKED_KEY, user_id) is not None
+    except redis.RedisError:
+        # Cannot tell, so ask the database
+        user = User._get_collection().find_one({'_id': ObjectId(user_id)}, {'is_active': 1})
+        return user is None or user.get('is_active') is False
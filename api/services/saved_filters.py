@@ -0,0 +1,168 @@
+"""
+Saved bug filters with maintained match counts
+A saved filter is a combination of the structured ``GET /api/bugs``
+filters (status, priority, assignee, tags) within one project. Its
+``count`` is kept current on bug writes. Each created, updated or deleted
+bug is matched in memory against the project's filters before and after
+the write, and the differences are applied with one bulk ``$inc``. So
+listing filters never runs a count query per filter. Counts cover hot bugs
+only, like the bug list: archiving a bug counts as removing it, restoring
+as adding it, and deletes from the archive are ignored. ``reconcile``
+repairs any drift.
+"""
+
+import logging
+from collections import Counter, defaultdict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from models_mongo import Bug, SavedFilter
+from signals import bug_created, bug_updated, bugs_deleted, bugs_archived, bug_restored
+from services.projects import project_id_of
+
+logger = logging.getLogger(__name__)
+
+MAX_FILTERS_PER_USER = 50
+
+# Bug fields a filter can test; all are tracked in update change sets
+FILTER_FIELDS = ('status', 'priority', 'assignee', 'tags')
+
+_MATCH_FIELDS = ('id', 'status', 'priority', 'assignee', 'unassigned', 'tags', 'tags_mode')
+
+
+def query_of(saved):
+    """The raw bug query a saved filter stands for"""
+    query = {'project': saved.project}
+    if saved.status:
+        query['status'] = saved.status
+    if saved.priority:
+        query['priority'] = saved.priority
+    if saved.unassigned:
+        query['assignee'] = None
+    elif saved.assignee:
+        query['assignee'] = saved.assignee
+    if saved.tags:
+        query['tags'] = {'$all' if saved.tags_mode == 'all' else '$in': list(saved.tags)}
+    return query
+
+
+def matches(saved, values):
+    """Whether bug field values (as from ``_values``) satisfy a saved filter"""
+    if saved.status and values['status'] != saved.status:
+        return False
+    if saved.priority and values['priority'] != saved.priority:
+        return False
+    if saved.unassigned and values['assignee'] is not None:
+        return False
+    if saved.assignee and values['assignee'] != saved.assignee:
+        return False
+    if saved.tags:
+        wanted = set(saved.tags)
+        if saved.tags_mode == 'all':
+            return wanted <= values['tags']
+        return bool(wanted & values['tags'])
+    return True
+
+
+def _values(bug):
+    assignee = bug._data.get('assignee')
+    return {
+        'status': bug.status,
+        'priority': bug.priority,
+        'assignee': getattr(assignee, 'id', assignee),
+        'tags': set(bug.tags or [])
+    }
+
+
+def _filters_for(project_id):
+    return list(SavedFilter.objects(project=project_id).only(*_MATCH_FIELDS))
+
+
+def _deltas(filters, before, after):
+    """Count changes for one bug moving from ``before`` to ``after`` values"""
+    deltas = Counter()
+    for saved in filters:
+        delta = (after is not None and matches(saved, after)) - (before is not None and matches(saved, before))
+        if delta:
+            deltas[saved.id] += delta
+    return deltas
+
+
+def _apply(deltas):
+    operations = [
+        UpdateOne({'_id': filter_id}, {'$inc': {'count': delta}})
+        for filter_id, delta in deltas.items() if delta
+    ]
+    if not operations:
+        return
+    try:
+        SavedFilter._get_collection().bulk_write(operations, ordered=False)
+    except PyMongoError:
+        # The bug write already succeeded; reconcile() repairs the drift
+        logger.warning('Could not update saved filter counts', exc_info=True)
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, **extra):
+    _apply(_deltas(_filters_for(project_id_of(bug)), None, _values(bug)))
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, **extra):
+    changed = [field for field in FILTER_FIELDS if field in changes]
+    if not changed:
+        return
+    after = _values(bug)
+    before = dict(after)
+    for field in changed:
+        old = changes[field][0]
+        if field == 'assignee':
+            old = ObjectId(old) if old else None
+        elif field == 'tags':
+            old = set(old or [])
+        before[field] = old
+    _apply(_deltas(_filters_for(project_id_of(bug)), before, after))
+
+
+@bug_restored.connect
+def _on_bug_restored(sender, bug, **extra):
+    _on_bug_created(sender, bug)
+
+
+@bugs_deleted.connect
+def _on_bugs_deleted(sender, bugs, archived=False, **extra):
+    if archived:
+        # Never counted
+        return
+    _on_bugs_archived(sender, bugs)
+
+
+@bugs_archived.connect
+def _on_bugs_archived(sender, bugs, **extra):
+    by_project = defaultdict(list)
+    for bug in bugs:
+        by_project[project_id_of(bug)].append(bug)
+    deltas = Counter()
+    for project_id, project_bugs in by_project.items():
+        filters = _filters_for(project_id)
+        if not filters:
+            continue
+        for bug in project_bugs:
+            deltas.update(_deltas(filters, _values(bug), None))
+    _apply(deltas)
+
+
+def count(saved):
+    """Count a filter's matches from scratch"""
+    return Bug.objects(__raw__=query_of(saved)).count()
+
+
+def reconcile():
+    """Recount every saved filter; returns how many were recounted"""
+    recounted = 0
+    for saved in SavedFilter.objects.only(*_MATCH_FIELDS, 'project'):
+        SavedFilter.objects(id=saved.id).update_one(set__count=count(saved))
+        recounted += 1
+    return recounted
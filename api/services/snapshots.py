@@ -0,0 +1,313 @@
+"""
+Columnar analytics snapshots of bugs, comments and users
+``flask snapshot`` writes Parquet files to local disk so analysis can read
+files instead of the live API. Each run exports only bugs whose
+``updated_at`` moved past the stored watermark, walking the
+(updated_at, _id) index, into a new delta file per table. Compaction
+folds the deltas into one base file per table, keeping the latest export
+of every bug and dropping bugs that were deleted. Users carry no
+``updated_at``, so the (small) users table is rewritten on every run.
+
+Layout::
+
+    <out>/watermark.json
+    <out>/bugs/base.parquet, <out>/bugs/delta-<run>.parquet, ...
+    <out>/comments/base.parquet, <out>/comments/delta-<run>.parquet, ...
+    <out>/users.parquet
+
+Between compactions a bug can appear in several bug files; the row with
+the greatest ``exported_at`` is current, and its comments are the comment
+rows with the same ``bug_id`` and ``exported_at``.
+
+Exports read from secondaries when available, so the primary does not
+serve the full scans.
+"""
+
+import glob
+import json
+import os
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import db_policy
+from models_mongo import Bug, User
+from services import archive
+
+WATERMARK_FILE = 'watermark.json'
+# Writes stamped this close to the run are left for the next run, since
+# they may not be visible yet; a secondary may lag by up to its staleness
+SAFETY_LAG = timedelta(seconds=5 + db_policy.MAX_STALENESS_SECONDS + db_policy.HEARTBEAT_SECONDS)
+# Deltas allowed to pile up before a run compacts automatically
+COMPACT_AFTER = 10
+BATCH_SIZE = 5000
+
+BUG_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('project_id', pa.string()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('status', pa.string()),
+    ('priority', pa.string()),
+    ('tags', pa.list_(pa.string())),
+    ('reporter_id', pa.string()),
+    ('assignee_id', pa.string()),
+    ('environment', pa.string()),
+    ('comment_count', pa.int32()),
+    ('created_at', pa.timestamp('ms')),
+    ('updated_at', pa.timestamp('ms')),
+    ('exported_at', pa.timestamp('ms'))
+])
+
+COMMENT_SCHEMA = pa.schema([
+    ('bug_id', pa.string()),
+    ('position', pa.int32()),
+    ('author_id', pa.string()),
+    ('content', pa.string()),
+    ('created_at', pa.timestamp('ms')),
+    ('exported_at', pa.timestamp('ms'))
+])
+
+# No password hashes, emails or Google ids in analytics files
+USER_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('username', pa.string()),
+    ('role', pa.string()),
+    ('auth_provider', pa.string()),
+    ('is_active', pa.bool_()),
+    ('created_at', pa.timestamp('ms'))
+])
+
+BUG_FIELDS = {
+    'project': 1, 'title': 1, 'description': 1, 'status': 1, 'priority': 1, 'tags': 1,
+    'reporter': 1, 'assignee': 1, 'environment': 1, 'comments': 1,
+    'created_at': 1, 'updated_at': 1
+}
+
+
+def _str_or_none(value):
+    return str(value) if value is not None else None
+
+
+def _read_watermark(directory):
+    path = os.path.join(directory, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return datetime.fromisoformat(json.load(f)['bugs_updated_at'])
+
+
+def _write_atomic(path, write):
+    tmp_path = f'{path}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_watermark(directory, watermark):
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump({'bugs_updated_at': watermark.isoformat()}, f)
+    _write_atomic(os.path.join(directory, WATERMARK_FILE), write)
+
+
+class _BatchWriter:
+    """Appends row dicts to a Parquet file one row group per batch"""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self.rows = []
+        self.count = 0
+        self._writer = None
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(f'{self.path}.tmp', self.schema)
+        self._writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+        self.count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(f'{self.path}.tmp', self.path)
+
+
+def _export_bug(bugs, comments, doc, until):
+    """Add one bug document and its comments to the open writers"""
+    bug_id = str(doc['_id'])
+    doc_comments = doc.get('comments') or []
+    bugs.add({
+        'id': bug_id,
+        'project_id': _str_or_none(doc.get('project')),
+        'title': doc.get('title'),
+        'description': doc.get('description'),
+        'status': doc.get('status'),
+        'priority': doc.get('priority'),
+        'tags': doc.get('tags') or [],
+        'reporter_id': _str_or_none(doc.get('reporter')),
+        'assignee_id': _str_or_none(doc.get('assignee')),
+        'environment': doc.get('environment'),
+        'comment_count': len(doc_comments),
+        'created_at': doc.get('created_at'),
+        'updated_at': doc.get('updated_at'),
+        'exported_at': until
+    })
+    for position, comment in enumerate(doc_comments):
+        comments.add({
+            'bug_id': bug_id,
+            'position': position,
+            'author_id': _str_or_none(comment.get('author')),
+            'content': comment.get('content'),
+            'created_at': comment.get('created_at'),
+            'exported_at': until
+        })
+
+
+def _export_bugs(directory, since, until):
+    run = until.strftime('%Y%m%dT%H%M%S%f')
+    bugs = _BatchWriter(os.path.join(directory, 'bugs', f'delta-{run}.parquet'), BUG_SCHEMA)
+    comments = _BatchWriter(os.path.join(directory, 'comments', f'delta-{run}.parquet'), COMMENT_SCHEMA)
+
+    updated_at = {'$lte': until}
+    if since is not None:
+        updated_at['$gt'] = since
+    # Archived bugs are exported too; moving tiers leaves updated_at alone,
+    # so only a fresh directory or a change picks them up. A bug moving
+    # between the two scans is written once
+    seen = set()
+    for source in (Bug._get_collection(), archive.collection()):
+        cursor = (
+            source
+            .find({'updated_at': updated_at}, BUG_FIELDS)
+            .sort([('updated_at', 1), ('_id', 1)])
+            .batch_size(BATCH_SIZE)
+        )
+        for doc in cursor:
+            if doc['_id'] in seen:
+                continue
+            seen.add(doc['_id'])
+            _export_bug(bugs, comments, doc, until)
+
+    bugs.close()
+    comments.close()
+    return bugs.count, comments.count
+
+
+def _export_users(directory):
+    users = _BatchWriter(os.path.join(directory, 'users.parquet'), USER_SCHEMA)
+    projection = {'username': 1, 'role': 1, 'auth_provider': 1, 'is_active': 1, 'created_at': 1}
+    for doc in User._get_collection().find({}, projection).batch_size(BATCH_SIZE):
+        users.add({
+            'id': str(doc['_id']),
+            'username': doc.get('username'),
+            'role': doc.get('role'),
+            'auth_provider': doc.get('auth_provider'),
+            'is_active': doc.get('is_active'),
+            'created_at': doc.get('created_at')
+        })
+    users.close()
+    return users.count
+
+
+def _partitions(directory, table):
+    paths = sorted(glob.glob(os.path.join(directory, table, 'delta-*.parquet')))
+    base = os.path.join(directory, table, 'base.parquet')
+    return ([base] if os.path.exists(base) else []), paths
+
+
+def _read(paths, schema):
+    if not paths:
+        return schema.empty_table()
+    return pa.concat_tables(pq.read_table(path, schema=schema) for path in paths)
+
+
+def compact(directory):
+    """Fold delta files into one base file per table; returns bugs kept"""
+    bug_base, bug_deltas = _partitions(directory, 'bugs')
+    comment_base, comment_deltas = _partitions(directory, 'comments')
+    if not bug_deltas and not comment_deltas:
+        return None
+
+    bugs = _read(bug_base + bug_deltas, BUG_SCHEMA)
+
+    # Keep only each bug's latest export; the join runs on a narrow key
+    # table because list columns such as tags cannot pass through joins
+    keys = pa.table({
+        'id': bugs['id'],
+        'exported_at': bugs['exported_at'],
+        'row': pa.array(range(bugs.num_rows), type=pa.int64())
+    })
+    latest = keys.group_by('id').aggregate([('exported_at', 'max')])
+    keys = keys.join(latest, keys='id')
+    keys = keys.filter(pc.equal(keys['exported_at'], keys['exported_at_max']))
+    bugs = bugs.take(keys['row'])
+
+    # Drop bugs deleted since they were exported; archived bugs are kept
+    live_ids = pa.array(
+        [
+            str(doc['_id'])
+            for source in (Bug._get_collection(), archive.collection())
+            for doc in source.find({}, {'_id': 1}).batch_size(BATCH_SIZE)
+        ],
+        type=pa.string()
+    )
+    bugs = bugs.filter(pc.is_in(bugs['id'], value_set=live_ids))
+    bugs = bugs.sort_by([('updated_at', 'ascending'), ('id', 'ascending')]).select(BUG_SCHEMA.names)
+
+    comments = _read(comment_base + comment_deltas, COMMENT_SCHEMA)
+    comments = comments.join(
+        bugs.select(['id', 'exported_at']),
+        keys=['bug_id', 'exported_at'],
+        right_keys=['id', 'exported_at'],
+        join_type='inner'
+    )
+    comments = comments.sort_by([('bug_id', 'ascending'), ('position', 'ascending')]).select(COMMENT_SCHEMA.names)
+
+    # Bases are replaced atomically; a crash before the deltas are removed
+    # only leaves duplicates that the next compaction folds away again
+    _write_atomic(os.path.join(directory, 'bugs', 'base.parquet'), lambda path: pq.write_table(bugs, path))
+    _write_atomic(os.path.join(directory, 'comments', 'base.parquet'), lambda path: pq.write_table(comments, path))
+    for path in bug_deltas + comment_deltas:
+        os.remove(path)
+    return bugs.num_rows
+
+
+def export(directory, compact_now=False):
+    """Export changes since the last run; returns counts for reporting"""
+    os.makedirs(os.path.join(directory, 'bugs'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'comments'), exist_ok=True)
+
+    since = _read_watermark(directory)
+    until = datetime.utcnow() - SAFETY_LAG
+    # MongoDB and the Parquet columns keep milliseconds
+    until = until.replace(microsecond=until.microsecond // 1000 * 1000)
+    with db_policy.using('secondary'):
+        bug_count, comment_count = _export_bugs(directory, since, until)
+        user_count = _export_users(directory)
+        # Only advance once the delta files are in place
+        _write_watermark(directory, until)
+
+        _, deltas = _partitions(directory, 'bugs')
+        compacted = None
+        if compact_now or len(deltas) >= COMPACT_AFTER:
+            compacted = compact(directory)
+
+    return {
+        'bugs': bug_count,
+        'comments': comment_count,
+        'users': user_count,
+        'since': since,
+        'until': until,
+        'compacted': compacted
+    }
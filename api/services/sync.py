@@ -0,0 +1,170 @@
+"""
+Delta sync for clients that keep a local copy of the bug list
+A sync token is an opaque, URL-safe encoding of two cursors: the last
+(updated_at, _id) of bugs already sent, served by the (updated_at, _id)
+index, and the last (deleted_at, _id) of tombstones already sent. Each
+call returns what moved past both cursors and a new token. Rows stamped
+within the last few seconds are held back until the next call, so a
+write whose timestamp was taken before a slower concurrent write commits
+cannot be skipped. Tombstones are written when bugs are deleted or
+archived, since sync only serves hot bugs, and expire after
+TOMBSTONE_TTL_SECONDS; older tokens are rejected. A bug restored from the
+archive drops its tombstone and gets a fresh updated_at, so clients pick
+it up again. A sync covers one project, served by the project-led indexes.
+"""
+
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from models_mongo import Bug, BugTombstone, TOMBSTONE_TTL_SECONDS
+from signals import bugs_deleted, bugs_archived, bug_restored
+from services.projects import project_id_of
+
+logger = logging.getLogger(__name__)
+
+SAFETY_LAG = timedelta(seconds=5)
+MAX_PAGE_SIZE = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+@bugs_deleted.connect
+@bugs_archived.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne({'_id': bug.id}, {'$set': {'deleted_at': now, 'project': project_id_of(bug)}}, upsert=True)
+        for bug in bugs
+    ]
+    try:
+        BugTombstone._get_collection().bulk_write(operations, ordered=False)
+    except PyMongoError:
+        # Clients keep the deleted bugs until they resync from scratch
+        logger.warning('Could not record tombstones for %d deleted bugs', len(bugs), exc_info=True)
+
+
+@bug_restored.connect
+def _on_bug_restored(sender, bug, **extra):
+    # Its updated_at predates the tombstone, so bump it past every token
+    try:
+        BugTombstone._get_collection().delete_one({'_id': bug.id})
+        Bug._get_collection().update_one({'_id': bug.id}, {'$set': {'updated_at': datetime.utcnow()}})
+    except PyMongoError:
+        logger.warning('Could not resurface restored bug %s for sync', bug.id, exc_info=True)
+
+
+def _to_ms(moment):
+    return (moment - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _from_ms(ms):
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
+def _truncate(moment):
+    # MongoDB keeps milliseconds
+    return moment.replace(microsecond=moment.microsecond // 1000 * 1000)
+
+
+def encode_token(bug_cursor, deleted_cursor):
+    payload = {
+        'b': [_to_ms(bug_cursor[0]), bug_cursor[1]],
+        'd': [_to_ms(deleted_cursor[0]), deleted_cursor[1]]
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        cursors = []
+        for key in ('b', 'd'):
+            ms, last_id = payload[key]
+            if last_id is not None and not ObjectId.is_valid(last_id):
+                raise ValueError(last_id)
+            cursors.append((_from_ms(int(ms)), last_id))
+    except (binascii.Error, ValueError, TypeError, KeyError, OverflowError):
+        raise InvalidToken('Invalid sync token')
+    return tuple(cursors)
+
+
+def _after(project_id, field, cursor, until):
+    """A project's rows past (moment, last_id) in (field, _id) order, up to until"""
+    moment, last_id = cursor
+    if last_id is None:
+        after = {field: {'$gt': moment}}
+    else:
+        after = {'$or': [
+            {field: {'$gt': moment}},
+            {field: moment, '_id': {'$gt': ObjectId(last_id)}}
+        ]}
+    return {'project': project_id, '$and': [after, {field: {'$lte': until}}]}
+
+
+def _advance(cursor, rows, more, field, until):
+    """Cursor after a page: the last row, or until once nothing is left"""
+    if more:
+        return (getattr(rows[-1], field), str(rows[-1].id))
+    return (until, None) if until >= cursor[0] else cursor
+
+
+def changes(project_id, since=None, limit=100):
+    """A project's bugs changed and ids deleted since a token, and the next token
+
+    Without a token every bug is returned, page by page, and no tombstones.
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    now = datetime.utcnow()
+    until = _truncate(now - SAFETY_LAG)
+
+    if since:
+        bug_cursor, deleted_cursor = decode_token(since)
+        if deleted_cursor[0] < now - timedelta(seconds=TOMBSTONE_TTL_SECONDS):
+            raise ExpiredToken('Sync token expired; sync again from scratch')
+    else:
+        bug_cursor, deleted_cursor = (_EPOCH, None), (until, None)
+
+    bugs = list(
+        Bug.objects(__raw__=_after(project_id, 'updated_at', bug_cursor, until))
+        .order_by('updated_at', 'id')
+        .limit(limit + 1)
+        .select_related()
+    )
+    more_bugs = len(bugs) > limit
+    bugs = bugs[:limit]
+
+    tombstones = list(
+        BugTombstone.objects(__raw__=_after(project_id, 'deleted_at', deleted_cursor, until))
+        .order_by('deleted_at', 'id')
+        .limit(limit + 1)
+    )
+    more_deleted = len(tombstones) > limit
+    tombstones = tombstones[:limit]
+
+    next_token = encode_token(
+        _advance(bug_cursor, bugs, more_bugs, 'updated_at', until),
+        _advance(deleted_cursor, tombstones, more_deleted, 'deleted_at', until)
+    )
+    return {
+        'bugs': bugs,
+        'deleted': [str(tombstone.id) for tombstone in tombstones],
+        'next_token': next_token,
+        'has_more': more_bugs or more_deleted
+    }
@@ -0,0 +1,127 @@
+"""
+Maintained tag usage counters
+The ``bug_tags`` collection holds one document per project and tag with
+the number of the project's bugs carrying it. Documents are keyed
+``<project id>:<tag>``, so a project's tags by prefix are one ``_id``
+range. Bug writes adjust the counters with a single bulk ``$inc``, so
+tag-cloud and autocomplete reads never aggregate over the ``bugs``
+collection. ``reconcile`` rebuilds the counters from scratch, counting
+archived bugs too.
+"""
+
+import logging
+from collections import Counter
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from models_mongo import TagCount
+from signals import bug_created, bug_updated, bugs_deleted
+from services.projects import project_id_of
+from services.archive import aggregate_both
+
+logger = logging.getLogger(__name__)
+
+MAX_TAGS = 100
+
+
+def _key(project_id, tag):
+    return f'{project_id or ""}:{tag}'
+
+
+def _counter_update(project_id, tag, update):
+    return UpdateOne(
+        {'_id': _key(project_id, tag)},
+        {**update, '$setOnInsert': {'project': project_id, 'tag': tag}},
+        upsert=True
+    )
+
+
+def _apply(counter):
+    """Apply a Counter of (project id, tag) deltas"""
+    operations = [
+        _counter_update(project_id, tag, {'$inc': {'count': delta}})
+        for (project_id, tag), delta in counter.items() if delta
+    ]
+    if not operations:
+        return
+    try:
+        TagCount._get_collection().bulk_write(operations, ordered=False)
+    except PyMongoError:
+        # The bug write already succeeded; reconcile() repairs the drift
+        logger.warning('Could not update tag counters', exc_info=True)
+
+
+def _keyed(bug, tags):
+    project_id = project_id_of(bug)
+    return [(project_id, tag) for tag in set(tags or [])]
+
+
+@bug_created.connect
+def _on_bug_created(sender, bug, **extra):
+    _apply(Counter(_keyed(bug, bug.tags)))
+
+
+@bug_updated.connect
+def _on_bug_updated(sender, bug, changes, **extra):
+    if 'tags' not in changes:
+        return
+    old, new = (set(_keyed(bug, tags)) for tags in changes['tags'])
+    counter = Counter(new - old)
+    counter.subtract(old - new)
+    _apply(counter)
+
+
+@bugs_deleted.connect
+def _on_bugs_deleted(sender, bugs, **extra):
+    counter = Counter()
+    for bug in bugs:
+        counter.subtract(_keyed(bug, bug.tags))
+    _apply(counter)
+
+
+def top_tags(project_id, limit=50):
+    """A project's most used tags, for the tag cloud"""
+    limit = min(max(limit, 1), MAX_TAGS)
+    documents = (
+        TagCount._get_collection()
+        .find({'project': project_id, 'count': {'$gt': 0}})
+        .sort('count', -1)
+        .limit(limit)
+    )
+    return [{'tag': doc['tag'], 'count': doc['count']} for doc in documents]
+
+
+def suggest(project_id, prefix, limit=10):
+    """A project's tags starting with prefix, most used first"""
+    limit = min(max(limit, 1), MAX_TAGS)
+    start = _key(project_id, prefix)
+    documents = (
+        TagCount._get_collection()
+        .find({'_id': {'$gte': start, '$lt': start + '\uffff'}, 'count': {'$gt': 0}})
+        .sort('count', -1)
+        .limit(limit)
+    )
+    return [{'tag': doc['tag'], 'count': doc['count']} for doc in documents]
+
+
+def reconcile():
+    """Rebuild every tag counter from the bugs collection"""
+    pipeline = [
+        # A tag listed twice on one bug still counts once
+        {'$project': {'project': 1, 'tags': {'$setUnion': [{'$ifNull': ['$tags', []]}, []]}}},
+        {'$unwind': '$tags'},
+        {'$group': {'_id': {'project': '$project', 'tag': '$tags'}, 'count': {'$sum': 1}}}
+    ]
+    counts = Counter()
+    for row in aggregate_both(pipeline):
+        counts[(row['_id'].get('project'), row['_id']['tag'])] += row['count']
+    collection = TagCount._get_collection()
+    operations = [
+        _counter_update(project_id, tag, {'$set': {'count': count}})
+        for (project_id, tag), count in counts.items()
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    collection.delete_many({'_id': {'$nin': [_key(project_id, tag) for project_id, tag in counts]}})
+    return len(counts)
@@ -0,0 +1,130 @@
+"""
+Warm in-process username index for typeahead suggestions
+Each worker keeps every username sorted case-insensitively and answers
+prefix lookups with a binary search. A version counter in Redis is bumped
+whenever users change; workers compare it at most every few seconds and
+reload the index when it moves. Very large user tables skip the warm
+copy and use anchored range queries on the case-insensitive index instead.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+import redis
+
+from extensions import redis_client
+from models_mongo import User
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'bugtracker:users:version'
+
+# Case-insensitive collation shared with the username_ci index
+CASE_INSENSITIVE = {'locale': 'en', 'strength': 2}
+
+MAX_SUGGESTIONS = 20
+# Above this many users the warm copy is skipped to bound worker memory
+MAX_INDEXED_USERS = 200000
+CHECK_INTERVAL_SECONDS = 5
+# Reload on a timer instead when Redis cannot be reached
+FALLBACK_RELOAD_SECONDS = 60
+
+
+class _UsernameIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (casefolded keys, (id, username) entries), swapped in as one tuple
+        self._data = None
+        self._version = None
+        self._loaded_at = None
+        self._checked_at = 0.0
+
+    def _load(self):
+        collection = User._get_collection()
+        self._loaded_at = time.monotonic()
+        if collection.estimated_document_count() > MAX_INDEXED_USERS:
+            self._data = None
+            return
+        entries = sorted(
+            (doc['username'].casefold(), str(doc['_id']), doc['username'])
+            for doc in collection.find({}, {'username': 1})
+        )
+        keys = [key for key, _, _ in entries]
+        self._data = (keys, [(user_id, username) for _, user_id, username in entries])
+
+    def _remote_version(self):
+        try:
+            return redis_client.get(VERSION_KEY) or '0'
+        except redis.RedisError:
+            logger.warning('Could not read user index version', exc_info=True)
+            return None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._checked_at < CHECK_INTERVAL_SECONDS:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._checked_at < CHECK_INTERVAL_SECONDS:
+                return
+            version = self._remote_version()
+            self._checked_at = now
+            if self._loaded_at is not None:
+                if version is not None and version == self._version:
+                    return
+                if version is None and now - self._loaded_at < FALLBACK_RELOAD_SECONDS:
+                    return
+            self._load()
+            self._version = version
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+            self._version = None
+
+    def suggest(self, prefix, limit):
+        self._refresh()
+        data = self._data
+        if data is None:
+            return _db_suggest(prefix, limit)
+
+        keys, entries = data
+        prefix = prefix.casefold()
+        results = []
+        index = bisect.bisect_left(keys, prefix)
+        while index < len(keys) and len(results) < limit and keys[index].startswith(prefix):
+            user_id, username = entries[index]
+            results.append({'id': user_id, 'username': username})
+            index += 1
+        return results
+
+
+def _db_suggest(prefix, limit):
+    """Anchored prefix match as a range scan on the username_ci index"""
+    # U+FFFF sorts after every other character under the collation
+    users = (
+        User.objects(username__gte=prefix, username__lt=prefix + '\uffff')
+        .collation(CASE_INSENSITIVE)
+        .only('id', 'username')
+        .order_by('username')
+        .limit(limit)
+    )
+    return [{'id': str(user.id), 'username': user.username} for user in users]
+
+
+_index = _UsernameIndex()
+
+
+def suggest(prefix, limit=10):
+    """Usernames starting with prefix, case-insensitively, at most limit"""
+    return _index.suggest(prefix, min(max(limit, 1), MAX_SUGGESTIONS))
+
+
+def mark_changed():
+    """Call after users are created, renamed or deleted"""
+    _index.invalidate()
+    try:
+        redis_client.incr(VERSION_KEY)
+    except redis.RedisError:
+        logger.warning('Could not bump user index version', exc_info=True)
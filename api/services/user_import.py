@@ -0,0 +1,262 @@
+"""
+Bulk user import from CSV or NDJSON
+Rows are read from a stream and handled in chunks. Each chunk is
+validated, then checked for username and email collisions with a single
+``$in`` query. Its passwords are hashed across a process pool, and the
+new users are written with one unordered ``insert_many``, so a bad row
+never blocks the rest. The pool uses spawn rather than fork: API
+workers run background threads (activity flusher, event broker, pymongo
+monitors) that a forked child would inherit in an unknown state. Every
+row gets an entry in the report: created, or failed with the reason.
+HTTP uploads are stashed in GridFS and imported by the job worker, so
+hashing never runs in a request thread; the CLI imports in-process. The
+stash holds plaintext passwords, so it is deleted as soon as the job has
+read it and never goes through the append-only queue Redis.
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import gridfs
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
+from werkzeug.security import generate_password_hash
+
+from models_mongo import User
+from schemas import Schema, ValidationError, string, EMAIL_PATTERN
+from services import user_directory
+
+CHUNK_SIZE = 500
+HASH_WORKERS = int(os.getenv('IMPORT_HASH_WORKERS', 0)) or os.cpu_count() or 1
+FORMATS = ('csv', 'ndjson')
+UPLOAD_BUCKET = 'user_imports'
+
+# The same rules as self-registration, plus an optional role
+ROW_SCHEMA = Schema({
+    'username': string(required=True, strip=True, min_length=3, max_length=50),
+    'email': string(required=True, strip=True, lower=True, max_length=254, pattern=EMAIL_PATTERN),
+    'password': string(required=True, min_length=6, max_length=128),
+    'role': string(default='user', strip=True, choices=['user', 'admin'])
+})
+
+
+class _RowError(Exception):
+    pass
+
+
+def read_rows(stream, fmt):
+    """(line number, row dict or _RowError) for each record of a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Empty cells count as missing, like absent NDJSON keys
+            yield reader.line_num, {
+                key.strip(): value for key, value in row.items()
+                if key is not None and value not in (None, '')
+            }
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, _RowError('invalid JSON')
+            continue
+        yield line_number, row if isinstance(row, dict) else _RowError('expected a JSON object')
+
+
+def _bucket():
+    return gridfs.GridFSBucket(User._get_db(), bucket_name=UPLOAD_BUCKET)
+
+
+def stash(rows, max_rows):
+    """Stream up to max_rows rows into GridFS for the import job
+
+    Returns the upload id, the number of rows kept and whether more were cut.
+    """
+    count = 0
+    truncated = False
+    grid_in = _bucket().open_upload_stream('import.ndjson')
+    try:
+        for line_number, row in rows:
+            if count >= max_rows:
+                truncated = True
+                break
+            if isinstance(row, _RowError):
+                record = {'line': line_number, 'error': str(row)}
+            else:
+                record = {'line': line_number, 'row': row}
+            grid_in.write(json.dumps(record).encode() + b'\n')
+            count += 1
+    except BaseException:
+        # Drops the chunks written so far
+        grid_in.abort()
+        raise
+    grid_in.close()
+    return str(grid_in._id), count, truncated
+
+
+def unstash(upload_id):
+    """The (line number, row) pairs of a stashed upload, or None if it is gone"""
+    try:
+        data = _bucket().open_download_stream(ObjectId(upload_id)).read()
+    except (gridfs.NoFile, InvalidId):
+        return None
+    rows = []
+    for line in data.splitlines():
+        record = json.loads(line)
+        rows.append((record['line'], _RowError(record['error']) if 'error' in record else record['row']))
+    return rows
+
+
+def discard(upload_id):
+    try:
+        _bucket().delete(ObjectId(upload_id))
+    except gridfs.NoFile:
+        pass
+
+
+def _describe(errors):
+    return '; '.join(f'{field} {error}' for field, error in errors.items())
+
+
+def _duplicate_reason(error):
+    """The message for a duplicate key error from insert_many"""
+    key = error.get('keyValue') or {}
+    if 'email' in key or 'email' in error.get('errmsg', ''):
+        return 'Email already registered'
+    return 'Username already exists'
+
+
+def _import_chunk(chunk, pool, seen_usernames, seen_emails):
+    """Validate, check, hash and insert one chunk; returns its report entries"""
+    report = {}
+    valid = []
+    for line_number, row in chunk:
+        if isinstance(row, _RowError):
+            report[line_number] = {'line': line_number, 'status': 'failed', 'error': str(row)}
+            continue
+        try:
+            cleaned = ROW_SCHEMA.load(row)
+        except ValidationError as e:
+            report[line_number] = {
+                'line': line_number, 'username': row.get('username'),
+                'status': 'failed', 'error': _describe(e.errors)
+            }
+            continue
+        if cleaned['username'] in seen_usernames:
+            error = 'Username appears earlier in the file'
+        elif cleaned['email'] in seen_emails:
+            error = 'Email appears earlier in the file'
+        else:
+            error = None
+            seen_usernames.add(cleaned['username'])
+            seen_emails.add(cleaned['email'])
+            valid.append((line_number, cleaned))
+        if error:
+            report[line_number] = {
+                'line': line_number, 'username': cleaned['username'], 'status': 'failed', 'error': error
+            }
+
+    if valid:
+        taken_usernames, taken_emails = set(), set()
+        existing = User._get_collection().find(
+            {'$or': [
+                {'username': {'$in': [row['username'] for _, row in valid]}},
+                {'email': {'$in': [row['email'] for _, row in valid]}}
+            ]},
+            {'username': 1, 'email': 1}
+        )
+        for doc in existing:
+            taken_usernames.add(doc.get('username'))
+            taken_emails.add(doc.get('email'))
+
+        new = []
+        for line_number, row in valid:
+            if row['username'] in taken_usernames:
+                error = 'Username already exists'
+            elif row['email'] in taken_emails:
+                error = 'Email already registered'
+            else:
+                new.append((line_number, row))
+                continue
+            report[line_number] = {
+                'line': line_number, 'username': row['username'], 'status': 'failed', 'error': error
+            }
+
+        if new:
+            passwords = [row['password'] for _, row in new]
+            hashes = pool.map(
+                generate_password_hash, passwords,
+                chunksize=max(1, len(passwords) // (HASH_WORKERS * 4))
+            )
+            now = datetime.utcnow()
+            docs = [
+                User(
+                    username=row['username'],
+                    email=row['email'],
+                    password_hash=password_hash,
+                    role=row['role'],
+                    auth_provider='local',
+                    created_at=now
+                ).to_mongo().to_dict()
+                for (_, row), password_hash in zip(new, hashes)
+            ]
+            failed = {}
+            try:
+                User._get_collection().insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # Rows taken by a concurrent registration since the check
+                failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+            for index, ((line_number, row), doc) in enumerate(zip(new, docs)):
+                if index in failed:
+                    error = failed[index]
+                    entry = {
+                        'status': 'failed',
+                        'error': _duplicate_reason(error) if error.get('code') == 11000 else error.get('errmsg')
+                    }
+                else:
+                    entry = {'status': 'created', 'id': str(doc['_id'])}
+                report[line_number] = {'line': line_number, 'username': row['username'], **entry}
+
+    return [report[line_number] for line_number, _ in chunk]
+
+
+def import_users(rows, max_rows=None, progress=None):
+    """Import (line number, row) pairs; returns the per-row report and totals"""
+    report = []
+    truncated = False
+    seen_usernames, seen_emails = set(), set()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=context) as pool:
+        chunk = []
+        for line_number, row in rows:
+            if max_rows is not None and len(report) + len(chunk) >= max_rows:
+                truncated = True
+                break
+            chunk.append((line_number, row))
+            if len(chunk) >= CHUNK_SIZE:
+                report.extend(_import_chunk(chunk, pool, seen_usernames, seen_emails))
+                chunk = []
+                if progress:
+                    progress(len(report))
+        if chunk:
+            report.extend(_import_chunk(chunk, pool, seen_usernames, seen_emails))
+
+    created = sum(1 for entry in report if entry['status'] == 'created')
+    if created:
+        user_directory.mark_changed()
+    return {
+        'created': created,
+        'failed': len(report) - created,
+        'truncated': truncated,
+        'rows': report
+    }
@@ -0,0 +1,33 @@
+"""
+Application signals for Bug Tracker write events
+Routes send these after a write succeeds; services subscribe to keep
+derived data (counters, indexes, feeds) in sync without the routes
+having to know about each of them.
+
+Every signal also carries ``actor``: the id of the user who made the
+change, or None when a background job did.
+"""
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent with ``bug`` after a new bug is saved
+bug_created = _signals.signal('bug-created')
+
+# Sent with ``bug`` and ``changes`` ({field: (old, new)}) after an update
+bug_updated = _signals.signal('bug-updated')
+
+# Sent with ``bugs`` (a list of deleted Bug documents) after one or more
+# bugs are removed, including cascade deletes; ``archived`` is True when
+# they were deleted straight from the archive
+bugs_deleted = _signals.signal('bugs-deleted')
+
+# Sent with ``bug`` and ``comment`` after a comment is added
+comment_added = _signals.signal('comment-added')
+
+# Sent with ``bugs`` after bugs move from the hot collection to the
+# archive, and with ``bug`` after an archived bug is moved back, so
+# derived data covering hot bugs only can follow
+bugs_archived = _signals.signal('bugs-archived')
+bug_restored = _signals.signal('bug-restored')
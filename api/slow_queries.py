@@ -0,0 +1,292 @@
+"""
+Slow query log with explain plans
+A pymongo command listener times every query command (find, aggregate,
+count, distinct, update, delete, findAndModify). Those slower than
+SLOW_QUERY_MS are handed to a background thread, which explains the
+original command, then stores a record in the capped ``slow_queries``
+collection. Each record has the redacted filter shape, duration and
+originating route, plus the winning plan with its filters and index
+bounds redacted the same way. Shapes keep field names and
+operators but replace literal values with '?', and say whether a $regex
+is anchored, so queries that differ only in their values group together
+under ``/api/admin/slow-queries``. Import this module before connecting
+to MongoDB, since pymongo only calls listeners registered before the
+client was created.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+from bson.regex import Regex
+from flask import has_request_context, request
+from mongoengine.connection import get_connection
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+from models_mongo import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+# 0 turns the log off
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+
+# Commands that carry a filter and that MongoDB can explain
+QUERY_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+
+# Slow commands waiting for their explain; more are dropped, not queued
+MAX_PENDING = 100
+MAX_PLAN_BYTES = 32 * 1024
+
+# Keyed by (connection, request id): request ids are only unique per connection
+_started = {}
+_pending = queue.Queue(maxsize=MAX_PENDING)
+_thread = None
+_thread_lock = threading.Lock()
+# Set on the explain thread so its own commands are not timed
+_local = threading.local()
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        shape = {}
+        for key, item in value.items():
+            if key == '$regex':
+                pattern = item.pattern if isinstance(item, Regex) else item
+                shape[key] = 'anchored' if isinstance(pattern, str) and pattern.startswith('^') else 'unanchored'
+            else:
+                shape[key] = _redact(item)
+        return shape
+    if isinstance(value, (list, tuple)):
+        # $in lists of any length share one shape; $or branches keep theirs
+        shapes = []
+        for item in value:
+            item_shape = _redact(item)
+            if item_shape not in shapes:
+                shapes.append(item_shape)
+        return shapes
+    if isinstance(value, str) and value.startswith('$'):
+        # A field path such as '$priority' in a pipeline, not a literal
+        return value
+    return '?'
+
+
+# Plan fields that embed the query's literal values
+_PLAN_FILTER_FIELDS = {'filter', 'parsedQuery'}
+# Slot-based engine plans are printed code full of constants
+_PLAN_DROPPED_FIELDS = {'slotBasedPlan'}
+
+
+def _redact_plan(plan):
+    """A plan tree with stages and index names kept and literal values redacted"""
+    if isinstance(plan, dict):
+        redacted = {}
+        for key, value in plan.items():
+            if key in _PLAN_DROPPED_FIELDS:
+                continue
+            if key in _PLAN_FILTER_FIELDS:
+                redacted[key] = _redact(value)
+            elif key == 'indexBounds' and isinstance(value, dict):
+                # Bounds are strings such as '["alice", "alice"]'
+                redacted[key] = {field: '?' for field in value}
+            else:
+                redacted[key] = _redact_plan(value)
+        return redacted
+    if isinstance(plan, list):
+        return [_redact_plan(item) for item in plan]
+    return plan
+
+
+def shape_of(command_name, command):
+    """The parts of a command that identify its query, with literals redacted"""
+    if command_name == 'find':
+        parts = {'filter': command.get('filter', {})}
+    elif command_name == 'aggregate':
+        parts = {'pipeline': command.get('pipeline', [])}
+    elif command_name in ('count', 'distinct', 'findAndModify'):
+        parts = {'query': command.get('query', {})}
+    elif command_name == 'update':
+        parts = {'q': [update.get('q', {}) for update in command.get('updates', [])]}
+    else:
+        parts = {'q': [delete.get('q', {}) for delete in command.get('deletes', [])]}
+    shape = {key: _redact(value) for key, value in parts.items()}
+    # Sort keys and distinct fields are not literals; keep them
+    if command.get('sort'):
+        shape['sort'] = dict(command['sort'])
+    if command.get('key'):
+        shape['key'] = command['key']
+    return shape
+
+
+def _collection_of(command_name, command):
+    target = command.get(command_name)
+    return target if isinstance(target, str) else None
+
+
+class _SlowQueryListener(monitoring.CommandListener):
+    def started(self, event):
+        if event.command_name in QUERY_COMMANDS and not getattr(_local, 'internal', False):
+            _started[(event.connection_id, event.request_id)] = (event.command, event.database_name)
+
+    def succeeded(self, event):
+        started = _started.pop((event.connection_id, event.request_id), None)
+        if started is not None and event.duration_micros >= SLOW_QUERY_MS * 1000:
+            _record(event, *started)
+
+    def failed(self, event):
+        _started.pop((event.connection_id, event.request_id), None)
+
+
+def _record(event, command, database):
+    route = None
+    if has_request_context():
+        route = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+    item = {
+        'command_name': event.command_name,
+        'command': command,
+        'database': database,
+        'duration_ms': event.duration_micros / 1000,
+        'route': route,
+        'created_at': datetime.utcnow()
+    }
+    try:
+        _pending.put_nowait(item)
+    except queue.Full:
+        logger.warning('Slow query log backlog full, dropping a slow %s', event.command_name)
+        return
+    _ensure_thread()
+
+
+def _ensure_thread():
+    global _thread
+    with _thread_lock:
+        # Started lazily so each forked worker gets its own
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name='slow-query-log', daemon=True)
+            _thread.start()
+
+
+def _stages(plan):
+    """Stage names of a plan tree, outermost first"""
+    stages = []
+    while isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        if 'inputStages' in plan:
+            for child in plan['inputStages']:
+                stages.extend(_stages(child))
+            break
+        plan = plan.get('inputStage') or plan.get('queryPlan')
+    return stages
+
+
+def _winning_plan(explained):
+    """The first winningPlan anywhere in an explain result"""
+    if isinstance(explained, dict):
+        if 'winningPlan' in explained:
+            return explained['winningPlan']
+        values = explained.values()
+    elif isinstance(explained, list):
+        values = explained
+    else:
+        return None
+    for value in values:
+        plan = _winning_plan(value)
+        if plan is not None:
+            return plan
+    return None
+
+
+def _explain(item):
+    # Session, cluster time and write concern fields are not valid inside explain
+    command = {
+        key: value for key, value in item['command'].items()
+        if not key.startswith('$') and key not in ('lsid', 'txnNumber', 'writeConcern')
+    }
+    explained = get_connection()[item['database']].command(
+        {'explain': command, 'verbosity': 'queryPlanner'}
+    )
+    plan = _winning_plan(explained)
+    if plan is not None:
+        plan = _redact_plan(plan)
+    if plan is not None and len(json.dumps(plan, default=str)) > MAX_PLAN_BYTES:
+        plan = {'stage': plan.get('stage'), 'truncated': True}
+    return plan
+
+
+def _store(item):
+    command_name = item['command_name']
+    collection = _collection_of(command_name, item['command'])
+    shape = json.dumps(shape_of(command_name, item['command']), default=str)
+    shape_id = hashlib.sha1(f'{collection}:{command_name}:{shape}'.encode()).hexdigest()[:16]
+    plan, explain_error = None, None
+    try:
+        plan = _explain(item)
+    except PyMongoError as e:
+        explain_error = str(e)
+    SlowQuery(
+        command=command_name,
+        collection=collection,
+        shape=shape,
+        shape_id=shape_id,
+        duration_ms=item['duration_ms'],
+        route=item['route'],
+        plan=plan,
+        plan_stages=_stages(plan),
+        explain_error=explain_error,
+        created_at=item['created_at']
+    ).save()
+
+
+def _run():
+    _local.internal = True
+    while True:
+        item = _pending.get()
+        try:
+            _store(item)
+        except Exception:
+            logger.warning('Could not record a slow %s', item['command_name'], exc_info=True)
+
+
+if SLOW_QUERY_MS > 0:
+    monitoring.register(_SlowQueryListener())
+
+
+def worst_shapes(since, limit=20):
+    """Slow query shapes recorded since a time, by total time spent"""
+    pipeline = [
+        {'$match': {'created_at': {'$gte': since}}},
+        {'$sort': {'created_at': 1}},
+        {'$group': {
+            '_id': '$shape_id',
+            'command': {'$last': '$command'},
+            'collection': {'$last': '$collection'},
+            'shape': {'$last': '$shape'},
+            'count': {'$sum': 1},
+            'total_ms': {'$sum': '$duration_ms'},
+            'max_ms': {'$max': '$duration_ms'},
+            'avg_ms': {'$avg': '$duration_ms'},
+            'routes': {'$addToSet': '$route'},
+            'plan_stages': {'$last': '$plan_stages'},
+            'last_seen': {'$last': '$created_at'}
+        }},
+        {'$sort': {'total_ms': -1}},
+        {'$limit': limit}
+    ]
+    return [{
+        'shape_id': row['_id'],
+        'command': row['command'],
+        'collection': row['collection'],
+        'shape': json.loads(row['shape']),
+        'count': row['count'],
+        'total_ms': round(row['total_ms'], 3),
+        'max_ms': round(row['max_ms'], 3),
+        'avg_ms': round(row['avg_ms'], 3),
+        'routes': sorted(route for route in row['routes'] if route),
+        'plan_stages': row.get('plan_stages') or [],
+        'last_seen': row['last_seen'].isoformat()
+    } for row in SlowQuery.objects.aggregate(pipeline)]
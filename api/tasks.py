@@ -0,0 +1,194 @@
+"""
+Background job handlers
+Heavy side effects such as cascade deletes run here, in the job worker,
+instead of inside the HTTP request. Handlers must be safe to re-run: a job
+is retried after a failure or when its worker dies.
+"""
+
+from datetime import datetime
+
+from flask import current_app
+
+from models_mongo import User, Bug, Project, SavedFilter
+from signals import bug_updated, bugs_deleted
+from services import (
+    bug_stats, tag_counts, user_directory, notifications, duplicates, archive, inbox, saved_filters, user_import,
+    projects
+)
+from services.jobs import job, schedule
+
+# Bugs handled per round trip in bulk jobs
+BATCH_SIZE = 500
+
+
+def _delete_reported(sender, user, progress=None):
+    """Delete a user's reported bugs, announcing each batch to the counters"""
+    deleted = 0
+    while True:
+        batch = list(
+            Bug.objects(reporter=user)
+            .only('id', 'project', 'title', 'status', 'priority', 'tags', 'assignee', 'reporter')
+            .limit(BATCH_SIZE)
+        )
+        if not batch:
+            return deleted
+        Bug.objects(id__in=[bug.id for bug in batch]).delete()
+        bugs_deleted.send(sender, bugs=batch, actor=None)
+        deleted += len(batch)
+        if progress:
+            progress(len(batch), f'Deleted {deleted} reported bugs')
+
+
+def _unassign(sender, user, progress=None):
+    """Unassign a user's bugs, announcing each change"""
+    unassigned = 0
+    while True:
+        batch = list(Bug.objects(assignee=user).limit(BATCH_SIZE))
+        if not batch:
+            return unassigned
+        now = datetime.utcnow()
+        Bug.objects(id__in=[bug.id for bug in batch]).update(
+            unset__assignee=True, set__updated_at=now
+        )
+        for bug in batch:
+            bug.assignee = None
+            bug.updated_at = now
+            bug_updated.send(sender, bug=bug, changes={'assignee': (str(user.id), None)}, actor=None)
+        unassigned += len(batch)
+        if progress:
+            progress(len(batch), f'Unassigned {unassigned} bugs')
+
+
+@job('delete_user')
+def delete_user(ctx, user_id):
+    """Delete a user's reported bugs, unassign their bugs, then the user"""
+    user = User.objects(id=user_id).first()
+    if not user:
+        return {'deleted_bugs': 0, 'unassigned_bugs': 0}
+
+    sender = current_app._get_current_object()
+    total = Bug.objects(reporter=user).count() + Bug.objects(assignee=user).count()
+    done = 0
+
+    def progress(count, message):
+        nonlocal done
+        done += count
+        ctx.progress(min(done * 100 // max(total, 1), 100), message)
+
+    # Cascade: delete reported bugs; nullify: unassign the user's bugs
+    deleted = _delete_reported(sender, user, progress)
+    unassigned = _unassign(sender, user, progress)
+
+    # The same cascade over archived bugs
+    archived = archive.collection()
+    fields = {'project': 1, 'title': 1, 'status': 1, 'priority': 1, 'tags': 1, 'assignee': 1, 'reporter': 1}
+    while True:
+        batch = [archive.to_bug(doc) for doc in archived.find({'reporter': user.id}, fields).limit(BATCH_SIZE)]
+        if not batch:
+            break
+        archived.delete_many({'_id': {'$in': [bug.id for bug in batch]}})
+        bugs_deleted.send(sender, bugs=batch, actor=None, archived=True)
+        deleted += len(batch)
+    # No counter tracks assignees, so archived bugs are unassigned silently
+    unassigned += archived.update_many({'assignee': user.id}, {'$unset': {'assignee': ''}}).modified_count
+
+    Project.objects(members=user.id).update(pull__members=user.id)
+    SavedFilter.objects(user=user.id).delete()
+
+    # Sweep bugs that reached the user while the job ran (e.g. a session
+    # opened before deactivation) so the reverse delete rules below stay
+    # no-ops and every removal is announced to the counters
+    deleted += _delete_reported(sender, user)
+    unassigned += _unassign(sender, user)
+
+    # Nothing references the user any more, so the reverse delete rules are no-ops
+    user.delete()
+    user_directory.mark_changed()
+    return {'deleted_bugs': deleted, 'unassigned_bugs': unassigned}
+
+
+@job('reconcile_stats')
+def reconcile_stats(ctx):
+    return {'total': bug_stats.reconcile_all()}
+
+
+@job('reconcile_tags')
+def reconcile_tags(ctx):
+    return {'tags': tag_counts.reconcile()}
+
+
+@job('reconcile_filters')
+def reconcile_filters(ctx):
+    return {'filters': saved_filters.reconcile()}
+
+
+@job('reindex_duplicates')
+def reindex_duplicates(ctx):
+    return {'indexed': duplicates.reindex()}
+
+
+@job('rebuild_inboxes')
+def rebuild_inboxes(ctx):
+    return {'indexed': inbox.rebuild()}
+
+
+@job('archive_bugs')
+def archive_bugs(ctx, days=archive.ARCHIVE_AFTER_DAYS):
+    return {'archived': archive.archive_old_bugs(days, progress=ctx.progress)}
+
+
+@job('import_users', max_attempts=1)
+def import_users(ctx, upload_id, truncated=False):
+    """Import an upload stashed by POST /api/users/import; the result reports every row"""
+    # Not retried: a second pass would report the first pass's users as taken
+    rows = user_import.unstash(upload_id)
+    if rows is None:
+        raise RuntimeError('Upload not found; it was already imported or discarded')
+    total = len(rows)
+    try:
+        result = user_import.import_users(
+            rows,
+            progress=lambda done: ctx.progress(done * 100 // max(total, 1), f'Imported {done} of {total} rows')
+        )
+    finally:
+        user_import.discard(upload_id)
+    result['truncated'] = truncated
+    return result
+
+
+def rebuild_project_scoped():
+    """Recompute everything keyed by project after bugs changed project"""
+    bug_stats.reconcile_all()
+    tag_counts.reconcile()
+    duplicates.reindex()
+    saved_filters.reconcile()
+
+
+@job('adopt_unscoped_bugs')
+def adopt_unscoped_bugs(ctx):
+    moved = projects.adopt_unscoped_bugs()
+    if moved:
+        # Counters and signatures were keyed by the old, empty project
+        rebuild_project_scoped()
+    return {'moved': moved}
+
+
+@job('send_notification_digests', max_attempts=1)
+def send_notification_digests(ctx):
+    # Unsent items are re-queued for the next run, so no job-level retry
+    return {'sent': notifications.flush_due_digests()}
+
+
+# Maintenance jobs admins may start through POST /api/jobs
+MAINTENANCE_JOBS = [
+    'reconcile_stats', 'reconcile_tags', 'reconcile_filters', 'reindex_duplicates', 'rebuild_inboxes', 'archive_bugs'
+]
+
+# Runs as soon as a worker starts after an upgrade, then catches any
+# project-less bug restored from an old backup
+schedule('adopt_unscoped_bugs', every_seconds=3600)
+schedule('reconcile_stats', every_seconds=3600)
+schedule('reconcile_tags', every_seconds=3600)
+schedule('reconcile_filters', every_seconds=3600)
+schedule('archive_bugs', every_seconds=24 * 3600)
+schedule('send_notification_digests', every_seconds=60)
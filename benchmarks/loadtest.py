@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Load test for the Bug Tracker API
+Drives every /api/bugs and /api/users endpoint at a fixed concurrency and
+reports p50/p95/p99 latency and throughput per endpoint
+"""
+
+import itertools
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import click
+import requests
+
+from seed import BENCH_ADMIN, BENCH_PASSWORD, PRIORITY_WEIGHTS, STATUS_WEIGHTS, TAGS
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Client:
+    """Thread-local requests sessions sharing one JWT"""
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            session = requests.Session()
+            session.headers['Authorization'] = f'Bearer {self.token}'
+            self._local.session = session
+        return self._local.session
+
+    def request(self, method, path, **kwargs):
+        return self.session.request(method, f'{self.base_url}{path}', timeout=30, **kwargs)
+
+
+def login(base_url, username, password):
+    response = requests.post(
+        f"{base_url.rstrip('/')}/api/auth/login",
+        json={'username': username, 'password': password},
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()['token']
+
+
+class Fixtures:
+    """Ids discovered or created before the timed runs"""
+
+    def __init__(self, client, rng, size):
+        self.rng = rng
+        bugs = client.request('GET', '/api/bugs', params={'per_page': 100}).json()['bugs']
+        users = client.request('GET', '/api/users', params={'per_page': 100}).json()['users']
+        self.bug_ids = [bug['id'] for bug in bugs]
+        self.usernames = [user['username'] for user in users]
+        self.user_ids = [user['id'] for user in users]
+        profile = client.request('GET', '/api/auth/profile').json()['user']
+        self.own_id = profile['id']
+        # Bugs and users consumed by the destructive scenarios
+        self.scratch_bugs = self._create_bugs(client, size)
+        self.scratch_users = self._create_users(client, size)
+
+    def _create_bugs(self, client, count):
+        ids = []
+        for i in range(count):
+            response = client.request('POST', '/api/bugs', json={
+                'title': f'Scratch bug {i}', 'description': 'Created by the load test'
+            })
+            ids.append(response.json()['bug']['id'])
+        return ids
+
+    def _create_users(self, client, count):
+        ids = []
+        run = int(time.time())
+        for i in range(count):
+            response = requests.post(f'{client.base_url}/api/auth/register', json={
+                'username': f'scratch_{run}_{i}',
+                'email': f'scratch_{run}_{i}@bench.local',
+                'password': BENCH_PASSWORD
+            }, timeout=30)
+            ids.append(response.json()['user']['id'])
+        return ids
+
+
+def build_scenarios(fixtures):
+    """Each scenario maps a name to a callable returning (method, path, kwargs)"""
+    rng = fixtures.rng
+    scratch_bugs = itertools.cycle(fixtures.scratch_bugs)
+    delete_bugs = iter(fixtures.scratch_bugs)
+    delete_users = iter(fixtures.scratch_users)
+    lock = threading.Lock()
+
+    def next_from(iterator):
+        with lock:
+            return next(iterator, None)
+
+    return {
+        'GET /api/bugs': lambda: ('GET', '/api/bugs', {'params': {'page': rng.randint(1, 20)}}),
+        'GET /api/bugs?status&priority': lambda: ('GET', '/api/bugs', {'params': {
+            'status': rng.choice(list(STATUS_WEIGHTS)),
+            'priority': rng.choice(list(PRIORITY_WEIGHTS))
+        }}),
+        'GET /api/bugs?assignee': lambda: ('GET', '/api/bugs', {'params': {
+            'assignee': rng.choice(fixtures.usernames)
+        }}),
+        'GET /api/bugs?search': lambda: ('GET', '/api/bugs', {'params': {
+            'search': rng.choice(['crash', 'slow', 'login', 'timeout', 'export'])
+        }}),
+        'GET /api/bugs/<id>': lambda: ('GET', f'/api/bugs/{rng.choice(fixtures.bug_ids)}', {}),
+        'GET /api/bugs/stats': lambda: ('GET', '/api/bugs/stats', {}),
+        'POST /api/bugs': lambda: ('POST', '/api/bugs', {'json': {
+            'title': 'Load test bug',
+            'description': 'Created by the load test',
+            'priority': rng.choice(list(PRIORITY_WEIGHTS)),
+            'tags': rng.sample(TAGS, 2)
+        }}),
+        'PUT /api/bugs/<id>': lambda: ('PUT', f'/api/bugs/{next_from(scratch_bugs)}', {'json': {
+            'status': rng.choice(list(STATUS_WEIGHTS)),
+            'assignee': rng.choice(fixtures.usernames)
+        }}),
+        'POST /api/bugs/<id>/comments': lambda: ('POST', f'/api/bugs/{next_from(scratch_bugs)}/comments', {
+            'json': {'content': 'Load test comment'}
+        }),
+        'GET /api/users': lambda: ('GET', '/api/users', {'params': {'page': rng.randint(1, 5)}}),
+        'GET /api/users?search': lambda: ('GET', '/api/users', {'params': {
+            'search': rng.choice(['bench_user00', 'bench_user01', 'admin'])
+        }}),
+        'GET /api/users/<id>': lambda: ('GET', f'/api/users/{rng.choice(fixtures.user_ids)}', {}),
+        'GET /api/users/assignees': lambda: ('GET', '/api/users/assignees', {}),
+        'PUT /api/users/<id>': lambda: ('PUT', f'/api/users/{fixtures.own_id}', {'json': {}}),
+        # Destructive scenarios run last and stop once their scratch rows are used up
+        'DELETE /api/bugs/<id>': lambda: ('DELETE', f'/api/bugs/{next_from(delete_bugs)}', {}),
+        'DELETE /api/users/<id>': lambda: ('DELETE', f'/api/users/{next_from(delete_users)}', {}),
+    }
+
+
+def run_scenario(client, make_request, total, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(_):
+        nonlocal errors
+        method, path, kwargs = make_request()
+        if 'None' in path:
+            return
+        start = time.perf_counter()
+        try:
+            response = client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0
+    }
+
+
+def print_table(results):
+    click.echo(f"{'endpoint':<34} {'reqs':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9}")
+    for name, row in results.items():
+        click.echo(
+            f"{name:<34} {row['requests']:>6} {row['errors']:>5} {row['p50_ms']:>9.2f} "
+            f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['throughput_rps']:>9.2f}"
+        )
+
+
+@click.group()
+def cli():
+    """Bug Tracker API load test"""
+
+
+@cli.command()
+@click.option('--base-url', default='http://localhost:5000', show_default=True)
+@click.option('--username', default=BENCH_ADMIN, show_default=True, help='Must be an admin for user deletes')
+@click.option('--password', default=BENCH_PASSWORD, show_default=True)
+@click.option('--concurrency', default=8, show_default=True, help='Concurrent in-flight requests')
+@click.option('--requests', 'total', default=500, show_default=True, help='Timed requests per endpoint')
+@click.option('--warmup', default=50, show_default=True, help='Untimed requests per endpoint')
+@click.option('--seed', default=42, show_default=True, help='Random seed for request parameters')
+@click.option('--only', default=None, help='Only run endpoints whose name contains this text')
+@click.option('--out', type=click.Path(dir_okay=False), default=None, help='Write results as JSON')
+def run(base_url, username, password, concurrency, total, warmup, seed, only, out):
+    """Run every endpoint scenario and report latency percentiles"""
+    rng = random.Random(seed)
+    client = Client(base_url, login(base_url, username, password))
+    fixtures = Fixtures(client, rng, size=total + warmup)
+    scenarios = build_scenarios(fixtures)
+
+    results = {}
+    for name, make_request in scenarios.items():
+        if only and only not in name:
+            continue
+        if warmup and not name.startswith('DELETE'):
+            run_scenario(client, make_request, warmup, concurrency)
+        results[name] = run_scenario(client, make_request, total, concurrency)
+        click.echo(f'{name}: done')
+
+    print_table(results)
+
+    if out:
+        report = {
+            'revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'params': {
+                'base_url': base_url,
+                'concurrency': concurrency,
+                'requests': total,
+                'warmup': warmup,
+                'seed': seed
+            },
+            'results': results
+        }
+        with open(out, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f'Results written to {out}')
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('candidate', type=click.Path(exists=True, dir_okay=False))
+def compare(baseline, candidate):
+    """Compare two result files produced by `run --out`"""
+    with open(baseline) as f:
+        before = json.load(f)
+    with open(candidate) as f:
+        after = json.load(f)
+
+    if before['params'] != after['params']:
+        click.echo('Warning: runs used different parameters, deltas may not be meaningful')
+
+    click.echo(f"{before['revision']} -> {after['revision']}")
+    click.echo(f"{'endpoint':<34} {'p50':>16} {'p95':>16} {'p99':>16} {'rps':>16}")
+    for name, old in before['results'].items():
+        new = after['results'].get(name)
+        if not new:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            delta = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f'{new[key]:>8.2f} ({delta:+5.1f}%)')
+        click.echo(f"{name:<34} " + ' '.join(f'{cell:>16}' for cell in cells))
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for the Bug Tracker benchmarks
+Seeds a local MongoDB with users, bugs and comments using bulk inserts
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import click
+from bson import ObjectId
+from pymongo import MongoClient
+from werkzeug.security import generate_password_hash
+
+# Weighted distributions roughly matching a real tracker
+STATUS_WEIGHTS = {'open': 35, 'in_progress': 20, 'resolved': 20, 'closed': 25}
+PRIORITY_WEIGHTS = {'low': 30, 'medium': 40, 'high': 20, 'critical': 10}
+
+TAGS = [
+    'ui', 'backend', 'api', 'auth', 'database', 'performance', 'regression',
+    'crash', 'mobile', 'docs', 'security', 'build', 'flaky', 'ux', 'search',
+]
+COMPONENTS = [
+    'login page', 'dashboard', 'bug list', 'comment box', 'user profile',
+    'search bar', 'export', 'notifications', 'settings', 'api gateway',
+]
+SYMPTOMS = [
+    'crashes when', 'is slow when', 'shows wrong data after', 'freezes on',
+    'returns 500 on', 'renders blank after', 'loses state on', 'times out on',
+]
+TRIGGERS = [
+    'saving a draft', 'switching tabs', 'refreshing the page', 'logging out',
+    'uploading a file', 'filtering by priority', 'resizing the window',
+    'opening a second session', 'pasting long text', 'sorting by date',
+]
+WORDS = (
+    'the request fails intermittently and the console shows an error trace '
+    'users report the issue mostly on slower connections after deploying '
+    'the latest build it started happening again for several accounts'
+).split()
+
+BENCH_PASSWORD = 'benchpass'
+BENCH_ADMIN = 'bench_admin'
+BATCH_SIZE = 1000
+
+
+def skewed_index(rng, n, alpha=1.2):
+    """Pick an index in [0, n) with a Zipf-like skew towards the start"""
+    while True:
+        value = int(rng.paretovariate(alpha)) - 1
+        if value < n:
+            return value
+
+
+def weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def make_users(rng, count, password_hash, now):
+    users = [{
+        '_id': ObjectId(),
+        'username': BENCH_ADMIN,
+        'email': f'{BENCH_ADMIN}@bench.local',
+        'password_hash': password_hash,
+        'role': 'admin',
+        'created_at': now - timedelta(days=400),
+        'is_active': True,
+        'auth_provider': 'local'
+    }]
+    for i in range(count):
+        users.append({
+            '_id': ObjectId(),
+            'username': f'bench_user{i:06d}',
+            'email': f'bench_user{i:06d}@bench.local',
+            'password_hash': password_hash,
+            'role': 'user',
+            'created_at': now - timedelta(days=rng.uniform(0, 365)),
+            'is_active': True,
+            'auth_provider': 'local'
+        })
+    return users
+
+
+def make_project(now):
+    return {
+        '_id': ObjectId(),
+        'key': 'default',
+        'name': 'Default',
+        'description': '',
+        'members': [],
+        'open_membership': True,
+        'created_at': now - timedelta(days=400)
+    }
+
+
+def make_bug(rng, user_ids, project_id, now):
+    created_at = now - timedelta(days=rng.uniform(0, 365))
+    component = rng.choice(COMPONENTS)
+    description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 120)))
+    assignee = None
+    if rng.random() > 0.2:
+        assignee = user_ids[skewed_index(rng, len(user_ids))]
+    return {
+        '_id': ObjectId(),
+        'project': project_id,
+        'title': f'{component.capitalize()} {rng.choice(SYMPTOMS)} {rng.choice(TRIGGERS)}',
+        'description': description,
+        'status': weighted_choice(rng, STATUS_WEIGHTS),
+        'priority': weighted_choice(rng, PRIORITY_WEIGHTS),
+        'tags': rng.sample(TAGS, rng.randint(0, 3)),
+        'steps_to_reproduce': f'1. Open the {component}\n2. Try {rng.choice(TRIGGERS)}',
+        'expected_behavior': 'It should work without errors',
+        'environment': rng.choice(['Chrome 120', 'Firefox 121', 'Safari 17', 'Edge 120']),
+        'reporter': user_ids[skewed_index(rng, len(user_ids))],
+        'assignee': assignee,
+        'created_at': created_at,
+        'updated_at': created_at + timedelta(hours=rng.uniform(0, 72)),
+        'comments': []
+    }
+
+
+def add_comments(rng, bugs, user_ids, count):
+    for _ in range(count):
+        bug = bugs[skewed_index(rng, len(bugs), alpha=0.8)]
+        bug['comments'].append({
+            'author': user_ids[skewed_index(rng, len(user_ids))],
+            'content': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))),
+            'created_at': bug['created_at'] + timedelta(hours=rng.uniform(0, 240))
+        })
+
+
+def insert_batched(collection, documents):
+    for start in range(0, len(documents), BATCH_SIZE):
+        collection.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+
+
+@click.command()
+@click.option('--uri', default='mongodb://localhost:27017', show_default=True, help='MongoDB connection URI')
+@click.option('--database', default='bugtracker_bench', show_default=True)
+@click.option('--users', 'user_count', default=1000, show_default=True, help='Number of users (N)')
+@click.option('--bugs', 'bug_count', default=20000, show_default=True, help='Number of bugs (M)')
+@click.option('--comments', 'comment_count', default=50000, show_default=True, help='Number of comments (K)')
+@click.option('--seed', default=42, show_default=True, help='Random seed, keep fixed for comparable runs')
+@click.option('--drop/--no-drop', default=True, show_default=True, help='Drop existing users and bugs first')
+def seed(uri, database, user_count, bug_count, comment_count, seed, drop):
+    """Seed a local MongoDB with synthetic benchmark data"""
+    rng = random.Random(seed)
+    db = MongoClient(uri)[database]
+    # Fixed reference time so the same seed always yields the same dataset
+    now = datetime(2025, 1, 1)
+
+    if drop:
+        db.users.drop()
+        db.projects.drop()
+        db.bugs.drop()
+
+    # Hashing is deliberately slow, so every seeded user shares one hash
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    users = make_users(rng, user_count, password_hash, now)
+    insert_batched(db.users, users)
+    click.echo(f'Inserted {len(users)} users')
+
+    project = db.projects.find_one({'key': 'default'})
+    if project is None:
+        project = make_project(now)
+        db.projects.insert_one(project)
+
+    user_ids = [user['_id'] for user in users]
+    bugs = [make_bug(rng, user_ids, project['_id'], now) for _ in range(bug_count)]
+    if bugs:
+        add_comments(rng, bugs, user_ids, comment_count)
+    insert_batched(db.bugs, bugs)
+    click.echo(f'Inserted {len(bugs)} bugs with {comment_count if bugs else 0} comments')
+    click.echo(f'Log in as {BENCH_ADMIN} / {BENCH_PASSWORD}')
+
+
+if __name__ == '__main__':
+    seed()
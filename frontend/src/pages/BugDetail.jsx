@@ -23,16 +23,22 @@ import {
   Delete as DeleteIcon,
   ArrowBack as ArrowBackIcon,
   Send as SendIcon,
+  AttachFile as AttachFileIcon,
 } from '@mui/icons-material';
 import { useBugStore } from '../store/bugStore';
 import { useAuthStore } from '../store/authStore';
+import { bugAPI } from '../services/api';
 
 const BugDetail = () => {
   const { id } = useParams();
   const navigate = useNavigate();
   const { currentBug, fetchBug, deleteBug, addComment, loading } = useBugStore();
-  const { user } = useAuthStore();
+  const { user, token } = useAuthStore();
   const [commentError, setCommentError] = useState('');
+  const [attachments, setAttachments] = useState([]);
+  const [attachmentError, setAttachmentError] = useState('');
+  const [uploading, setUploading] = useState(false);
+  const [duplicates, setDuplicates] = useState([]);
 
   const {
     register,
@@ -47,6 +53,39 @@ const BugDetail = () => {
     }
   }, [id, fetchBug]);
 
+  useEffect(() => {
+    if (id) {
+      bugAPI.getAttachments(id)
+        .then((response) => setAttachments(response.data.attachments))
+        .catch(() => setAttachments([]));
+      bugAPI.getDuplicates(id)
+        .then((response) => setDuplicates(response.data.duplicates))
+        .catch(() => setDuplicates([]));
+    }
+  }, [id]);
+
+  const handleUpload = async (event) => {
+    const file = event.target.files[0];
+    event.target.value = '';
+    if (!file) return;
+    setAttachmentError('');
+    setUploading(true);
+    try {
+      const response = await bugAPI.uploadAttachment(id, file);
+      setAttachments((current) => [...current, response.data.attachment]);
+    } catch (error) {
+      setAttachmentError(error.response?.data?.message || 'Failed to upload attachment');
+    } finally {
+      setUploading(false);
+    }
+  };
+
+  const formatSize = (bytes) => {
+    if (bytes < 1024) return `${bytes} B`;
+    if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+    return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+  };
+
   const handleDelete = async () => {
     if (window.confirm('Are you sure you want to delete this bug?')) {
       const result = await deleteBug(id);
@@ -202,6 +241,67 @@ const BugDetail = () => {
             )}
           </Paper>
 
+          {/* Possible Duplicates */}
+          {duplicates.length > 0 && (
+            <Alert severity="info" sx={{ mb: 3 }}>
+              <Typography variant="subtitle2" gutterBottom>
+                Possible duplicates
+              </Typography>
+              {duplicates.map((duplicate) => (
+                <Box key={duplicate.id} sx={{ display: 'flex', gap: 1, alignItems: 'center' }}>
+                  <Button size="small" onClick={() => navigate(`/bugs/${duplicate.id}`)}>
+                    {duplicate.title}
+                  </Button>
+                  <Typography variant="caption" color="text.secondary">
+                    {duplicate.status.replace('_', ' ')} · {Math.round(duplicate.similarity * 100)}% similar
+                  </Typography>
+                </Box>
+              ))}
+            </Alert>
+          )}
+
+          {/* Attachments Section */}
+          <Paper sx={{ p: 3, mb: 3 }}>
+            <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
+              <Typography variant="h6">
+                Attachments ({attachments.length})
+              </Typography>
+              <Button
+                component="label"
+                variant="outlined"
+                size="small"
+                startIcon={<AttachFileIcon />}
+                disabled={uploading}
+              >
+                {uploading ? 'Uploading...' : 'Attach File'}
+                <input type="file" hidden onChange={handleUpload} />
+              </Button>
+            </Box>
+
+            {attachmentError && (
+              <Alert severity="error" sx={{ mt: 2 }}>
+                {attachmentError}
+              </Alert>
+            )}
+
+            <List dense>
+              {attachments.map((attachment) => (
+                <ListItem
+                  key={attachment.id}
+                  component="a"
+                  href={`${attachment.url}?jwt=${token}`}
+                  target="_blank"
+                  rel="noopener noreferrer"
+                >
+                  <ListItemText
+                    primary={attachment.filename}
+                    secondary={formatSize(attachment.size)}
+                  />
+                </ListItem>
+              ))}
+            </List>
+          </Paper>
+
           {/* Comments Section */}
           <Paper sx={{ p: 3 }}>
             <Typography variant="h6" gutterBottom>
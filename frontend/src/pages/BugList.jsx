@@ -22,16 +22,35 @@ import {
   Visibility as ViewIcon,
 } from '@mui/icons-material';
 import { useBugStore } from '../store/bugStore';
+import { useAuthStore } from '../store/authStore';
 
 const BugList = () => {
   const navigate = useNavigate();
-  const { bugs, fetchBugs, deleteBug, filters, setFilters, loading } = useBugStore();
+  const {
+    bugs,
+    fetchBugs,
+    deleteBug,
+    filters,
+    setFilters,
+    facets,
+    loading,
+    connectStream,
+    disconnectStream,
+  } = useBugStore();
+  const { token } = useAuthStore();
   const [searchTerm, setSearchTerm] = useState('');
 
   useEffect(() => {
     fetchBugs();
   }, [fetchBugs]);
 
+  useEffect(() => {
+    connectStream(token, filters.project);
+    return () => disconnectStream();
+  }, [token, filters.project, connectStream, disconnectStream]);
+
+  const withCount = (label, count) => (facets ? `${label} (${count || 0})` : label);
+
   const handleFilterChange = (field, value) => {
     setFilters({ [field]: value });
     fetchBugs({ [field]: value });
@@ -198,10 +217,10 @@ const BugList = () => {
                 onChange={(e) => handleFilterChange('status', e.target.value)}
               >
                 <MenuItem value="all">All</MenuItem>
-                <MenuItem value="open">Open</MenuItem>
-                <MenuItem value="in_progress">In Progress</MenuItem>
-                <MenuItem value="resolved">Resolved</MenuItem>
-                <MenuItem value="closed">Closed</MenuItem>
+                <MenuItem value="open">{withCount('Open', facets?.status?.open)}</MenuItem>
+                <MenuItem value="in_progress">{withCount('In Progress', facets?.status?.in_progress)}</MenuItem>
+                <MenuItem value="resolved">{withCount('Resolved', facets?.status?.resolved)}</MenuItem>
+                <MenuItem value="closed">{withCount('Closed', facets?.status?.closed)}</MenuItem>
               </Select>
             </FormControl>
           </Grid>
@@ -214,10 +233,10 @@ const BugList = () => {
                 onChange={(e) => handleFilterChange('priority', e.target.value)}
               >
                 <MenuItem value="all">All</MenuItem>
-                <MenuItem value="low">Low</MenuItem>
-                <MenuItem value="medium">Medium</MenuItem>
-                <MenuItem value="high">High</MenuItem>
-                <MenuItem value="critical">Critical</MenuItem>
+                <MenuItem value="low">{withCount('Low', facets?.priority?.low)}</MenuItem>
+                <MenuItem value="medium">{withCount('Medium', facets?.priority?.medium)}</MenuItem>
+                <MenuItem value="high">{withCount('High', facets?.priority?.high)}</MenuItem>
+                <MenuItem value="critical">{withCount('Critical', facets?.priority?.critical)}</MenuItem>
               </Select>
             </FormControl>
           </Grid>
@@ -230,8 +249,20 @@ const BugList = () => {
                 onChange={(e) => handleFilterChange('assignee', e.target.value)}
               >
                 <MenuItem value="all">All</MenuItem>
-                <MenuItem value="unassigned">Unassigned</MenuItem>
-                {/* Add dynamic assignee options here */}
+                {(facets?.assignee || []).map((row) =>
+                  row.id ? (
+                    <MenuItem key={row.id} value={row.username}>
+                      {withCount(row.username, row.count)}
+                    </MenuItem>
+                  ) : (
+                    <MenuItem key="unassigned" value="unassigned">
+                      {withCount('Unassigned', row.count)}
+                    </MenuItem>
+                  )
+                )}
+                {!facets?.assignee?.some((row) => !row.id) && (
+                  <MenuItem value="unassigned">Unassigned</MenuItem>
+                )}
               </Select>
             </FormControl>
           </Grid>
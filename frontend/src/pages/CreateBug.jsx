@@ -17,11 +17,13 @@ import {
 } from '@mui/material';
 import { Save as SaveIcon, Cancel as CancelIcon } from '@mui/icons-material';
 import { useBugStore } from '../store/bugStore';
+import { userAPI } from '../services/api';
 
 const CreateBug = () => {
   const navigate = useNavigate();
   const { createBug, loading } = useBugStore();
   const [submitError, setSubmitError] = useState('');
+  const [assigneeOptions, setAssigneeOptions] = useState([]);
 
   const {
     register,
@@ -39,6 +41,24 @@ const CreateBug = () => {
     },
   });
 
+  const assigneeField = register('assignee');
+
+  // Ask the server for matching usernames instead of loading every user
+  const handleAssigneeChange = async (event) => {
+    assigneeField.onChange(event);
+    const query = event.target.value.trim();
+    if (!query) {
+      setAssigneeOptions([]);
+      return;
+    }
+    try {
+      const response = await userAPI.suggest(query);
+      setAssigneeOptions(response.data.users);
+    } catch (error) {
+      setAssigneeOptions([]);
+    }
+  };
+
   const onSubmit = async (data) => {
     setSubmitError('');
     
@@ -148,9 +168,16 @@ const CreateBug = () => {
               <TextField
                 fullWidth
                 label="Assignee (Username)"
-                {...register('assignee')}
+                {...assigneeField}
+                onChange={handleAssigneeChange}
+                inputProps={{ list: 'assignee-suggestions', autoComplete: 'off' }}
                 helperText="Leave empty for unassigned"
               />
+              <datalist id="assignee-suggestions">
+                {assigneeOptions.map((option) => (
+                  <option key={option.id} value={option.username} />
+                ))}
+              </datalist>
             </Grid>
 
             <Grid item xs={12} md={6}>
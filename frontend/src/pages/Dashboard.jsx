@@ -19,8 +19,7 @@ import {
   ArcElement,
 } from 'chart.js';
 import { Bar, Doughnut } from 'react-chartjs-2';
-import { bugAPI } from '../services/api';
-import { useBugStore } from '../store/bugStore';
+import { dashboardAPI } from '../services/api';
 
 ChartJS.register(
   CategoryScale,
@@ -33,16 +32,14 @@ ChartJS.register(
 );
 
 const Dashboard = () => {
-  const { bugs, fetchBugs } = useBugStore();
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     const loadDashboardData = async () => {
       try {
-        await fetchBugs();
-        const statsResponse = await bugAPI.getStats();
-        setStats(statsResponse.data);
+        const response = await dashboardAPI.get();
+        setStats(response.data);
       } catch (error) {
         console.error('Failed to load dashboard data:', error);
       } finally {
@@ -51,7 +48,7 @@ const Dashboard = () => {
     };
 
     loadDashboardData();
-  }, [fetchBugs]);
+  }, []);
 
   if (loading) {
     return (
@@ -199,7 +196,7 @@ const Dashboard = () => {
         <Typography variant="h6" gutterBottom>
           Recent Bugs
         </Typography>
-        {bugs.slice(0, 5).map((bug) => (
+        {(stats?.recentBugs || []).map((bug) => (
           <Box
             key={bug.id}
             sx={{
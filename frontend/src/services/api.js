@@ -51,17 +51,57 @@ export const authAPI = {
 export const bugAPI = {
   getAll: (params) => api.get('/bugs', { params }),
   getById: (id) => api.get(`/bugs/${id}`),
+  // Delta sync: pass the previous next_token as since; omit it to start over
+  getChanges: (since, limit = 100, project) => api.get('/bugs/changes', { params: { since, limit, project } }),
   create: (bugData) => api.post('/bugs', bugData),
   update: (id, bugData) => api.put(`/bugs/${id}`, bugData),
   delete: (id) => api.delete(`/bugs/${id}`),
   addComment: (id, comment) => api.post(`/bugs/${id}/comments`, comment),
-  getStats: () => api.get('/bugs/stats'),
+  // project is a project key; without it the default project is used
+  getStats: (project) => api.get('/bugs/stats', { params: { project } }),
+  getTags: (limit = 50, project) => api.get('/bugs/tags', { params: { limit, project } }),
+  suggestTags: (q, limit = 10, project) => api.get('/bugs/tags/suggest', { params: { q, limit, project } }),
+  getDuplicates: (id) => api.get(`/bugs/${id}/duplicates`),
+  getAttachments: (id) => api.get(`/bugs/${id}/attachments`),
+  // The file is sent as the raw request body so the server can stream it
+  uploadAttachment: (id, file) => api.post(`/bugs/${id}/attachments`, file, {
+    params: { filename: file.name },
+    headers: { 'Content-Type': file.type || 'application/octet-stream' },
+    timeout: 0,
+  }),
+  deleteAttachment: (id, attachmentId) => api.delete(`/bugs/${id}/attachments/${attachmentId}`),
+};
+
+export const projectAPI = {
+  getAll: () => api.get('/projects'),
+  getByKey: (key) => api.get(`/projects/${key}`),
+  create: (projectData) => api.post('/projects', projectData),
+  addMember: (key, username) => api.post(`/projects/${key}/members`, { username }),
+  removeMember: (key, userId) => api.delete(`/projects/${key}/members/${userId}`),
+};
+
+export const dashboardAPI = {
+  get: (params) => api.get('/dashboard', { params }),
+};
+
+// Run several GET requests in one round trip: [{ id, path }, ...]
+export const batchAPI = {
+  run: (requests, parallel = true) => api.post('/batch', { requests, parallel }),
+};
+
+export const filterAPI = {
+  getAll: (project) => api.get('/filters', { params: { project } }),
+  create: (filterData) => api.post('/filters', filterData),
+  delete: (id) => api.delete(`/filters/${id}`),
 };
 
 export const userAPI = {
   getProfile: () => api.get('/users/profile'),
   updateProfile: (userData) => api.put('/users/profile', userData),
   getAll: () => api.get('/users'),
+  suggest: (q, limit = 10) => api.get('/users/suggest', { params: { q, limit } }),
+  getInbox: (box = 'assigned', page = 1, per_page = 20) =>
+    api.get('/users/me/inbox', { params: { box, page, per_page } }),
 };
 
 export default api;
@@ -3,7 +3,12 @@ import { bugAPI } from '../services/api';
 
 const useBugStore = create((set, get) => ({
   bugs: [],
+  pagination: null,
+  facets: null,
   currentBug: null,
+  eventSource: null,
+  streamProject: undefined,
+  streamRetry: null,
   loading: false,
   error: null,
   filters: {
@@ -17,8 +22,14 @@ const useBugStore = create((set, get) => ({
   fetchBugs: async (params = {}) => {
     set({ loading: true, error: null });
     try {
-      const response = await bugAPI.getAll({ ...get().filters, ...params });
-      set({ bugs: response.data, loading: false });
+      // Facet counts come back from the same query as the page
+      const response = await bugAPI.getAll({ ...get().filters, facets: true, ...params });
+      set({
+        bugs: response.data.bugs,
+        pagination: response.data.pagination,
+        facets: response.data.facets,
+        loading: false
+      });
     } catch (error) {
       set({ 
         error: error.response?.data?.message || 'Failed to fetch bugs',
@@ -117,6 +128,74 @@ const useBugStore = create((set, get) => ({
     }
   },
 
+  // Subscribe to one project's live bug events instead of refetching the list
+  connectStream: (token, project) => {
+    if (!token) return;
+    if (get().eventSource && get().streamProject === project) return;
+    get().disconnectStream();
+    const params = new URLSearchParams({ jwt: token });
+    if (project) params.set('project', project);
+    // EventSource resends Last-Event-ID on reconnect, so missed events replay
+    const source = new EventSource(`/api/bugs/stream?${params}`);
+
+    const patchBug = (bug) => {
+      set(state => ({
+        bugs: state.bugs.map(item => item.id === bug.id ? { ...item, ...bug } : item),
+        currentBug: state.currentBug?.id === bug.id
+          ? { ...state.currentBug, ...bug }
+          : state.currentBug
+      }));
+    };
+
+    source.addEventListener('bug.created', (event) => {
+      const { bug } = JSON.parse(event.data);
+      set(state => ({
+        bugs: state.bugs.some(item => item.id === bug.id) ? state.bugs : [bug, ...state.bugs]
+      }));
+    });
+    source.addEventListener('bug.updated', (event) => {
+      patchBug(JSON.parse(event.data).bug);
+    });
+    source.addEventListener('bug.deleted', (event) => {
+      const { bug } = JSON.parse(event.data);
+      set(state => ({ bugs: state.bugs.filter(item => item.id !== bug.id) }));
+    });
+    source.addEventListener('comment.added', (event) => {
+      const { bug, comment } = JSON.parse(event.data);
+      set(state => ({
+        currentBug: state.currentBug?.id === bug.id
+          ? { ...state.currentBug, comments: [...(state.currentBug.comments || []), comment] }
+          : state.currentBug
+      }));
+    });
+    // The server could not replay what we missed, so refetch once
+    source.addEventListener('reset', () => {
+      get().fetchBugs();
+    });
+    // EventSource gives up on error responses such as 503 (server at its
+    // stream limit); try again later and refetch what was missed meanwhile
+    source.onerror = () => {
+      if (source.readyState !== EventSource.CLOSED || get().eventSource !== source) return;
+      set({
+        eventSource: null,
+        streamRetry: setTimeout(() => {
+          set({ streamRetry: null });
+          get().fetchBugs();
+          get().connectStream(token, project);
+        }, 30000)
+      });
+    };
+
+    set({ eventSource: source, streamProject: project });
+  },
+
+  disconnectStream: () => {
+    const { eventSource: source, streamRetry } = get();
+    if (streamRetry) clearTimeout(streamRetry);
+    if (source) source.close();
+    set({ eventSource: null, streamProject: undefined, streamRetry: null });
+  },
+
   // Set filters
   setFilters: (newFilters) => {
     set(state => ({ 
@@ -0,0 +1,136 @@
+"""
+Shared fixtures for the API tests
+The app runs against in-memory MongoDB (mongomock) and Redis (fakeredis)
+stand-ins, and mail goes to a local aiosmtpd server. Install them with
+``pip install -r requirements-dev.txt`` and run ``python -m pytest``.
+"""
+
+import email
+import os
+import socket
+import sys
+import types
+
+import fakeredis
+import mongomock
+import mongomock.collection
+import mongomock.database
+import mongomock.gridfs
+import mongoengine
+import pytest
+from aiosmtpd.controller import Controller
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+# Swap the shared clients before any service captures them at import
+import extensions  # noqa: E402
+
+extensions.redis_client = extensions.queue_client = fakeredis.FakeRedis(decode_responses=True)
+
+_connect = mongoengine.connect
+
+
+def _connect_mongomock(db=None, host=None, **kwargs):
+    return _connect(db, host='mongodb://localhost', mongo_client_class=mongomock.MongoClient)
+
+
+mongoengine.connect = _connect_mongomock
+
+# mongomock cannot create capped collections (activity, profiles, slow
+# queries); plain ones behave the same for these tests
+_create_collection = mongomock.database.Database.create_collection
+mongomock.database.Database.create_collection = (
+    lambda self, name, **options: _create_collection(self, name)
+)
+os.environ['SLOW_QUERY_MS'] = '0'
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    """Apply bulk operations one by one; mongomock's bulk_write lags pymongo's"""
+    for operation in requests:
+        if isinstance(operation, UpdateOne):
+            self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+        elif isinstance(operation, ReplaceOne):
+            self.replace_one(operation._filter, operation._doc, upsert=operation._upsert)
+        elif isinstance(operation, InsertOne):
+            self.insert_one(operation._doc)
+        elif isinstance(operation, DeleteOne):
+            self.delete_one(operation._filter)
+        else:
+            raise NotImplementedError(type(operation).__name__)
+
+
+mongomock.collection.Collection.bulk_write = _bulk_write
+
+# GridFS (attachments, import uploads) on mongomock; pymongo's buckets also
+# read the client's operation timeout
+mongomock.gridfs.enable_gridfs_integration()
+mongomock.MongoClient.options = types.SimpleNamespace(timeout=None)
+
+import app as app_module  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from models_mongo import Bug, User  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with app_module.app.app_context():
+        yield app_module.app
+    extensions.queue_client.flushall()
+    # Empty every collection (archive, projects, tombstones, ...) but keep
+    # them, since documents hold on to their collection objects
+    db = Bug._get_db()
+    for name in db.list_collection_names():
+        db[name].delete_many({})
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(username, role='user', **fields):
+    user = User(username=username, email=f'{username}@example.com', role=role, **fields)
+    user.save()
+    return user
+
+
+def auth(user):
+    """Authorization headers carrying an access token for user"""
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+class _Inbox:
+    """SMTP handler that keeps accepted messages, or rejects them while failing"""
+
+    def __init__(self):
+        self.messages = []
+        self.failing = False
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failing:
+            return '451 Requested action aborted: local error in processing'
+        self.messages.append(email.message_from_bytes(envelope.content))
+        return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(app):
+    """A local SMTP server the app's mailer sends to"""
+    inbox = _Inbox()
+    controller = Controller(inbox, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    previous = {key: app.config[key] for key in ('MAIL_SERVER', 'MAIL_PORT', 'MAIL_USE_TLS')}
+    app.config.update(MAIL_SERVER=controller.hostname, MAIL_PORT=controller.port, MAIL_USE_TLS=False)
+    extensions.mail.init_app(app)
+    yield inbox
+    controller.stop()
+    app.config.update(previous)
+    extensions.mail.init_app(app)
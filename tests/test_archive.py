@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import auth, make_user
+from models_mongo import Bug
+from services import archive, projects
+
+
+@pytest.fixture
+def reporter(app):
+    return make_user('alice')
+
+
+def _bug(reporter, title, days_old, status='open'):
+    moment = datetime.utcnow() - timedelta(days=days_old)
+    bug = Bug(
+        title=title, description=f'{title} description', status=status, reporter=reporter,
+        project=projects.default_project(), created_at=moment
+    )
+    bug.save()
+    # save() stamps updated_at; age it so the bug qualifies for archiving
+    Bug.objects(id=bug.id).update(set__updated_at=moment)
+    return bug
+
+
+@pytest.fixture
+def tiers(reporter):
+    """Seven bugs, the three old closed ones archived"""
+    for index in range(7):
+        _bug(reporter, f'Bug {index}', days_old=400 + index if index % 2 else index,
+             status='closed' if index % 2 else 'open')
+    assert archive.archive_old_bugs(days=365) == 3
+    return reporter
+
+
+def test_archiving_moves_only_old_closed_bugs(tiers):
+    assert Bug.objects.count() == 4
+    assert archive.collection().count_documents({}) == 3
+    assert {doc['title'] for doc in archive.collection().find()} == {'Bug 1', 'Bug 3', 'Bug 5'}
+
+
+def test_list_leaves_archived_bugs_out_by_default(client, tiers):
+    response = client.get('/api/bugs?per_page=100', headers=auth(tiers))
+
+    assert response.status_code == 200
+    assert response.json['pagination']['total'] == 4
+    assert 'next_cursor' not in response.json['pagination']
+
+
+@pytest.mark.parametrize('facets', ['false', 'true'])
+def test_cursor_pages_through_both_tiers_newest_first(client, tiers, facets):
+    titles = []
+    after = ''
+    while True:
+        response = client.get(
+            f'/api/bugs?include_archived=true&per_page=3&facets={facets}&after={after}', headers=auth(tiers)
+        )
+        assert response.status_code == 200
+        assert response.json['pagination']['total'] == 7
+        titles += [bug['title'] for bug in response.json['bugs']]
+        after = response.json['pagination']['next_cursor']
+        if after is None:
+            break
+
+    assert titles == [f'Bug {index}' for index in (0, 2, 4, 6, 1, 3, 5)]
+
+
+def test_deep_offsets_are_refused_with_archived_bugs(client, tiers):
+    deep = client.get('/api/bugs?include_archived=true&page=2', headers=auth(tiers))
+    assert deep.status_code == 400
+
+    bad_cursor = client.get('/api/bugs?include_archived=true&after=not-a-cursor', headers=auth(tiers))
+    assert bad_cursor.status_code == 400
+
+
+def test_writing_to_an_archived_bug_restores_it(client, tiers):
+    archived = archive.collection().find_one({'title': 'Bug 3'})
+
+    found = client.get(f'/api/bugs/{archived["_id"]}', headers=auth(tiers))
+    assert found.status_code == 200
+    assert archive.collection().count_documents({}) == 3
+
+    updated = client.put(f'/api/bugs/{archived["_id"]}', json={'status': 'open'}, headers=auth(tiers))
+    assert updated.status_code == 200
+    assert archive.collection().count_documents({'_id': archived['_id']}) == 0
+    assert Bug.objects(id=archived['_id']).first().status == 'open'
+
+
+def test_dashboard_counts_assigned_bugs_in_both_tiers(client, reporter):
+    for title, days_old, status in (('Fresh', 0, 'open'), ('Stale', 400, 'closed'), ('Ancient', 500, 'closed')):
+        bug = _bug(reporter, title, days_old=days_old, status=status)
+        Bug.objects(id=bug.id).update(set__assignee=reporter.id)
+    assert archive.archive_old_bugs(days=365) == 2
+
+    data = client.get('/api/dashboard', headers=auth(reporter)).json
+
+    assert data['assignedToMe']['total'] == data['totalBugs'] == 3
+    assert data['assignedToMe']['statusCounts']['closed'] == 2
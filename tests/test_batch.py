@@ -0,0 +1,73 @@
+import pytest
+
+from conftest import auth, make_user
+from routes import batch_routes
+from services import revocation
+
+
+@pytest.fixture
+def alice(app):
+    return make_user('alice')
+
+
+def _batch(client, user, body, **kwargs):
+    return client.post('/api/batch', json=body, headers=auth(user), **kwargs)
+
+
+@pytest.mark.parametrize('parallel', [True, False])
+def test_sub_requests_are_answered_in_order(client, alice, parallel):
+    make_user('alicia')
+
+    response = _batch(client, alice, {'parallel': parallel, 'requests': [
+        {'id': 'me', 'path': f'/api/users/{alice.id}'},
+        {'path': '/api/users/suggest?q=ali'},
+        {'id': 'missing', 'path': '/api/users/000000000000000000000000', 'method': 'get'}
+    ]})
+
+    assert response.status_code == 200
+    first, second, third = response.json['responses']
+    assert (first['id'], first['status'], first['body']['username']) == ('me', 200, 'alice')
+    assert second['id'] == '/api/users/suggest?q=ali'
+    assert [user['username'] for user in second['body']['users']] == ['alice', 'alicia']
+    assert (third['id'], third['status']) == ('missing', 404)
+
+
+@pytest.mark.parametrize('body', [
+    ['not', 'an', 'object'],
+    {},
+    {'requests': []},
+    {'requests': 'GET /api/users'},
+    {'requests': ['/api/users']},
+    {'requests': [{'path': '/api/users'}] * (batch_routes.MAX_SUB_REQUESTS + 1)},
+    {'requests': [{'path': 5}]},
+    {'requests': [{'path': '/api/users', 'method': 5}]},
+    {'requests': [{'path': '/api/users', 'method': 'DELETE'}]},
+    {'requests': [{'path': '/api/batch'}]},
+    {'requests': [{'path': '/health'}]},
+    {'requests': [{'path': '/api/users'}], 'parallel': 'yes'}
+])
+def test_malformed_batches_are_rejected(client, alice, body):
+    assert _batch(client, alice, body).status_code == 400
+
+
+def test_non_json_body_is_rejected(client, alice):
+    response = client.post('/api/batch', data='requests', content_type='text/plain', headers=auth(alice))
+
+    assert response.status_code == 400
+
+
+def test_revocation_is_checked_once_per_batch(client, alice, monkeypatch):
+    checked = []
+    is_revoked = revocation.is_revoked
+    monkeypatch.setattr(revocation, 'is_revoked', lambda user_id: checked.append(user_id) or is_revoked(user_id))
+
+    response = _batch(client, alice, {'requests': [{'path': f'/api/users/{alice.id}'}] * 5})
+
+    assert [item['status'] for item in response.json['responses']] == [200] * 5
+    assert checked == [str(alice.id)]
+
+
+def test_revoked_users_cannot_batch(client, alice):
+    revocation.revoke(alice.id)
+
+    assert _batch(client, alice, {'requests': [{'path': f'/api/users/{alice.id}'}]}).status_code == 401
@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from conftest import auth, make_user
+from models_mongo import Bug, User
+from services import jobs, projects, revocation
+
+calls = []
+
+
+@jobs.job('test_echo')
+def _echo(ctx, value):
+    calls.append(value)
+    ctx.progress(50, 'Halfway')
+    return {'value': value}
+
+
+@jobs.job('test_flaky', max_attempts=2)
+def _flaky(ctx, fail_times):
+    calls.append('flaky')
+    if len(calls) <= fail_times:
+        raise RuntimeError('boom')
+    return {'calls': len(calls)}
+
+
+@jobs.job('test_slow')
+def _slow(ctx):
+    calls.append('slow')
+    time.sleep(0.2)
+
+
+@pytest.fixture(autouse=True)
+def reset_calls(app):
+    calls.clear()
+
+
+def _running():
+    return jobs.queue_client.zrange(jobs.RUNNING_KEY, 0, -1)
+
+
+def test_job_runs_once_and_records_its_result():
+    job_id = jobs.enqueue('test_echo', {'value': 7}, created_by='someone')
+
+    jobs.work(burst=True)
+
+    job = jobs.get_job(job_id)
+    assert (job['status'], job['progress'], job['result'], job['attempts']) == ('succeeded', 100, {'value': 7}, 1)
+    assert job['message'] == 'Halfway'
+    assert calls == [7]
+    assert _running() == []
+
+
+def test_unknown_jobs_are_refused():
+    with pytest.raises(ValueError):
+        jobs.enqueue('no_such_job')
+
+
+def test_failed_job_is_retried_after_a_delay():
+    job_id = jobs.enqueue('test_flaky', {'fail_times': 1})
+
+    jobs.work(burst=True)
+    assert jobs.get_job(job_id)['status'] == 'retrying'
+    assert jobs.queue_client.zscore(jobs.DELAYED_KEY, job_id) > time.time()
+
+    # Make the retry due
+    jobs.queue_client.zadd(jobs.DELAYED_KEY, {job_id: 0})
+    jobs.work(burst=True)
+
+    job = jobs.get_job(job_id)
+    assert (job['status'], job['attempts']) == ('succeeded', 2)
+    assert calls == ['flaky', 'flaky']
+
+
+def test_job_fails_once_attempts_run_out():
+    job_id = jobs.enqueue('test_flaky', {'fail_times': 5})
+
+    jobs.work(burst=True)
+    jobs.queue_client.zadd(jobs.DELAYED_KEY, {job_id: 0})
+    jobs.work(burst=True)
+
+    job = jobs.get_job(job_id)
+    assert job['status'] == 'failed'
+    assert 'boom' in job['error']
+    assert jobs.queue_client.ttl(jobs.JOB_KEY.format(job_id)) > 0
+
+
+def test_job_of_a_dead_worker_is_requeued_when_its_lease_expires():
+    job_id = jobs.enqueue('test_echo', {'value': 1})
+    # A worker claims it and dies
+    assert jobs._claim_script(keys=[jobs.QUEUE_KEY, jobs.RUNNING_KEY], args=[time.time() - 1]) == job_id
+
+    jobs.work(burst=True)
+
+    assert jobs.get_job(job_id)['status'] == 'succeeded'
+    assert calls == [1]
+
+
+def test_finished_job_is_not_run_again():
+    job_id = jobs.enqueue('test_echo', {'value': 1})
+    jobs.work(burst=True)
+
+    # A stale lease puts the id back on the queue
+    jobs.queue_client.lpush(jobs.QUEUE_KEY, job_id)
+    jobs.work(burst=True)
+
+    assert calls == [1]
+    assert jobs.get_job(job_id)['attempts'] == 1
+    assert _running() == []
+
+
+def test_lease_renewal_stops_before_the_job_finishes(monkeypatch):
+    # Renew every few milliseconds while the handler runs
+    monkeypatch.setattr(jobs, 'LEASE_SECONDS', 0.03)
+    job_id = jobs.enqueue('test_slow')
+
+    jobs.work(burst=True)
+    time.sleep(0.05)
+
+    assert jobs.get_job(job_id)['status'] == 'succeeded'
+    assert _running() == []
+
+
+def test_lease_renewal_never_recreates_a_finished_lease(monkeypatch):
+    monkeypatch.setattr(jobs, 'LEASE_SECONDS', 0.03)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=jobs._renew_lease, args=('finished', stop))
+    heartbeat.start()
+    time.sleep(0.05)
+    stop.set()
+    heartbeat.join()
+
+    assert _running() == []
+
+
+def test_deleting_a_user_runs_the_cascade_in_the_worker(client):
+    admin = make_user('root', role='admin')
+    alice = make_user('alice')
+    bob = make_user('bob')
+    project = projects.default_project()
+    for title, reporter, assignee in (('Mine', alice, None), ('Theirs', bob, alice), ('Other', bob, None)):
+        Bug(title=title, description=title, reporter=reporter, assignee=assignee, project=project).save()
+
+    response = client.delete(f'/api/users/{alice.id}', headers=auth(admin))
+
+    assert response.status_code == 202
+    # Locked out while the job is pending
+    assert client.get('/api/bugs', headers=auth(alice)).status_code == 401
+    assert User.objects(id=alice.id).first().is_active is False
+
+    jobs.work(burst=True)
+
+    job = client.get(response.json['status_url'], headers=auth(admin)).json
+    assert job['result'] == {'deleted_bugs': 1, 'unassigned_bugs': 1}
+    assert User.objects(id=alice.id).first() is None
+    assert sorted(bug.title for bug in Bug.objects) == ['Other', 'Theirs']
+    assert Bug.objects(title='Theirs').first().assignee is None
+
+
+def test_token_checks_read_redis_not_the_users_collection(client, monkeypatch):
+    alice = make_user('alice')
+    lookups = []
+    find_one = type(User._get_collection()).find_one
+    monkeypatch.setattr(
+        type(User._get_collection()), 'find_one',
+        lambda self, *args, **kwargs: lookups.append(self.name) or find_one(self, *args, **kwargs)
+    )
+
+    assert client.get('/api/users/suggest?q=al', headers=auth(alice)).status_code == 200
+    assert 'users' not in lookups
+
+    revocation.revoke(alice.id)
+    assert client.get('/api/users/suggest?q=al', headers=auth(alice)).status_code == 401
+
+    revocation.reinstate(alice.id)
+    assert client.get('/api/users/suggest?q=al', headers=auth(alice)).status_code == 200
+
+
+def test_revocations_are_pruned_once_their_tokens_expired(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'JWT_ACCESS_TOKEN_EXPIRES', timedelta(seconds=60))
+    revocation.revoke('old')
+    jobs.queue_client.zadd(revocation.REVOKED_KEY, {'old': time.time() - 61})
+
+    revocation.revoke('new')
+
+    assert jobs.queue_client.zrange(revocation.REVOKED_KEY, 0, -1) == ['new']
@@ -0,0 +1,108 @@
+import pytest
+
+from models_mongo import Bug, User
+from services import notifications
+from signals import bug_updated
+
+
+@pytest.fixture
+def users(app):
+    alice = User(username='alice', email='alice@example.com')
+    bob = User(username='bob', email='bob@example.com')
+    carol = User(username='carol', email='carol@example.com')
+    for user in (alice, bob, carol):
+        user.save()
+    return alice, bob, carol
+
+
+@pytest.fixture
+def no_window(monkeypatch):
+    """Make queued items due at once"""
+    monkeypatch.setattr(notifications, 'DIGEST_WINDOW_SECONDS', 0)
+
+
+def _assigned(bug_id, actor):
+    return {'kind': 'assigned', 'bug_id': bug_id, 'title': f'Bug {bug_id}', 'actor': str(actor.id)}
+
+
+def _comment(bug_id, actor, excerpt):
+    return {'kind': 'comment', 'bug_id': bug_id, 'title': f'Bug {bug_id}', 'actor': str(actor.id), 'excerpt': excerpt}
+
+
+def _pending(user):
+    return notifications.queue_client.lrange(notifications.PENDING_KEY.format(user.id), 0, -1)
+
+
+def test_items_for_a_recipient_are_sent_as_one_digest(smtp, users, no_window):
+    alice, bob, carol = users
+    notifications.notify(str(bob.id), _assigned('1', alice))
+    notifications.notify(str(bob.id), _comment('2', carol, 'Still broken on Safari'))
+    notifications.notify(str(carol.id), _assigned('3', alice))
+
+    assert notifications.flush_due_digests() == 2
+
+    by_recipient = {message['To']: message for message in smtp.messages}
+    assert set(by_recipient) == {'bob@example.com', 'carol@example.com'}
+    digest = by_recipient['bob@example.com']
+    assert digest['Subject'] == 'Bug Tracker: 2 updates'
+    body = digest.get_payload()
+    assert 'alice assigned you to "Bug 1"' in body
+    assert 'carol commented on "Bug 2": Still broken on Safari' in body
+    assert by_recipient['carol@example.com']['Subject'] == 'Bug Tracker: 1 update'
+    assert _pending(bob) == []
+
+
+def test_digest_waits_for_its_window(smtp, users):
+    alice, bob, _ = users
+    notifications.notify(str(bob.id), _assigned('1', alice))
+
+    assert notifications.flush_due_digests() == 0
+    assert smtp.messages == []
+    assert len(_pending(bob)) == 1
+
+
+def test_assignment_signal_skips_the_actor(smtp, users, no_window):
+    alice, bob, _ = users
+    bug = Bug(title='Login fails', description='500 on submit', reporter=alice, assignee=bob)
+    bug.save()
+
+    bug_updated.send(None, bug=bug, changes={'assignee': (None, str(bob.id))}, actor=str(alice.id))
+    bug.update(set__assignee=alice)
+    bug.reload()
+    bug_updated.send(None, bug=bug, changes={'assignee': (str(bob.id), str(alice.id))}, actor=str(alice.id))
+
+    assert notifications.flush_due_digests() == 1
+    assert [message['To'] for message in smtp.messages] == ['bob@example.com']
+
+
+def test_inactive_users_are_skipped(smtp, users, no_window):
+    alice, bob, _ = users
+    bob.update(set__is_active=False)
+    notifications.notify(str(bob.id), _assigned('1', alice))
+
+    assert notifications.flush_due_digests() == 1
+    assert smtp.messages == []
+    # Dropped, not retried
+    assert _pending(bob) == []
+    assert notifications.queue_client.zscore(notifications.DUE_KEY, str(bob.id)) is None
+
+
+def test_smtp_failure_requeues_the_batch(smtp, users, no_window):
+    alice, bob, _ = users
+    notifications.notify(str(bob.id), _assigned('1', alice))
+    notifications.notify(str(bob.id), _assigned('2', alice))
+    smtp.failing = True
+
+    with pytest.raises(Exception):
+        notifications.flush_due_digests()
+
+    assert smtp.messages == []
+    assert len(_pending(bob)) == 2
+    assert notifications.queue_client.zscore(notifications.DUE_KEY, str(bob.id)) is not None
+
+    smtp.failing = False
+    assert notifications.flush_due_digests() == 1
+    assert len(smtp.messages) == 1
+    body = smtp.messages[0].get_payload()
+    # Requeued items keep their order
+    assert body.index('"Bug 1"') < body.index('"Bug 2"')
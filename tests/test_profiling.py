@@ -0,0 +1,19 @@
+from conftest import auth, make_user
+
+
+def test_profiles_never_keep_tokens_from_the_query_string(client):
+    admin = make_user('root', role='admin')
+    headers = auth(admin)
+    token = headers['Authorization'].split()[1]
+
+    response = client.get(
+        f'/api/users/suggest?q=ro&jwt={token}&access_token=abc&profile=1', headers=headers
+    )
+    assert response.status_code == 200
+    profile_id = response.headers['X-Profile-Id']
+
+    listed = client.get('/api/admin/profiles', headers=headers).json['profiles']
+    assert [(entry['id'], entry['query_string']) for entry in listed] == [(profile_id, 'q=ro&profile=1')]
+    detail = client.get(f'/api/admin/profiles/{profile_id}', headers=headers)
+    assert detail.status_code == 200
+    assert token not in detail.get_data(as_text=True)
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+import pytest
+from mongoengine.errors import OperationError
+
+from conftest import auth, make_user
+from models_mongo import Bug, Project
+from services import archive, bug_stats, jobs, projects, tag_counts
+
+
+@pytest.fixture
+def alice(app):
+    return make_user('alice')
+
+
+def _legacy_bug(reporter, title, status='open', collection=None):
+    """A bug stored before projects existed"""
+    doc = {
+        'title': title, 'description': title, 'status': status, 'priority': 'high', 'tags': ['legacy'],
+        'reporter': reporter.id, 'created_at': datetime(2020, 1, 1), 'updated_at': datetime(2020, 1, 1)
+    }
+    (collection or Bug._get_collection()).insert_one(doc)
+    return doc['_id']
+
+
+def test_legacy_bugs_join_the_default_project(client, alice):
+    bug_id = _legacy_bug(alice, 'Old')
+    archived_id = _legacy_bug(alice, 'Older', status='closed', collection=archive.collection())
+
+    jobs.enqueue('adopt_unscoped_bugs')
+    jobs.work(burst=True)
+
+    default = projects.default_project()
+    assert Bug.objects(id=bug_id).first().project.id == default.id
+    assert Bug.objects(id=bug_id).first().updated_at > datetime(2020, 1, 1)
+    assert archive.collection().find_one({'_id': archived_id})['project'] == default.id
+
+    listed = client.get('/api/bugs', headers=auth(alice)).json
+    assert [bug['title'] for bug in listed['bugs']] == ['Old']
+    stats = client.get('/api/bugs/stats', headers=auth(alice)).json
+    assert stats['totalBugs'] == 2
+    assert tag_counts.top_tags(default.id, 10) == [{'tag': 'legacy', 'count': 2}]
+    assert bug_stats.get_stats(bug_stats.GLOBAL_SCOPE)['total'] == 0
+
+
+def test_adopting_is_scheduled_and_idempotent(alice):
+    assert 'adopt_unscoped_bugs' in jobs._schedules
+    _legacy_bug(alice, 'Old')
+
+    assert projects.adopt_unscoped_bugs() == 1
+    assert projects.adopt_unscoped_bugs() == 0
+
+
+def test_bug_of_a_deleted_project_is_served_without_it(client, alice):
+    project = Project(key='gone', name='Gone', open_membership=True)
+    project.save()
+    bug_id = archive.collection().insert_one({
+        'title': 'Archived', 'description': 'Archived', 'status': 'closed', 'reporter': alice.id,
+        'project': project.id, 'created_at': datetime(2020, 1, 1), 'updated_at': datetime(2020, 1, 1)
+    }).inserted_id
+    # Removed behind the application's back
+    Project._get_collection().delete_one({'_id': project.id})
+    admin = make_user('root', role='admin')
+
+    response = client.get(f'/api/bugs/{bug_id}', headers=auth(admin))
+
+    assert response.status_code == 200
+    assert response.json['project'] is None
+    assert client.get(f'/api/bugs/{bug_id}', headers=auth(alice)).status_code == 403
+
+
+def test_projects_with_bugs_cannot_be_deleted(alice):
+    project = Project(key='busy', name='Busy')
+    project.save()
+    Bug(title='Open', description='Open', reporter=alice, project=project).save()
+
+    with pytest.raises(OperationError):
+        project.delete()
+    assert Project.objects(key='busy').count() == 1
+
+
+def test_projects_with_archived_bugs_cannot_be_deleted(alice):
+    project = Project(key='quiet', name='Quiet')
+    project.save()
+    archive.collection().insert_one({'title': 'Old', 'reporter': alice.id, 'project': project.id})
+
+    with pytest.raises(OperationError):
+        project.delete()
+
+    archive.collection().delete_many({})
+    project.delete()
+    assert Project.objects(key='quiet').count() == 0
+
+
+@pytest.mark.parametrize('body', [
+    {'key': 5, 'name': 'Five'},
+    {'key': 'Bad Key', 'name': 'Bad'},
+    {'key': 'web'},
+    {'key': 'web', 'name': '  '},
+    {'key': 'web', 'name': 'Web', 'open_membership': 'yes'},
+    ['web', 'Web']
+])
+def test_malformed_projects_are_rejected(client, body):
+    admin = make_user('root', role='admin')
+
+    assert client.post('/api/projects', json=body, headers=auth(admin)).status_code == 400
+    assert Project.objects.count() == 0
+
+
+def test_project_and_member_bodies_are_validated(client, alice):
+    admin = make_user('root', role='admin')
+    headers = auth(admin)
+
+    response = client.post('/api/projects', data='web', content_type='text/plain', headers=headers)
+    assert response.status_code == 400
+
+    response = client.post('/api/projects', json={'key': ' Web ', 'name': 'Web'}, headers=headers)
+    assert (response.status_code, response.json['project']['key']) == (201, 'web')
+
+    members_url = '/api/projects/web/members'
+    assert client.post(members_url, data='alice', content_type='text/plain', headers=headers).status_code == 400
+    assert client.post(members_url, json={'username': 5}, headers=headers).status_code == 400
+    assert client.post(members_url, json={'username': 'alice'}, headers=headers).status_code == 200
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import auth, make_user
+from models_mongo import Bug
+from services import archive, saved_filters
+
+
+@pytest.fixture
+def alice(app):
+    return make_user('alice')
+
+
+def _create_bug(client, user, title, **fields):
+    response = client.post('/api/bugs', json={'title': title, 'description': title, **fields}, headers=auth(user))
+    assert response.status_code == 201
+    return response.json['bug']['id']
+
+
+def _save_filter(client, user, name, **params):
+    response = client.post('/api/filters', json={'name': name, **params}, headers=auth(user))
+    assert response.status_code == 201
+    return response.json['filter']['id']
+
+
+def _counts(client, user):
+    filters = client.get('/api/filters', headers=auth(user)).json['filters']
+    return {saved['name']: saved['count'] for saved in filters}
+
+
+def test_counts_follow_bug_writes(client, alice):
+    make_user('bob')
+    _create_bug(client, alice, 'Crash', priority='high', tags=['ui'])
+    _save_filter(client, alice, 'High', priority='high')
+    _save_filter(client, alice, 'Bob ui', assignee='bob', tags=['ui', 'api'], tags_mode='all')
+    _save_filter(client, alice, 'Unassigned', assignee='unassigned')
+    assert _counts(client, alice) == {'High': 1, 'Bob ui': 0, 'Unassigned': 1}
+
+    bug_id = _create_bug(client, alice, 'Slow', priority='low', tags=['ui', 'api'])
+    assert _counts(client, alice) == {'High': 1, 'Bob ui': 0, 'Unassigned': 2}
+
+    client.put(f'/api/bugs/{bug_id}', json={'priority': 'high', 'assignee': 'bob'}, headers=auth(alice))
+    assert _counts(client, alice) == {'High': 2, 'Bob ui': 1, 'Unassigned': 1}
+
+    client.put(f'/api/bugs/{bug_id}', json={'tags': ['api']}, headers=auth(alice))
+    assert _counts(client, alice) == {'High': 2, 'Bob ui': 0, 'Unassigned': 1}
+
+    client.delete(f'/api/bugs/{bug_id}', headers=auth(alice))
+    assert _counts(client, alice) == {'High': 1, 'Bob ui': 0, 'Unassigned': 1}
+    assert saved_filters.reconcile() == 3
+    assert _counts(client, alice) == {'High': 1, 'Bob ui': 0, 'Unassigned': 1}
+
+
+def test_archived_bugs_leave_the_counts_until_restored(client, alice):
+    bug_id = _create_bug(client, alice, 'Old', status='closed')
+    _save_filter(client, alice, 'Closed', status='closed')
+    old = datetime.utcnow() - timedelta(days=400)
+    Bug.objects(id=bug_id).update(set__updated_at=old)
+
+    assert archive.archive_old_bugs(days=365) == 1
+    assert _counts(client, alice) == {'Closed': 0}
+
+    archive.restore(bug_id)
+    assert _counts(client, alice) == {'Closed': 1}
+
+    assert archive.archive_old_bugs(days=0) == 1
+    client.delete(f'/api/bugs/{bug_id}', headers=auth(alice))
+    assert _counts(client, alice) == {'Closed': 0}
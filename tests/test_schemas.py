@@ -0,0 +1,81 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from conftest import auth, make_user
+from schemas import (
+    MAX_PAGE_WINDOW, Schema, ValidationError, boolean, integer, page_args, page_window, string, string_list
+)
+
+BODY = Schema({
+    'title': string(required=True, strip=True, min_length=1, max_length=10),
+    'status': string(default='open', choices=['open', 'closed']),
+    'assignee': string(nullable=True),
+    'count': integer(minimum=0),
+    'tags': string_list(max_items=2)
+})
+
+ARGS = Schema(page_args(flag=boolean(default=False), tags=string_list(default=[])), check=page_window)
+
+
+def test_body_is_cleaned_and_defaults_applied():
+    cleaned = BODY.load({'title': '  Crash  ', 'assignee': None, 'unknown': 1})
+
+    assert cleaned == {'title': 'Crash', 'status': 'open', 'assignee': None}
+
+
+def test_body_errors_are_reported_per_field():
+    with pytest.raises(ValidationError) as raised:
+        BODY.load({'status': 'wontfix', 'count': True, 'tags': ['a', 'b', 'c']})
+
+    assert raised.value.errors == {
+        'title': 'is required',
+        'status': 'must be one of: open, closed',
+        'count': 'must be an integer',
+        'tags': 'must have at most 2 items'
+    }
+
+
+def test_body_rejects_wrong_types():
+    with pytest.raises(ValidationError) as raised:
+        BODY.load({'title': 5, 'tags': 'a,b'})
+
+    assert raised.value.errors == {'title': 'must be a string', 'tags': 'must be a list of strings'}
+
+
+def test_query_values_are_parsed_and_per_page_clamped():
+    args = MultiDict([('page', '3'), ('per_page', '500'), ('flag', 'true'), ('tags', 'a, b'), ('tags', 'c')])
+    cleaned = ARGS.load(args, query=True)
+
+    assert cleaned == {'page': 3, 'per_page': 100, 'flag': True, 'tags': ['a', 'b', 'c']}
+
+
+def test_query_rejects_non_integers():
+    with pytest.raises(ValidationError) as raised:
+        ARGS.load(MultiDict([('page', 'two')]), query=True)
+
+    assert raised.value.errors == {'page': 'must be an integer'}
+
+
+def test_pages_past_the_window_are_rejected():
+    last = MAX_PAGE_WINDOW // 100
+    assert ARGS.load(MultiDict([('page', str(last)), ('per_page', '100')]), query=True)['page'] == last
+
+    with pytest.raises(ValidationError) as raised:
+        ARGS.load(MultiDict([('page', str(last + 1)), ('per_page', '100')]), query=True)
+
+    assert 'page' in raised.value.errors
+
+
+def test_routes_answer_400_before_touching_the_database(client):
+    user = make_user('alice')
+
+    deep = client.get('/api/bugs?page=100000&per_page=100', headers=auth(user))
+    assert deep.status_code == 400
+    assert 'page' in deep.json['errors']
+
+    bad = client.post('/api/bugs', json={'title': '', 'priority': 'urgent'}, headers=auth(user))
+    assert bad.status_code == 400
+    assert set(bad.json['errors']) == {'title', 'description', 'priority'}
+
+    not_object = client.post('/api/bugs', json=['title'], headers=auth(user))
+    assert not_object.status_code == 400
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import auth, make_user
+from models_mongo import Bug, BugTombstone
+from services import archive, projects, sync
+
+
+@pytest.fixture
+def alice(app, monkeypatch):
+    # Serve rows as soon as they are written
+    monkeypatch.setattr(sync, 'SAFETY_LAG', timedelta(0))
+    return make_user('alice')
+
+
+def _bug(reporter, title, **fields):
+    bug = Bug(title=title, description=title, reporter=reporter, project=projects.default_project(), **fields)
+    bug.save()
+    return bug
+
+
+def _changes(client, user, since=None, limit=100):
+    # Past the millisecond the last write was stamped in
+    time.sleep(0.002)
+    query = f'?limit={limit}' + (f'&since={since}' if since else '')
+    response = client.get(f'/api/bugs/changes{query}', headers=auth(user))
+    assert response.status_code == 200
+    return response.json
+
+
+def _titles(page):
+    return [bug['title'] for bug in page['bugs']]
+
+
+def test_tokens_return_only_what_changed_since(client, alice):
+    first = _bug(alice, 'First')
+    second = _bug(alice, 'Second')
+
+    full = _changes(client, alice)
+    assert (_titles(full), full['deleted'], full['has_more']) == (['First', 'Second'], [], False)
+    assert _changes(client, alice, full['next_token'])['bugs'] == []
+
+    client.put(f'/api/bugs/{first.id}', json={'title': 'First, edited'}, headers=auth(alice))
+    client.delete(f'/api/bugs/{second.id}', headers=auth(alice))
+
+    delta = _changes(client, alice, full['next_token'])
+    assert (_titles(delta), delta['deleted']) == (['First, edited'], [str(second.id)])
+    caught_up = _changes(client, alice, delta['next_token'])
+    assert (caught_up['bugs'], caught_up['deleted'], caught_up['has_more']) == ([], [], False)
+
+
+def test_changes_are_paged(client, alice):
+    for index in range(5):
+        _bug(alice, f'Bug {index}')
+
+    seen = []
+    page = _changes(client, alice, limit=2)
+    seen += _titles(page)
+    while page['has_more']:
+        page = _changes(client, alice, page['next_token'], limit=2)
+        seen += _titles(page)
+
+    assert seen == [f'Bug {index}' for index in range(5)]
+
+
+def test_bad_and_expired_tokens_are_refused(client, alice):
+    headers = auth(alice)
+    assert client.get('/api/bugs/changes?since=not-a-token', headers=headers).status_code == 400
+
+    old = datetime.utcnow() - timedelta(seconds=sync.TOMBSTONE_TTL_SECONDS + 60)
+    expired = sync.encode_token((old, None), (old, None))
+    assert client.get(f'/api/bugs/changes?since={expired}', headers=headers).status_code == 410
+
+
+def test_archived_bugs_are_tombstoned_and_restored_ones_resurface(client, alice):
+    old = datetime.utcnow() - timedelta(days=400)
+    bug = _bug(alice, 'Old', status='closed', created_at=old)
+    Bug.objects(id=bug.id).update(set__updated_at=old)
+    token = _changes(client, alice)['next_token']
+
+    assert archive.archive_old_bugs(days=365) == 1
+    archived = _changes(client, alice, token)
+    assert (archived['bugs'], archived['deleted']) == ([], [str(bug.id)])
+
+    archive.restore(bug.id)
+    restored = _changes(client, alice, archived['next_token'])
+    assert (_titles(restored), restored['deleted']) == (['Old'], [])
+    assert BugTombstone.objects(id=bug.id).count() == 0
+    # A client syncing across both sees the bug, not its tombstone
+    across = _changes(client, alice, token)
+    assert (_titles(across), across['deleted']) == (['Old'], [])
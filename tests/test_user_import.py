@@ -0,0 +1,101 @@
+import io
+
+import pytest
+from werkzeug.security import check_password_hash
+
+from conftest import auth, make_user
+from models_mongo import User
+from services import jobs, user_import
+
+CSV = (
+    'username,email,password,role\n'
+    'dave,dave@example.com,secret1,\n'
+    'erin,ERIN@example.com,secret2,admin\n'
+    'frank,frank@example.com,short,\n'
+    'alice,new-alice@example.com,secret3,\n'
+    'dave,other@example.com,secret4,\n'
+)
+
+
+@pytest.fixture(autouse=True)
+def one_hash_worker(monkeypatch):
+    monkeypatch.setattr(user_import, 'HASH_WORKERS', 1)
+
+
+@pytest.fixture
+def admin(app):
+    make_user('alice')
+    return make_user('root', role='admin')
+
+
+def _uploads():
+    return User._get_db()[f'{user_import.UPLOAD_BUCKET}.files'].count_documents({})
+
+
+def _by_line(report):
+    return {entry['line']: entry for entry in report['rows']}
+
+
+def test_import_reports_every_row(admin):
+    result = user_import.import_users(user_import.read_rows(io.BytesIO(CSV.encode()), 'csv'))
+
+    rows = _by_line(result)
+    assert (result['created'], result['failed'], result['truncated']) == (2, 3, False)
+    assert rows[2]['status'] == rows[3]['status'] == 'created'
+    assert rows[4]['error'] == 'password must be at least 6 characters'
+    assert rows[5]['error'] == 'Username already exists'
+    assert rows[6]['error'] == 'Username appears earlier in the file'
+
+    erin = User.objects(username='erin').first()
+    assert (erin.email, erin.role) == ('erin@example.com', 'admin')
+    assert check_password_hash(erin.password_hash, 'secret2')
+
+
+def test_ndjson_rows_that_are_not_objects_fail_alone(admin):
+    body = b'{"username": "gina", "email": "gina@example.com", "password": "secret1"}\n[1]\nnot json\n'
+
+    result = user_import.import_users(user_import.read_rows(io.BytesIO(body), 'ndjson'))
+
+    assert [(entry['line'], entry['status']) for entry in result['rows']] == [
+        (1, 'created'), (2, 'failed'), (3, 'failed')
+    ]
+
+
+def test_http_import_runs_in_the_job_worker(client, admin):
+    response = client.post('/api/users/import', data=CSV, content_type='text/csv', headers=auth(admin))
+
+    assert response.status_code == 202
+    assert (response.json['rows'], response.json['truncated']) == (5, False)
+    assert User.objects(username='dave').count() == 0
+    assert _uploads() == 1
+    # Plaintext passwords stay out of the queue Redis
+    assert not any('secret1' in str(jobs.queue_client.dump(key)) for key in jobs.queue_client.keys())
+
+    jobs.work(burst=True)
+
+    job = client.get(response.json['status_url'], headers=auth(admin)).json
+    assert job['status'] == 'succeeded'
+    assert (job['result']['created'], job['result']['failed']) == (2, 3)
+    assert User.objects(username='dave').count() == 1
+    assert _uploads() == 0
+
+
+def test_http_import_keeps_only_the_first_rows(client, admin, monkeypatch):
+    monkeypatch.setattr('routes.user_routes.MAX_IMPORT_ROWS', 2)
+
+    response = client.post('/api/users/import?format=csv', data=CSV, headers=auth(admin))
+    assert (response.json['rows'], response.json['truncated']) == (2, True)
+
+    jobs.work(burst=True)
+
+    result = client.get(response.json['status_url'], headers=auth(admin)).json['result']
+    assert [entry['username'] for entry in result['rows']] == ['dave', 'erin']
+    assert result['truncated'] is True
+
+
+def test_http_import_is_admin_only_and_needs_a_format(client, admin):
+    user = User.objects(username='alice').first()
+
+    assert client.post('/api/users/import', data=CSV, content_type='text/csv', headers=auth(user)).status_code == 403
+    assert client.post('/api/users/import', data=CSV, content_type='text/plain', headers=auth(admin)).status_code == 415
+    assert _uploads() == 0